@@ -1,27 +1,42 @@
+import functools
+import json
+import tempfile
+from pathlib import Path
+
 import streamlit as st
 
+import flavor_bulk
+import flavor_debug
+import flavor_engine
+import flavor_facets
+import flavor_heatmap
+import flavor_kinetics
+import flavor_robustness
+import flavor_rules
+import flavor_search
+import flavor_smooth
+import flavor_table
+import flavor_telemetry
+from flavor_engine import (
+    DEFAULT_PARAMS,
+    GRIND_SIZE_OPTIONS,
+    PROCESS_METHOD_OPTIONS,
+    ROAST_LEVEL_OPTIONS,
+    SLIDER_RANGES,
+)
+
 
 # Set page configuration for wider layout
 st.set_page_config(layout="wide")
 
+# --- Rerun Instrumentation (opt-in: FLAVOR_DEBUG=1 or ?debug=1) ---
+timer = flavor_debug.start_rerun(st.query_params, st.session_state)
+
 st.title("☕ 手沖咖啡參數模擬器")
 st.markdown("探索不同沖煮參數、處理法與烘焙度對咖啡風味的影響。")
 st.markdown("此模擬器僅供參考，實務上會因水質、濾杯、磨豆機等等不同而有所影響。")
 st.markdown("👈 左側欄位可調整沖煮參數。")
 
-# --- Default Parameters Configuration ---
-DEFAULT_PARAMS = {
-    "ratio": 15.0,
-    "time": 150,
-    "temperature": 90,
-    "grind_size_index": 1,
-    "process_method_index": 0,
-    "roast_level_index": 1,
-    "blooming_time": 30,
-    "blooming_ratio": 2.0,
-    "pour_count": 2,
-}
-
 # --- Session State Initialization ---
 if 'initialized' not in st.session_state:
     for key, value in DEFAULT_PARAMS.items():
@@ -35,418 +50,688 @@ def reset_params():
         st.session_state[key] = value
 
 # Place the reset button in the sidebar
-st.sidebar.button("⚙️ 重置參數", on_click=reset_params)
-
-# --- Sidebar Parameter Inputs ---
-st.sidebar.header("請輸入沖煮參數")
-
-# Options lists for widgets
-grind_size_options = ["粗研磨 (海鹽狀)", "中等研磨 (砂糖狀)", "細研磨 (細砂糖狀)"]
-process_method_options = ["水洗", "日曬", "蜜處理"]
-roast_level_options = ["淺烘焙", "中烘焙", "深烘焙"]
-
-# --- 基本沖煮參數 ---
-st.sidebar.slider(
-    "粉水比（1:X）", 10.0, 20.0,
-    step=0.5,
-    key='ratio',
-    help="粉量與水量之比，影響咖啡濃度與風味強度。數字越小（如 1:13）咖啡越濃郁，數字越大（如 1:18）則越清淡。"
-)
-st.sidebar.slider(
-    "總沖煮時間（秒）", 60, 240,
-    step=10,
-    key='time',
-    help="水與咖啡粉接觸的總時間，影響萃取程度。時間過短可能導致萃取不足，過長則可能過度萃取產生雜味。"
-)
-st.sidebar.slider(
-    "水溫（°C）", 80, 100,
-    step=1,
-    key='temperature',
-    help="水溫高有助於更充分萃取，但過高易產生苦味；水溫低則萃取較慢，可能導致酸感突出或風味不足。"
-)
+st.sidebar.button("⚙️ 重置參數", on_click=reset_params, key="reset_params")
+
+# Column headers of the inverse-design result table
+SEARCH_RESULT_LABELS = {
+    "distance": "風味距離",
+    "acid": "酸度",
+    "sweet": "甜感",
+    "bitter": "苦味",
+    "body": "醇厚度",
+    "ratio": "粉水比",
+    "time": "總沖煮時間",
+    "temperature": "水溫",
+    "grind_size": "研磨度",
+    "process_method": "處理法",
+    "roast_level": "烘焙度",
+    "blooming_time": "悶蒸時間",
+    "blooming_ratio": "悶蒸水量",
+    "pour_count": "斷水次數",
+}
 
-selected_grind_size_str = st.sidebar.radio(
-    "研磨度",
-    grind_size_options,
-    index=st.session_state.grind_size_index,
-    key='grind_size_selector_widget',
-    help="咖啡粉顆粒大小，是影響萃取速度和風味平衡的關鍵。細研磨增加接觸面積，萃取快；粗研磨則反之。"
-)
-st.session_state.grind_size_index = grind_size_options.index(selected_grind_size_str)
-grind_size = selected_grind_size_str
-
-selected_process_method_str = st.sidebar.selectbox(
-    "處理法",
-    process_method_options,
-    index=st.session_state.process_method_index,
-    key='process_method_selector_widget',
-    help="咖啡生豆的處理方式，會對咖啡的風味輪廓產生基礎性影響。"
+
+# --- Cached Simulation Functions ---
+# The rules live in flavor_engine; the app only adds Streamlit's per-argument caching.
+# Notes and tips come from the engine's process-wide, bounded text tables instead,
+# which are filled once per server process.
+# flavor_debug.tracked adds the hit/miss counters shown in the debug panel.
+calculate_flavor_profile = flavor_debug.tracked(st.cache_data, flavor_engine.calculate_flavor_profile)
+suggest_flavor_notes = flavor_engine.suggest_flavor_notes
+adjustment_tips = flavor_engine.adjustment_tips
+flavor_debug.tracked(st.cache_resource, flavor_engine.warm_text_tables)()
+
+
+# --- Precomputed Profile Table ---
+# st.cache_resource hands every session in this server process the same memory map.
+# Build it once with `python flavor_table.py`; without it the rules are evaluated per rerun.
+# The table holds tenths of the built-in rules' scores, so a FLAVOR_RULES_PATH rule set,
+# or a table built from other rules, is always evaluated directly.
+def open_flavor_table():
+    if flavor_engine.RULES.definition is not flavor_rules.DEFAULT_RULES:
+        return None
+    try:
+        return flavor_table.open_table()
+    except (FileNotFoundError, flavor_table.StaleTableError):
+        return None
+
+load_flavor_table = flavor_debug.tracked(st.cache_resource, open_flavor_table, "load_flavor_table")
+
+# --- Inverse Design Index ---
+# Built once per server process over the whole slider grid, shared by every session.
+load_recipe_index = flavor_debug.tracked(st.cache_resource, flavor_search.recipe_index)
+load_facet_index = flavor_debug.tracked(st.cache_resource, flavor_facets.facet_index)
+# Gradient descent on the smooth model: a few thousand profile evaluations per target.
+optimize_smooth_recipe = flavor_debug.tracked(st.cache_data(max_entries=64), flavor_smooth.optimize_target)
+
+# --- Sensitivity Heatmaps ---
+# Score grids are cached per (x, y, fixed parameters) across all sessions, evicting the
+# oldest entries beyond HEATMAP_CACHE_ENTRIES; the slider values on x and y are not part
+# of the key. The matplotlib frame depends only on (x, y), so an off-axis slider change
+# only repaints the score cells into a cached frame.
+sensitivity_scores = flavor_debug.tracked(
+    st.cache_data(max_entries=flavor_heatmap.HEATMAP_CACHE_ENTRIES), flavor_heatmap.sensitivity_grid
 )
-st.session_state.process_method_index = process_method_options.index(selected_process_method_str)
-process_method = selected_process_method_str
-
-selected_roast_level_str = st.sidebar.selectbox(
-    "烘焙度",
-    roast_level_options,
-    index=st.session_state.roast_level_index,
-    key='roast_level_selector_widget',
-    help="咖啡豆的烘焙程度。淺烘焙強調產地特色和酸質；深烘焙則發展出更多焦糖、巧克力和醇厚度。"
+load_heatmap_frame = flavor_debug.tracked(
+    st.cache_resource(max_entries=flavor_heatmap.FRAME_CACHE_ENTRIES), flavor_heatmap.heatmap_frame
 )
-st.session_state.roast_level_index = roast_level_options.index(selected_roast_level_str)
-roast_level = selected_roast_level_str
 
+# --- Extraction Kinetics ---
+simulate_extraction = flavor_debug.tracked(st.cache_data(max_entries=256), flavor_kinetics.simulate_recipe)
+# Seeded, so a repeated (recipe, samples, seed) request is answered from the cache.
+robustness_report = flavor_debug.tracked(st.cache_data(max_entries=64), flavor_robustness.robustness_report)
+# --- Live Telemetry ---
+# One hub per server process, fed by the sources configured in the environment
+# (FLAVOR_TELEMETRY_PORT / FLAVOR_TELEMETRY_FILE) and by demo replays.
+load_telemetry_hub = flavor_debug.tracked(st.cache_resource, flavor_telemetry.hub_from_environment)
+TELEMETRY_REFRESH_SECONDS = 1.0
+TELEMETRY_DEMO_SPEED = 5.0
+timer.checkpoint("cache setup")
+
+# --- Partial Reruns ---
+# Each tab is a keyed fragment, and switching tabs reruns only the opened one. A sidebar
+# change reruns only the fragments that show the sidebar recipe (the full page, header
+# and knowledge expanders included, is left as sent); process method and roast level also
+# steer the inverse-design tab. LAZY_RECIPE_VIEWS and the inverse-design tab do their work
+# only while their tab is open, so a sidebar change reruns them only then.
+TAB_VIEWS = {
+    "模擬結果": "simulation",
+    "🎯 風味反推配方": "inverse_design",
+    "🔎 配方探索": "explorer",
+    "📈 參數敏感度": "sensitivity",
+    "⏱️ 萃取動力學": "kinetics",
+    "🎲 穩定度分析": "robustness",
+    "📂 批次評分": "bulk",
+    "📡 即時沖煮": "telemetry",
+}
+RECIPE_VIEWS = ["simulation"]
+LAZY_RECIPE_VIEWS = ["explorer", "sensitivity", "kinetics", "robustness"]
+
+def open_view():
+    return TAB_VIEWS.get(st.session_state.get("tab"))
+
+def recipe_views():
+    return RECIPE_VIEWS + [view for view in LAZY_RECIPE_VIEWS if view == open_view()]
+
+def rerun_recipe_views():
+    st.rerun(recipe_views())
+
+def rerun_bean_views():
+    views = recipe_views()
+    if open_view() == "inverse_design":
+        views.append("inverse_design")
+    st.rerun(views)
+
+def rerun_open_view():
+    st.rerun([open_view()])
+
+def current_recipe():
+    """The sidebar recipe as calculate_flavor_profile keyword arguments."""
+    return {
+        "ratio": st.session_state.ratio,
+        "time": st.session_state.time,
+        "temperature": st.session_state.temperature,
+        "grind_size": GRIND_SIZE_OPTIONS[st.session_state.grind_size_index],
+        "process_method": PROCESS_METHOD_OPTIONS[st.session_state.process_method_index],
+        "roast_level": ROAST_LEVEL_OPTIONS[st.session_state.roast_level_index],
+        "blooming_time": st.session_state.blooming_time,
+        "blooming_ratio": st.session_state.blooming_ratio,
+        "pour_count": st.session_state.pour_count,
+    }
+
+# --- Simulation Panel ---
+# The sidebar inputs and the 模擬結果 tab. Fragments may write widgets into st.sidebar
+# once the full run has put something there (the reset button above).
+@st.fragment(key="simulation")
+def simulation_panel():
+    panel_timer = flavor_debug.start_rerun(st.query_params, st.session_state, scope="simulation panel")
+
+    # --- Sidebar Parameter Inputs ---
+    st.sidebar.header("請輸入沖煮參數")
+
+    # --- 基本沖煮參數 ---
+    st.sidebar.slider(
+        "粉水比（1:X）",
+        **SLIDER_RANGES["ratio"],
+        key='ratio',
+        help="粉量與水量之比，影響咖啡濃度與風味強度。數字越小（如 1:13）咖啡越濃郁，數字越大（如 1:18）則越清淡。",
+        on_change=rerun_recipe_views,
+    )
+    st.sidebar.slider(
+        "總沖煮時間（秒）",
+        **SLIDER_RANGES["time"],
+        key='time',
+        help="水與咖啡粉接觸的總時間，影響萃取程度。時間過短可能導致萃取不足，過長則可能過度萃取產生雜味。",
+        on_change=rerun_recipe_views,
+    )
+    st.sidebar.slider(
+        "水溫（°C）",
+        **SLIDER_RANGES["temperature"],
+        key='temperature',
+        help="水溫高有助於更充分萃取，但過高易產生苦味；水溫低則萃取較慢，可能導致酸感突出或風味不足。",
+        on_change=rerun_recipe_views,
+    )
 
-# --- 專業模式參數 (現在將始終顯示) ---
-st.sidebar.markdown("---") # 分隔線
-st.sidebar.header("進階沖煮參數")
+    selected_grind_size_str = st.sidebar.radio(
+        "研磨度",
+        GRIND_SIZE_OPTIONS,
+        index=st.session_state.grind_size_index,
+        key='grind_size_selector_widget',
+        help="咖啡粉顆粒大小，是影響萃取速度和風味平衡的關鍵。細研磨增加接觸面積，萃取快；粗研磨則反之。",
+        on_change=rerun_recipe_views,
+    )
+    st.session_state.grind_size_index = GRIND_SIZE_OPTIONS.index(selected_grind_size_str)
+    grind_size = selected_grind_size_str
+
+    selected_process_method_str = st.sidebar.selectbox(
+        "處理法",
+        PROCESS_METHOD_OPTIONS,
+        index=st.session_state.process_method_index,
+        key='process_method_selector_widget',
+        help="咖啡生豆的處理方式，會對咖啡的風味輪廓產生基礎性影響。",
+        on_change=rerun_bean_views,
+    )
+    st.session_state.process_method_index = PROCESS_METHOD_OPTIONS.index(selected_process_method_str)
+    process_method = selected_process_method_str
+
+    selected_roast_level_str = st.sidebar.selectbox(
+        "烘焙度",
+        ROAST_LEVEL_OPTIONS,
+        index=st.session_state.roast_level_index,
+        key='roast_level_selector_widget',
+        help="咖啡豆的烘焙程度。淺烘焙強調產地特色和酸質；深烘焙則發展出更多焦糖、巧克力和醇厚度。",
+        on_change=rerun_bean_views,
+    )
+    st.session_state.roast_level_index = ROAST_LEVEL_OPTIONS.index(selected_roast_level_str)
+    roast_level = selected_roast_level_str
 
-st.sidebar.slider(
-    "悶蒸時間（秒）", 0, 60,
-    step=5,
-    key='blooming_time',
-    help="咖啡粉與少量熱水接觸並釋放二氧化碳的階段。充足的悶蒸有助於咖啡粉均勻潤濕，提升後續萃取品質。"
-)
-blooming_time = st.session_state.blooming_time
 
-st.sidebar.slider(
-    "悶蒸水量（粉重倍數）", 1.5, 3.5,
-    step=0.5,
-    key='blooming_ratio',
-    help="悶蒸時注入的水量相對於咖啡粉的重量。一般建議為咖啡粉的 2-3 倍重，水量不足或過多都會影響均勻萃取。"
-)
-blooming_ratio = st.session_state.blooming_ratio
+    # --- 專業模式參數 (現在將始終顯示) ---
+    st.sidebar.markdown("---") # 分隔線
+    st.sidebar.header("進階沖煮參數")
 
-st.sidebar.slider(
-    "斷水次數", 0, 5,
-    step=1,
-    key='pour_count',
-    help="多次分段注水（斷水）有助於控制萃取速度，發展更豐富的風味層次，減少過度萃取。"
-)
-pour_count = st.session_state.pour_count
-
-
-# --- Flavor Calculation Function ---
-@st.cache_data
-def calculate_flavor_profile(ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count): # 移除 mode 參數
-    # Initial flavor baseline (these initial values can be adjusted)
-    acid, sweet, bitter, body = 2.5, 2.5, 2.5, 2.5
-
-    # Process Method Impact (Base adjustment)
-    if process_method == "日曬":
-        sweet += 1.5
-        body += 1
-        acid -= 0.5
-        bitter -= 0.5
-    elif process_method == "水洗":
-        acid += 1.5
-        body -= 0.5
-        sweet -= 0.5
-        bitter += 0.5
-    elif process_method == "蜜處理":
-        sweet += 1
-        acid += 0.5
-        body += 0.5
-
-    # Roast Level Impact (Base adjustment, layered on top of process method)
-    if roast_level == "淺烘焙":
-        acid += 1.5
-        sweet += 0.5
-        bitter -= 1.5
-        body -= 1
-    elif roast_level == "深烘焙":
-        bitter += 2
-        body += 1.5
-        sweet += 0.5
-        acid -= 1.5
-
-    # Basic Brewing Parameter Impact (Interacting with process method, roast level)
-    # Grind Size & Time Interaction
-    if grind_size == "細研磨 (細砂糖狀)":
-        if time < 100:
-            acid += 1.5
-            bitter -= 1
-            sweet -= 1
-            body -= 1
-        elif 100 <= time <= 180:
-            sweet += 0.5
-            body += 0.5
-        else:
-            bitter += 2
-            acid -= 1.5
-            sweet -= 1
-            body += 1
-    elif grind_size == "粗研磨 (海鹽狀)":
-        if time < 120:
-            acid += 1
-            sweet -= 1.5
-            body -= 1.5
-        elif 120 <= time <= 180:
-            pass
-        else:
-            sweet -= 1
-            body -= 2
-            bitter += 1
-            acid += 0.5
-
-    # Ratio Impact
-    if ratio < 14:
-        sweet += 0.5
-        body += 0.5
-        bitter += 0.5
-    elif ratio > 17:
-        acid += 0.5
-        body -= 0.5
-        sweet -= 0.5
-
-    # Temperature Impact
-    if temperature > 94:
-        bitter += 1
-        acid -= 0.5
-        sweet -= 0.5
-    elif temperature < 88:
-        acid += 1.5
-        sweet -= 1
-        body -= 0.5
-        bitter -= 0.5
-
-    # Professional Mode Parameter Impact
-    if blooming_time < 20 and blooming_time > 0:
-        acid += 1
-        body -= 1
-        sweet -= 0.5
-    elif blooming_time > 40:
-        bitter += 1
-        sweet -= 1
-        acid -= 0.5
-    elif blooming_time == 0: # 新增：若悶蒸時間為0，可能造成的影響
-        acid += 0.5 # 未悶蒸可能導致萃取不均
-        body -= 0.5
-        sweet -= 0.5
-
-
-    if blooming_ratio < 1.8:
-        acid += 0.8
-        sweet -= 0.8
-        body -= 0.8
-    elif blooming_ratio > 3.0:
-        body -= 0.5
-        bitter += 0.5
-
-    if pour_count == 0:
-        body -= 1
-        sweet -= 1
-        acid += 0.5
-        bitter += 0.5
-    elif pour_count >= 3:
-        acid += 0.5
-        bitter -= 0.5
-        sweet += 0.5
-
-    # Ensure all values are clamped between 0 and 5
-    return (
-        min(max(acid, 0), 5),
-        min(max(sweet, 0), 5),
-        min(max(bitter, 0), 5),
-        min(max(body, 0), 5),
+    st.sidebar.slider(
+        "悶蒸時間（秒）",
+        **SLIDER_RANGES["blooming_time"],
+        key='blooming_time',
+        help="咖啡粉與少量熱水接觸並釋放二氧化碳的階段。充足的悶蒸有助於咖啡粉均勻潤濕，提升後續萃取品質。",
+        on_change=rerun_recipe_views,
+    )
+    blooming_time = st.session_state.blooming_time
+
+    st.sidebar.slider(
+        "悶蒸水量（粉重倍數）",
+        **SLIDER_RANGES["blooming_ratio"],
+        key='blooming_ratio',
+        help="悶蒸時注入的水量相對於咖啡粉的重量。一般建議為咖啡粉的 2-3 倍重，水量不足或過多都會影響均勻萃取。",
+        on_change=rerun_recipe_views,
+    )
+    blooming_ratio = st.session_state.blooming_ratio
+
+    st.sidebar.slider(
+        "斷水次數",
+        **SLIDER_RANGES["pour_count"],
+        key='pour_count',
+        help="多次分段注水（斷水）有助於控制萃取速度，發展更豐富的風味層次，減少過度萃取。",
+        on_change=rerun_recipe_views,
+    )
+    pour_count = st.session_state.pour_count
+    panel_timer.checkpoint("sidebar widgets")
+
+    # --- Simulation Results Display Section ---
+    st.subheader("模擬結果")
+
+    # 使用 st.session_state 來獲取所有參數
+    profile_table = load_flavor_table()
+    profile_lookup = profile_table.lookup if profile_table is not None else calculate_flavor_profile
+    acid, sweet, bitter, body = profile_lookup(
+        st.session_state.ratio,
+        st.session_state.time,
+        st.session_state.temperature,
+        grind_size,
+        process_method,
+        roast_level,
+        blooming_time,
+        blooming_ratio,
+        pour_count
+    )
+    panel_timer.checkpoint("flavor profile")
+
+    st.markdown("#### 📊 風味強度預測")
+
+    # --- 使用單一的窄欄位來包含所有進度條，使其垂直顯示但更短 ---
+    # 這裡創建了兩個欄位，第一個欄位用於進度條，第二個用於填充空白。
+    # 0.3 代表第一個欄位佔總寬度的 30%。你可以調整這個值來控制進度條的長度。
+    progress_col, _ = st.columns([0.5, 0.5])
+
+    with progress_col:
+        st.write(f"**酸度**")
+        st.progress(acid / 5)
+        st.write(f"**甜感**")
+        st.progress(sweet / 5)
+        st.write(f"**苦味**")
+        st.progress(bitter / 5)
+        st.write(f"**醇厚度**")
+        st.progress(body / 5)
+    # --- 結束 columns 區塊 ---
+    panel_timer.checkpoint("progress bars")
+
+
+    st.markdown("#### 📜 可能風味敘述")
+    notes = suggest_flavor_notes(acid, sweet, bitter, body, process_method, roast_level)
+    for note in notes:
+        st.markdown(f"- {note}")
+    panel_timer.checkpoint("flavor notes")
+
+    st.markdown("---")
+
+    st.markdown("#### 📌 建議調整方向")
+    tips = adjustment_tips(
+        st.session_state.ratio,
+        st.session_state.time,
+        st.session_state.temperature,
+        grind_size,
+        blooming_time,
+        blooming_ratio,
+        pour_count
     )
+    for tip in tips:
+        st.markdown(f"{tip}")
+    panel_timer.checkpoint("adjustment tips")
 
+    panel_record = panel_timer.finish()
+    if panel_record is not None:
+        flavor_debug.render_debug_panel(panel_record, panel_timer.profile_text, "🛠️ 模擬結果區塊效能")
 
-# --- Flavor Description Function ---
-@st.cache_data
-def suggest_flavor_notes(acid, sweet, bitter, body, process_method, roast_level):
-    notes = []
-
-    # 1. Determine base flavor profile based on process method and roast level
-    base_note = ""
-    if process_method == "日曬":
-        base_note = "**日曬處理**的咖啡，風味通常**醇厚、奔放**，帶有明顯的果實甜感"
-    elif process_method == "水洗":
-        base_note = "**水洗處理**的咖啡，風味通常**乾淨、明亮**"
-    elif process_method == "蜜處理":
-        base_note = "**蜜處理**的咖啡，風味介於水洗與日曬之間，通常具有**乾淨的甜感與平衡的酸質**"
-
-    if roast_level == "淺烘焙":
-        base_note += "，屬於**淺烘焙**，更能突顯**細緻的花果香與明亮酸質**。"
-    elif roast_level == "中烘焙":
-        base_note += "，屬於**中烘焙**，風味**平衡且豐富**，酸甜感適中，餘韻悠長。"
-    elif roast_level == "深烘焙":
-        base_note += "，屬於**深烘焙**，帶有**醇厚飽滿的可可、堅果與焦糖香氣**，苦甜平衡。"
-    notes.append(f"此為{base_note}")
-
-    # 2. Refine description based on the intensity of each flavor dimension
-    # --- Acidity ---
-    if acid >= 4:
-        if roast_level == "淺烘焙" or process_method == "水洗":
-            notes.append("- **高酸度：** 呈現**明亮、活潑的柑橘、檸檬**或**莓果**般的酸感，純淨且具穿透力，令人振奮。")
-        elif roast_level == "中烘焙" or process_method == "蜜處理":
-            notes.append("- **高酸度：** 多為**蘋果、葡萄**或**柔和柑橘**般的甜酸，圓潤且與甜感平衡，帶有回甘。")
-        else:
-            notes.append("- **高酸度：** 呈現**熱帶水果或熟成莓果**般的甜酸，多汁且與醇厚感融合，不尖銳。")
-    elif acid >= 2:
-        notes.append("- **中等酸度：** 酸質清晰且平衡，與其他風味和諧交織，不突兀。")
-    else:
-        notes.append("- **低酸度：** 酸質不明顯或柔和，口感平穩，可能更強調甜感或苦感。")
-
-    # --- Sweetness ---
-    if sweet >= 4:
-        if roast_level == "淺烘焙" or process_method == "水洗":
-            notes.append("- **高甜感：** 呈現**蔗糖、蜂蜜或花蜜**般的乾淨甜味，回甘明顯且持久。")
-        elif process_method == "日曬" or process_method == "蜜處理":
-            notes.append("- **高甜感：** 有著濃郁的**熱帶水果乾、莓果醬、焦糖或巧克力**般的香甜，醇厚且餘韻綿長。")
-        else:
-            notes.append("- **高甜感：** 甜感飽滿，如同**焦糖布丁或麥芽糖**般的醇厚甜味，與整體風味完美融合。")
-    elif sweet >= 2:
-        notes.append("- **中等甜感：：** 甜感平衡，能襯托其他風味，使口感更圓潤，增添舒適度。")
-    else:
-        notes.append("- **低甜感：** 甜感不足，咖啡風味可能顯得單薄或平淡，缺乏豐富性。")
-
-    # --- Bitterness ---
-    if bitter >= 4:
-        if roast_level == "深烘焙":
-            notes.append("- **高苦味：** 呈現**濃郁黑巧克力、可可**般的深沉苦感，或帶有**烘烤堅果、木質**氣息，若平衡得宜則有深度。")
-        else:
-            notes.append("- **高苦味：** 可能來自過度萃取，呈現不悅的**焦糊、煙燻或藥草**般的苦感，需調整參數。")
-    elif bitter >= 2:
-        notes.append("- **中等苦味：** 苦味適中，能增加咖啡的厚實感與層次，與甜感形成良好平衡。")
-    else:
-        notes.append("- **低苦味：** 苦味不明顯，整體風味可能更偏向酸甜感，口感較為清爽。")
-
-    # --- Body ---
-    if body >= 4:
-        if process_method == "水洗":
-            notes.append("- **高醇厚度：** 口感**滑順、乾淨**，像**絲綢般**的細膩質感，餘韻清爽而綿長。")
-        elif process_method == "日曬" or roast_level == "深烘焙":
-            notes.append("- **高醇厚度：** 口感**醇厚、黏稠**，像**奶油、糖漿般**的飽滿度，強勁且持久，充滿口腔。")
-        else:
-            notes.append("- **高醇厚度：** 口感**圓潤、中等偏厚**，有著良好的**黏稠感與質感**，提供豐富的口腔體驗。")
-    elif body >= 2:
-        notes.append("- **中等醇厚度：** 口感適中，既不單薄也不厚重，平衡舒適，順暢入喉。")
-    else:
-        notes.append("- **低醇厚度：** 口感清淡，可能顯得水感或單薄，餘韻較短，缺乏份量感。")
-
-    # 3. Overall Balance Description
-    if all(1.5 <= val <= 3.5 for val in [acid, sweet, bitter, body]):
-        notes.append("☕ 整體風味**極為平衡且和諧**，各項風味元素融合得宜，口感舒適，展現出咖啡豆的純粹美好。")
-    elif (acid > bitter and sweet > acid):
-        notes.append("✨ 整體風味呈現良好的**酸甜平衡**，活潑的酸質與豐富的甜感相互輝映，餘韻迷人。")
-    elif (bitter > acid and body > sweet):
-        notes.append("🍫 整體風味醇厚，**苦甜感交織**，帶有厚實的口感和溫暖的風味，餘韻扎實。")
-
-    return notes
-
-
-# --- Adjustment Suggestions Function ---
-@st.cache_data
-def adjustment_tips(ratio, time, temperature, grind_size, blooming_time, blooming_ratio, pour_count):
-    tips = []
-
-    # Grind size and time interaction suggestions
-    if grind_size == "細研磨 (細砂糖狀)":
-        if time < 100:
-            tips.append("📉 **風味尖銳/欠萃（細研磨+短時間）**：建議**延長總沖煮時間至 120-150 秒**，或稍微**調粗研磨度**，以避免萃取不足。")
-        elif time > 180:
-            tips.append("📈 **風味過苦/雜味（細研磨+長時間）**：這通常是過度萃取。建議**調粗研磨度**，或**縮短總沖煮時間至 150-180 秒**。")
-    elif grind_size == "粗研磨 (海鹽狀)":
-        if time < 120:
-            tips.append("📉 **風味淡薄/水感（粗研磨+短時間）**：建議**調細研磨度**，或**延長總沖煮時間至 150-180 秒**，以提升萃取率。")
-        elif 120 <= time <= 180:
-            pass
-        else:
-            tips.append("📈 **風味稀薄/無層次（粗研磨+長時間）**：粗研磨長時間沖煮容易風味不佳。建議**調細研磨度**，並**控制在 120-180 秒內完成沖煮**。")
-    else: # Medium grind
-        if time < 120:
-            tips.append("⏱️ **總沖煮時間偏短**：若風味清淡，可嘗試**延長總沖煮時間至 150-180 秒**，或稍微**調細研磨度**。")
-        elif time > 180:
-            tips.append("⏱️ **總沖煮時間偏長**：若風味有苦澀感，可嘗試**縮短總沖煮時間至 150-180 秒**，或稍微**調粗研磨度**。")
-
-    if ratio < 14:
-        tips.append("⚖️ **粉水比偏低（濃度高）**：若覺得咖啡過於濃郁或苦感重，建議**提升粉水比至 1:15～1:16**，有助於平衡甜感與醇厚度。")
-    elif ratio > 17:
-        tips.append("⚖️ **粉水比偏高（濃度低）**：若風味過淡或產生尖銳酸澀，建議**降低粉水比至 1:15～1:16**，讓咖啡風味更飽滿。")
-
-    if temperature > 94:
-        tips.append("🌡️ **水溫偏高**：若風味有明顯苦味或雜味，建議將水溫**降至 91～93°C**，有助於柔化苦感，突顯咖啡原有風味。")
-    elif temperature < 88:
-        tips.append("🌡️ **水溫偏低**：若風味清淡、酸感突出，建議將水溫**提升至 90°C 以上**，以充分萃取咖啡的甜感與香氣。")
-
-    # 專業模式參數的建議
-    if blooming_time < 20 and blooming_time > 0:
-        tips.append("💧 **悶蒸時間不足**：建議**延長悶蒸時間至 30-40 秒**，充足的悶蒸有助於咖啡粉均勻吸水，提升整體萃取品質與甜感。")
-    elif blooming_time > 40:
-        tips.append("💧 **悶蒸時間過長**：可能導致咖啡粉過度悶蒸而產生苦澀。建議**縮短至 30-40 秒**。")
-    elif blooming_time == 0:
-        tips.append("💧 **未進行悶蒸**：強烈建議至少悶蒸 **30 秒**，這是均勻萃取和釋放咖啡香氣的關鍵步驟。")
-
-
-    if blooming_ratio < 1.8:
-        tips.append("💦 **悶蒸水量偏少**：建議**提升悶蒸水量至粉重的 2-3 倍**，以確保咖啡粉充分潤濕，避免萃取不均。")
-    elif blooming_ratio > 3.0:
-        tips.append("💦 **悶蒸水量偏多**：過多水分可能稀釋悶蒸效果。可考慮稍微**減少悶蒸水量至粉重的 2-3 倍**。")
-
-    if pour_count == 0:
-        tips.append("📈 **未斷水**：建議嘗試**至少 1-2 次斷水**，這有助於分段萃取，提升風味層次與飽滿度，減少過度萃取。")
-    elif pour_count >= 3:
-        tips.append("📉 **斷水次數較多**：若風味過於複雜或酸度突出，可考慮**減少斷水次數至 2 次**，或調整注水方式讓水流更平穩。")
-
-    if not tips:
-        tips.append("👍 **參數配置良好！** 您目前的沖煮參數看起來很平衡。若想進一步優化，可嘗試**微調研磨度**或**變化注水手法**來探索更細緻的風味。")
-    return tips
 
 st.markdown("---")
-# --- Simulation Results Display Section ---
-st.subheader("模擬結果")
-
-# 使用 st.session_state 來獲取所有參數
-acid, sweet, bitter, body = calculate_flavor_profile(
-    st.session_state.ratio,
-    st.session_state.time,
-    st.session_state.temperature,
-    grind_size,
-    process_method,
-    roast_level,
-    blooming_time,
-    blooming_ratio,
-    pour_count
+result_tab, search_tab, explorer_tab, sensitivity_tab, kinetics_tab, robustness_tab, bulk_tab, telemetry_tab = st.tabs(
+    list(TAB_VIEWS), key="tab", on_change=rerun_open_view
 )
 
-st.markdown("#### 📊 風味強度預測")
-
-# --- 使用單一的窄欄位來包含所有進度條，使其垂直顯示但更短 ---
-# 這裡創建了兩個欄位，第一個欄位用於進度條，第二個用於填充空白。
-# 0.3 代表第一個欄位佔總寬度的 30%。你可以調整這個值來控制進度條的長度。
-progress_col, _ = st.columns([0.5, 0.5])
-
-with progress_col:
-    st.write(f"**酸度**")
-    st.progress(acid / 5)
-    st.write(f"**甜感**")
-    st.progress(sweet / 5)
-    st.write(f"**苦味**")
-    st.progress(bitter / 5)
-    st.write(f"**醇厚度**")
-    st.progress(body / 5)
-# --- 結束 columns 區塊 ---
+with result_tab:
+    simulation_panel()
+timer.checkpoint("simulation panel")
+
+# --- Inverse Design Section ---
+# Target and range changes rerun only this tab.
+@st.fragment(key="inverse_design")
+@flavor_debug.timed_panel("inverse design panel", "🛠️ 風味反推配方區塊效能")
+def inverse_design_panel():
+    if open_view() != "inverse_design":
+        return
+    process_method = PROCESS_METHOD_OPTIONS[st.session_state.process_method_index]
+    roast_level = ROAST_LEVEL_OPTIONS[st.session_state.roast_level_index]
+    st.subheader("風味反推配方")
+    st.markdown("設定想要的風味強度，從所有可調整的參數組合中找出風味最接近的配方。")
+
+    target_cols = st.columns(4)
+    target = [
+        target_col.slider(label, 0.0, 5.0, 3.0, step=0.5, key=f"target_{key}")
+        for target_col, (label, key) in zip(
+            target_cols, [("目標酸度", "acid"), ("目標甜感", "sweet"), ("目標苦味", "bitter"), ("目標醇厚度", "body")]
+        )
+    ]
+    keep_beans = st.checkbox("固定目前的處理法與烘焙度", value=True, key="search_keep_beans")
+    temperature_range = st.slider(
+        "水溫範圍（°C）",
+        SLIDER_RANGES["temperature"]["min_value"],
+        SLIDER_RANGES["temperature"]["max_value"],
+        (SLIDER_RANGES["temperature"]["min_value"], SLIDER_RANGES["temperature"]["max_value"]),
+        step=SLIDER_RANGES["temperature"]["step"],
+        key="search_temperature_range",
+    )
+    time_range = st.slider(
+        "總沖煮時間範圍（秒）",
+        SLIDER_RANGES["time"]["min_value"],
+        SLIDER_RANGES["time"]["max_value"],
+        (SLIDER_RANGES["time"]["min_value"], SLIDER_RANGES["time"]["max_value"]),
+        step=SLIDER_RANGES["time"]["step"],
+        key="search_time_range",
+    )
+    result_count = st.number_input("顯示配方數", 1, 20, 5, key="search_result_count")
+
+    matches = load_recipe_index().query(
+        target,
+        k=int(result_count),
+        process_method=process_method if keep_beans else None,
+        roast_level=roast_level if keep_beans else None,
+        bounds={"temperature": temperature_range, "time": time_range},
+    )
+    st.dataframe(
+        flavor_search.results_frame(matches).rename(columns=SEARCH_RESULT_LABELS),
+        hide_index=True,
+    )
 
+    if st.toggle("連續模型梯度最佳化（實驗性）", key="search_smooth"):
+        st.caption("把規則的分段門檻換成平滑轉換，沿梯度調整參數，最後對齊滑桿刻度並以原模型評分。")
+        optimized = optimize_smooth_recipe(
+            tuple(target),
+            process_method=process_method if keep_beans else None,
+            roast_level=roast_level if keep_beans else None,
+            bounds={"temperature": temperature_range, "time": time_range},
+        )
+        st.dataframe(
+            flavor_search.results_frame([{"distance": optimized["loss"] ** 0.5, **optimized}]).rename(columns=SEARCH_RESULT_LABELS),
+            hide_index=True,
+        )
+        st.caption(f"共評估 {optimized['evaluations']:,} 組參數。")
+
+
+with search_tab:
+    inverse_design_panel()
+timer.checkpoint("inverse design")
+
+# --- Recipe Explorer Section ---
+# Every filter change reruns only this tab; a query is a few bitmap ANDs over the
+# recipe space, with the match count of each facet value shown next to it.
+@st.fragment(key="explorer")
+@flavor_debug.timed_panel("explorer panel", "🛠️ 配方探索區塊效能")
+def explorer_panel():
+    if open_view() != "explorer":
+        return
+    st.subheader("配方探索")
+    st.markdown("以風味與參數條件篩選所有可調整的配方組合，即時顯示符合條件的配方數量與範例。")
+
+    # The query runs before the widgets are drawn (widget values are already in
+    # session_state), so the counts next to each option belong to the current filters.
+    numeric = ("ratio", "time", "temperature", "blooming_time", "blooming_ratio", "pour_count")
+    selectors = ("grind_size", "process_method", "roast_level")
+    defaults = {name: (0.0, 5.0) for name in flavor_heatmap.FLAVOR_LABELS}
+    defaults.update({name: list(flavor_heatmap.axis_values(name)) for name in selectors})
+    defaults.update({name: (SLIDER_RANGES[name]["min_value"], SLIDER_RANGES[name]["max_value"]) for name in numeric})
+    filters = {name: st.session_state.get(f"explorer_{name}", default) for name, default in defaults.items()}
+    result = load_facet_index().query(filters, sample=10)
+    facets = result["facets"]
+
+    for flavor_col, name in zip(st.columns(4), flavor_heatmap.FLAVOR_LABELS):
+        flavor_col.slider(
+            flavor_heatmap.FLAVOR_LABELS[name], 0.0, 5.0, defaults[name], step=0.5, key=f"explorer_{name}"
+        )
+    for option_col, name in zip(st.columns(3), selectors):
+        option_col.multiselect(
+            flavor_heatmap.PARAM_LABELS[name], defaults[name], default=defaults[name], key=f"explorer_{name}",
+            format_func=lambda option, name=name: f"{option}（{facets[name][option]:,}）",
+        )
+    numeric_cols = st.columns(3)
+    for i, name in enumerate(numeric):
+        numeric_cols[i % 3].slider(
+            flavor_heatmap.PARAM_LABELS[name], value=defaults[name], key=f"explorer_{name}", **SLIDER_RANGES[name]
+        )
+
+    count_col, combination_col = st.columns(2)
+    count_col.metric("符合的配方數", f"{result['count']:,}")
+    combination_col.metric("風味相同的參數組合", f"{result['combinations']:,}")
+    if result["sample"]:
+        st.dataframe(
+            [{SEARCH_RESULT_LABELS[name]: value for name, value in recipe.items()} for recipe in result["sample"]],
+            hide_index=True,
+        )
+    with st.expander("各條件的配方數分布"):
+        for name in (*flavor_heatmap.FLAVOR_LABELS, *numeric):
+            label = flavor_heatmap.FLAVOR_LABELS.get(name) or flavor_heatmap.PARAM_LABELS[name]
+            # Generic column names: labels such as "粉水比（1:X）" would be parsed as Altair shorthand.
+            st.bar_chart(
+                {"value": list(facets[name]), "count": list(facets[name].values())},
+                x="value", y="count", x_label=label, y_label="配方數", height=160,
+            )
+
+with explorer_tab:
+    explorer_panel()
+timer.checkpoint("recipe explorer")
+
+# --- Sensitivity Section ---
+@st.fragment(key="sensitivity")
+@flavor_debug.timed_panel("sensitivity panel", "🛠️ 參數敏感度區塊效能")
+def sensitivity_panel():
+    if open_view() != "sensitivity":
+        return
+    st.subheader("參數敏感度")
+    st.markdown("其他參數固定為側欄目前的設定，觀察兩個參數同時變化時各風味維度的強度。")
+
+    x_col, y_col = st.columns(2)
+    x_axis = x_col.selectbox(
+        "橫軸參數", flavor_heatmap.PARAM_LABELS, index=0, format_func=flavor_heatmap.PARAM_LABELS.get, key="heatmap_x"
+    )
+    y_axis = y_col.selectbox(
+        "縱軸參數", flavor_heatmap.PARAM_LABELS, index=1, format_func=flavor_heatmap.PARAM_LABELS.get, key="heatmap_y"
+    )
+    if x_axis == y_axis:
+        st.info("請選擇兩個不同的參數。")
+        return
+
+    recipe = current_recipe()
+    fixed = tuple((name, value) for name, value in recipe.items() if name not in (x_axis, y_axis))
+    _, _, scores = sensitivity_scores(x_axis, y_axis, fixed)
+    st.image(flavor_heatmap.heatmap_image(load_heatmap_frame(x_axis, y_axis), scores))
+    st.caption(
+        f"目前設定：{flavor_heatmap.PARAM_LABELS[x_axis]} = {recipe[x_axis]}，"
+        f"{flavor_heatmap.PARAM_LABELS[y_axis]} = {recipe[y_axis]}"
+    )
 
-st.markdown("#### 📜 可能風味敘述")
-notes = suggest_flavor_notes(acid, sweet, bitter, body, process_method, roast_level)
-for note in notes:
-    st.markdown(f"- {note}")
 
-st.markdown("---")
+with sensitivity_tab:
+    sensitivity_panel()
+timer.checkpoint("sensitivity heatmaps")
+
+# --- Extraction Kinetics Section ---
+@st.fragment(key="kinetics")
+@flavor_debug.timed_panel("kinetics panel", "🛠️ 萃取動力學區塊效能")
+def kinetics_panel():
+    if open_view() != "kinetics":
+        return
+    st.subheader("萃取動力學")
+    st.markdown(
+        "以溫度與研磨度決定的萃取速率，依悶蒸與分段注水的時間表模擬酸類、糖類與苦味物質隨時間溶出的過程。"
+        "此為實驗性的物理模型，與規則式的模擬結果互為參照。"
+    )
+    recipe = current_recipe()
+    curves, summary = simulate_extraction(**recipe)
+
+    ey_col, tds_col = st.columns(2)
+    ey_col.metric("萃取率 (EY)", f"{summary['ey']:.1f}%")
+    tds_col.metric("濃度 (TDS)", f"{summary['tds']:.2f}%")
+    st.markdown("#### 各成分萃取率（% 粉重）")
+    st.line_chart(curves, x_label="時間（秒）", y_label="萃取率（%）")
+
+    st.markdown("#### 風味強度（0–5）")
+    rule_scores = calculate_flavor_profile(**recipe)
+    st.dataframe(
+        {
+            "風味": [SEARCH_RESULT_LABELS[name] for name in summary["scores"]],
+            "動力學模型": [round(score, 2) for score in summary["scores"].values()],
+            "規則模型": list(rule_scores),
+        },
+        hide_index=True,
+    )
+
+
+with kinetics_tab:
+    kinetics_panel()
+timer.checkpoint("extraction kinetics")
+
+# --- Robustness Section ---
+# The report runs only while the tab is open and 執行分析 is on; it is cached per
+# (recipe, samples, seed), so returning to an earlier recipe is instant.
+@st.fragment(key="robustness")
+@flavor_debug.timed_panel("robustness panel", "🛠️ 穩定度分析區塊效能")
+def robustness_panel():
+    if open_view() != "robustness":
+        return
+    st.subheader("穩定度分析")
+    noise = flavor_robustness.NOISE
+    st.markdown(
+        "實際沖煮時水溫會飄移、研磨粒徑不一、注水時間也會有誤差。此分析以目前的配方為中心，"
+        f"隨機產生大量帶有誤差的沖煮（水溫 ±{noise['temperature']:g}°C、總時間 ±{noise['time']:g} 秒、"
+        f"悶蒸時間 ±{noise['blooming_time']:g} 秒、粉水比 ±{noise['ratio']:g}、悶蒸水量 ±{noise['blooming_ratio']:g} 倍，"
+        f"並有 {flavor_robustness.GRIND_SHIFT:.0%} 機率落到相鄰研磨度），觀察風味的分布。"
+    )
+    samples_col, seed_col = st.columns(2)
+    samples = samples_col.select_slider(
+        "模擬次數", [1_000, 10_000, 100_000], value=flavor_robustness.DEFAULT_SAMPLES, key="robustness_samples"
+    )
+    seed = seed_col.number_input("隨機種子", 0, 9999, flavor_robustness.DEFAULT_SEED, key="robustness_seed")
+    if not st.toggle("執行分析", key="robustness_run", help="開啟時，配方或上方設定變更後會自動重新分析"):
+        st.info("開啟「執行分析」以目前的配方進行模擬。")
+        return
+
+    report = robustness_report(tuple(current_recipe().items()), samples, int(seed))
+    stability_col, under_col, over_col = st.columns(3)
+    stability_col.metric(
+        "穩定度", f"{report['stability']:.0%}",
+        help=f"四項風味皆與目前設定相差不超過 {flavor_robustness.STABILITY_TOLERANCE:g} 的比例",
+    )
+    under_col.metric("落入萃取不足區間", f"{report['p_under']:.1%}")
+    over_col.metric("落入過度萃取區間", f"{report['p_over']:.1%}")
+
+    st.markdown("#### 各風味分布")
+    st.dataframe(
+        {
+            "風味": [SEARCH_RESULT_LABELS[name] for name in report["nominal"]],
+            "目前設定": list(report["nominal"].values()),
+            "平均": [round(value, 2) for value in report["mean"].values()],
+            "標準差": [round(value, 2) for value in report["std"].values()],
+            "P5": list(report["p5"].values()),
+            "P50": list(report["p50"].values()),
+            "P95": list(report["p95"].values()),
+        },
+        hide_index=True,
+    )
+    # Bin labels as strings keep the x axis categorical (one bar per 0.1 step).
+    histograms = {"風味強度": [f"{value:.1f}" for value in flavor_robustness.HISTOGRAM_BINS]}
+    histograms.update({SEARCH_RESULT_LABELS[name]: counts for name, counts in report["histograms"].items()})
+    st.bar_chart(histograms, x="風味強度", x_label="風味強度", y_label="次數", stack=False)
+
+    if report["tip_rates"]:
+        st.markdown("#### 各調整建議出現的比例")
+        for tip, rate in sorted(report["tip_rates"].items(), key=lambda item: -item[1]):
+            st.markdown(f"- **{rate:.1%}** {tip}")
+
+
+with robustness_tab:
+    robustness_panel()
+timer.checkpoint("robustness analysis")
+
+# --- Bulk Scoring Section ---
+# Uploaded brew logs are scored chunk by chunk into a per-session temporary directory
+# (removed with the session); downloads read the files only when clicked.
+@st.fragment(key="bulk")
+@flavor_debug.timed_panel("bulk panel", "🛠️ 批次評分區塊效能")
+def bulk_panel():
+    st.subheader("批次評分")
+    st.markdown(
+        "上傳沖煮紀錄 CSV，每列一次沖煮，欄位為 "
+        + "、".join(f"`{name}`" for name in flavor_bulk.PARAM_COLUMNS)
+        + "（研磨度、處理法、烘焙度請使用側欄的中文選項）。格式有誤的列會另存為錯誤清單，不會中斷評分。"
+    )
+    st.caption("超過上傳上限的大型檔案請使用命令列：`python flavor_bulk.py 紀錄.csv 結果.csv`")
+    upload = st.file_uploader("沖煮紀錄", type="csv", key="bulk_upload")
+    if upload is None:
+        return
+    if st.button("開始評分", key="bulk_start"):
+        workdir = tempfile.TemporaryDirectory(prefix="flavor_bulk_")
+        output = Path(workdir.name) / "scored.csv"
+        status = st.empty()
+        try:
+            counts = flavor_bulk.score_brew_log_file(
+                upload, output, progress=lambda rows: status.text(f"已處理 {rows:,} 列…")
+            )
+        except flavor_bulk.BrewLogError as error:
+            workdir.cleanup()
+            status.error(f"無法評分此檔案：{error}")
+            return
+        status.empty()
+        st.session_state.bulk_result = {"workdir": workdir, "output": output, "counts": counts, "name": upload.name}
+
+    result = st.session_state.get("bulk_result")
+    if result is None:
+        return
+    counts, output = result["counts"], result["output"]
+    stem = Path(result["name"]).stem
+    rows_col, scored_col, rejected_col = st.columns(3)
+    rows_col.metric("總列數", f"{counts['rows']:,}")
+    scored_col.metric("完成評分", f"{counts['scored']:,}")
+    rejected_col.metric("錯誤列", f"{counts['rejected']:,}")
+    downloads = (
+        ("下載評分結果", output, "scored.csv", "text/csv", False),
+        ("下載錯誤清單", output.with_name("scored.rejects.csv"), "rejects.csv", "text/csv", not counts["rejected"]),
+        ("下載建議代碼對照", output.with_name("scored.tips.json"), "tips.json", "application/json", False),
+    )
+    for column, (label, path, suffix, mime, disabled) in zip(st.columns(len(downloads)), downloads):
+        column.download_button(
+            label,
+            functools.partial(path.read_bytes),
+            file_name=f"{stem}.{suffix}",
+            mime=mime,
+            on_click="ignore",
+            disabled=disabled,
+            key=f"bulk_download_{suffix}",
+        )
+
+
+with bulk_tab:
+    bulk_panel()
+timer.checkpoint("bulk scoring")
+
+# --- Live Brewing Section ---
+# While the hub is active the browser reruns this fragment every TELEMETRY_REFRESH_SECONDS;
+# each rerun only rescores the brews that received events since the last one. run_every is
+# fixed when the fragment is defined, so starting or finishing live brews reruns the app.
+@flavor_debug.timed_panel("telemetry panel", "🛠️ 即時沖煮區塊效能")
+def telemetry_panel(refreshing):
+    hub = load_telemetry_hub()
+    st.subheader("即時沖煮")
+    st.markdown(
+        "連線的手沖壺與電子秤在沖煮時持續回報水溫與注水重量，這裡即時換算出目前的粉水比、悶蒸、斷水次數與沖煮時間，"
+        "並預測風味與調整建議。"
+    )
+    st.caption(
+        "裝置以每行一筆 JSON 傳送至本機連接埠（`FLAVOR_TELEMETRY_PORT`）或附加寫入檔案（`FLAVOR_TELEMETRY_FILE`）；"
+        "錄製的紀錄可用 `python flavor_telemetry.py replay 紀錄.jsonl` 重播。"
+    )
+    if st.button("以目前配方模擬一次沖煮", key="telemetry_demo", disabled=hub.demo_running()):
+        brew = f"示範 {len(hub.brews) + 1}"
+        lines = [json.dumps(event, ensure_ascii=False) for event in flavor_telemetry.synthetic_trace(current_recipe(), brew=brew)]
+        if hub.start_demo(lines, TELEMETRY_DEMO_SPEED) and not refreshing:
+            st.rerun()
+
+    predictions = hub.predict()
+    if refreshing and not hub.active():
+        st.rerun()
+    if not predictions:
+        st.info("目前沒有進行中的沖煮。")
+        return
+    st.dataframe(
+        [
+            {
+                "沖煮": brew,
+                "狀態": "完成" if prediction["ended"] else "進行中",
+                "時間（秒）": round(prediction["live"]["time"]),
+                "水溫": round(prediction["live"]["temperature"], 1),
+                "粉水比": round(prediction["live"]["ratio"], 1),
+                "悶蒸時間": round(prediction["live"]["blooming_time"]),
+                "悶蒸水量": round(prediction["live"]["blooming_ratio"], 1),
+                "斷水次數": prediction["live"]["pour_count"],
+                **{SEARCH_RESULT_LABELS[name]: value for name, value in prediction["profile"].items()},
+            }
+            for brew, prediction in sorted(predictions.items())
+        ],
+        hide_index=True,
+    )
+    brew = st.selectbox("查看沖煮", sorted(predictions), key="telemetry_brew")
+    prediction = predictions[brew]
+    for column, (name, value) in zip(st.columns(len(prediction["profile"])), prediction["profile"].items()):
+        column.metric(SEARCH_RESULT_LABELS[name], f"{value:.1f}")
+    st.markdown("#### 目前的調整建議")
+    for tip in prediction["tips"]:
+        st.markdown(f"- {tip}")
+    st.caption(f"已接收 {hub.events:,} 筆事件（{hub.rejected:,} 筆格式錯誤）。")
 
-st.markdown("#### 📌 建議調整方向")
-tips = adjustment_tips(
-    st.session_state.ratio,
-    st.session_state.time,
-    st.session_state.temperature,
-    grind_size,
-    blooming_time,
-    blooming_ratio,
-    pour_count
-)
-for tip in tips:
-    st.markdown(f"{tip}")
+
+with telemetry_tab:
+    telemetry_refresh = TELEMETRY_REFRESH_SECONDS if load_telemetry_hub().active() else None
+    st.fragment(telemetry_panel, key="telemetry", run_every=telemetry_refresh)(telemetry_refresh is not None)
+timer.checkpoint("live telemetry")
 
 st.markdown("---")
 
@@ -495,4 +780,11 @@ with knowledge_col:
         * **中烘焙 (Medium Roast)：** 豆子發展均衡，酸甜苦醇厚度達到良好平衡。風味常有**堅果、焦糖、巧克力**等調性，口感圓潤，層次豐富。
         * **深烘焙 (Dark Roast)：** 豆子發展度高，許多原始酸質和花果香會被烘焙風味取代。風味通常有**濃郁的煙燻、焦糖、烘烤、黑巧克力**等苦甜感，醇厚度高，口感強勁。
         """)
-# --- 結束 columns 區塊 ---
\ No newline at end of file
+# --- 結束 columns 區塊 ---
+timer.checkpoint("knowledge expanders")
+
+# --- Debug Panel ---
+# Rendered after the timer stops, so the panel itself is not part of the numbers.
+debug_record = timer.finish()
+if debug_record is not None:
+    flavor_debug.render_debug_panel(debug_record, timer.profile_text)
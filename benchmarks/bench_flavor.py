@@ -0,0 +1,299 @@
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import time
+from pathlib import Path
+
+# Single-threaded math libraries keep numbers comparable between runs and machines.
+for _var in ("OMP_NUM_THREADS", "OPENBLAS_NUM_THREADS", "MKL_NUM_THREADS"):
+    os.environ.setdefault(_var, "1")
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+import numpy as np  # noqa: E402
+
+import flavor_batch  # noqa: E402
+import flavor_engine  # noqa: E402
+from flavor_engine import GRIND_SIZE_OPTIONS, PROCESS_METHOD_OPTIONS, ROAST_LEVEL_OPTIONS  # noqa: E402
+from flavor_space import slider_values  # noqa: E402
+
+APP_PATH = ROOT / "Coffee_Brewing_Simulator_v4.py"
+SEED = 20240601
+
+
+# --- Timing Helpers ---
+def measure(func, ops=1, repeat=7, min_time=0.05):
+    """Median and best seconds per op; each sample loops func until it runs for min_time."""
+    func()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time:
+            break
+        loops *= 2
+    samples = [elapsed]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        samples.append(time.perf_counter() - started)
+    per_op = [sample / (loops * ops) for sample in samples]
+    return {"median_s": statistics.median(per_op), "min_s": min(per_op), "ops_per_sample": loops * ops}
+
+
+def random_recipes(n, rng):
+    return {
+        "ratio": rng.choice(slider_values("ratio"), n),
+        "time": rng.choice(slider_values("time"), n),
+        "temperature": rng.choice(slider_values("temperature"), n),
+        "grind_size": rng.integers(0, len(GRIND_SIZE_OPTIONS), n),
+        "process_method": rng.integers(0, len(PROCESS_METHOD_OPTIONS), n),
+        "roast_level": rng.integers(0, len(ROAST_LEVEL_OPTIONS), n),
+        "blooming_time": rng.choice(slider_values("blooming_time"), n),
+        "blooming_ratio": rng.choice(slider_values("blooming_ratio"), n),
+        "pour_count": rng.choice(slider_values("pour_count"), n),
+    }
+
+
+def scalar_rows(recipes):
+    """Recipes as python argument tuples with option labels, as the app passes them."""
+    rows = []
+    for i in range(len(recipes["ratio"])):
+        rows.append((
+            float(recipes["ratio"][i]), int(recipes["time"][i]), int(recipes["temperature"][i]),
+            GRIND_SIZE_OPTIONS[recipes["grind_size"][i]], PROCESS_METHOD_OPTIONS[recipes["process_method"][i]],
+            ROAST_LEVEL_OPTIONS[recipes["roast_level"][i]], int(recipes["blooming_time"][i]),
+            float(recipes["blooming_ratio"][i]), int(recipes["pour_count"][i]),
+        ))
+    return rows
+
+
+def cycling(func, rows):
+    """A zero-argument callable that feeds func a different row on every call."""
+    state = {"i": 0}
+
+    def call():
+        row = rows[state["i"] % len(rows)]
+        state["i"] += 1
+        return func(*row)
+
+    return call
+
+
+def _quiet_streamlit():
+    # Outside `streamlit run` every cached call logs a "no runtime" warning.
+    import streamlit.logger
+
+    streamlit.logger.set_log_level("error")
+
+
+# --- Benchmarks ---
+def bench_functions(results, rng):
+    # "cold" text lookups clear the table caches first, so they time one miss plus the clear.
+    rows = scalar_rows(random_recipes(4096, rng))
+    profiles = [flavor_engine.calculate_flavor_profile(*row) for row in rows]
+    note_rows = [(*profile, row[4], row[5]) for profile, row in zip(profiles, rows)]
+    tip_rows = [(row[0], row[1], row[2], row[3], row[6], row[7], row[8]) for row in rows]
+
+    results["calculate_flavor_profile.cold"] = measure(cycling(flavor_engine.calculate_flavor_profile, rows))
+
+    def notes_cold():
+        flavor_engine._flavor_notes_table.cache_clear()
+        return flavor_engine.suggest_flavor_notes(*note_rows[0])
+
+    def tips_cold():
+        flavor_engine._adjustment_tips_table.cache_clear()
+        return flavor_engine.adjustment_tips(*tip_rows[0])
+
+    results["suggest_flavor_notes.cold"] = measure(notes_cold)
+    results["adjustment_tips.cold"] = measure(tips_cold)
+    flavor_engine.warm_text_tables()
+    results["suggest_flavor_notes.cached"] = measure(cycling(flavor_engine.suggest_flavor_notes, note_rows))
+    results["adjustment_tips.cached"] = measure(cycling(flavor_engine.adjustment_tips, tip_rows))
+    return rows
+
+
+def bench_streamlit_cache(results, rows):
+    import streamlit as st
+
+    _quiet_streamlit()
+    cached = st.cache_data(flavor_engine.calculate_flavor_profile)
+    # Cold: every call is a miss, so this is hashing + evaluation + pickling into the cache.
+    cold_rows = iter([(row[0] + i * 1e-9, *row[1:]) for i, row in enumerate(rows * 64)])
+    results["st.cache_data.calculate_flavor_profile.cold"] = measure(lambda: cached(*next(cold_rows)), repeat=3, min_time=0.02)
+    results["st.cache_data.calculate_flavor_profile.cached"] = measure(cycling(cached, rows[:16]))
+
+
+def bench_batch(results, rng, n):
+    recipes = random_recipes(n, rng)
+    columns = [recipes[name] for name in flavor_batch.PARAM_COLUMNS]
+    tip_columns = [recipes[name] for name in ("ratio", "time", "temperature", "grind_size", "blooming_time", "blooming_ratio", "pour_count")]
+    results["calculate_flavor_profile_batch"] = measure(lambda: flavor_batch.calculate_flavor_profile_batch(*columns), ops=n, repeat=5)
+    results["adjustment_tip_codes_batch"] = measure(lambda: flavor_batch.adjustment_tip_codes_batch(*tip_columns), ops=n, repeat=5)
+    return recipes
+
+
+def bench_lookup(results, recipes, rows):
+    import flavor_table
+
+    try:
+        table = flavor_table.open_table()
+    except (FileNotFoundError, flavor_table.StaleTableError):
+        return False
+    columns = [recipes[name] for name in flavor_batch.PARAM_COLUMNS]
+    n = len(columns[0])
+    # Fault the memory-mapped pages in first; page-cache misses are not what this measures.
+    for row in rows:
+        table.lookup(*row)
+    results["flavor_table.lookup"] = measure(cycling(table.lookup, rows))
+    results["flavor_table.lookup_batch"] = measure(lambda: table.lookup_batch(*columns), ops=n, repeat=5)
+    return True
+
+
+def bench_search(results):
+    import flavor_search
+
+    started = time.perf_counter()
+    index = flavor_search.recipe_index()
+    elapsed = time.perf_counter() - started
+    results["flavor_search.build"] = {"median_s": elapsed, "min_s": elapsed, "ops_per_sample": 1}
+    results["flavor_search.query"] = measure(lambda: index.query((3, 4.5, 1.5, 3), k=5))
+    results["flavor_search.query.fixed_beans"] = measure(lambda: index.query((3, 4.5, 1.5, 3), k=5, process_method="水洗", roast_level="中烘焙"))
+
+
+def bench_facets(results):
+    import flavor_facets
+
+    started = time.perf_counter()
+    index = flavor_facets.facet_index()
+    elapsed = time.perf_counter() - started
+    results["flavor_facets.build"] = {"median_s": elapsed, "min_s": elapsed, "ops_per_sample": 1}
+    results["flavor_facets.query"] = measure(lambda: index.query({
+        "bitter": (0, 2), "sweet": (4, 5), "process_method": ("水洗", "蜜處理"), "temperature": (90, 93),
+    }))
+    results["flavor_facets.query.unfiltered"] = measure(lambda: index.query())
+
+
+def bench_robustness(results):
+    import flavor_robustness
+    from flavor_space import DEFAULT_RECIPE
+
+    recipe = tuple(DEFAULT_RECIPE.items())
+    n = flavor_robustness.DEFAULT_SAMPLES
+    results["flavor_robustness.report"] = measure(lambda: flavor_robustness.robustness_report(recipe, n), ops=n, repeat=5)
+
+
+def bench_smooth(results):
+    import flavor_smooth
+
+    results["flavor_smooth.optimize"] = measure(
+        lambda: flavor_smooth.optimize_target((3.0, 3.0, 3.0, 3.0), process_method="水洗", roast_level="中烘焙"), repeat=5
+    )
+
+
+def bench_telemetry(results):
+    import json
+
+    import flavor_telemetry
+
+    # 200 concurrent brews at 10 readings/s, scored once per 2000 events (about a second of traffic).
+    lines = [json.dumps(event, ensure_ascii=False) for event in flavor_telemetry.synthetic_session(200, stagger=0.5)]
+
+    def ingest():
+        hub = flavor_telemetry.TelemetryHub()
+        for start in range(0, len(lines), 2000):
+            hub.ingest_lines(lines[start:start + 2000])
+            hub.predict()
+
+    results["flavor_telemetry.ingest"] = measure(ingest, ops=len(lines), repeat=3)
+
+
+def bench_app(results, reruns):
+    from streamlit.testing.v1 import AppTest
+
+    _quiet_streamlit()
+    started = time.perf_counter()
+    app = AppTest.from_file(str(APP_PATH), default_timeout=120).run()
+    first = time.perf_counter() - started
+    if app.exception:
+        raise RuntimeError(f"app raised during benchmark: {app.exception}")
+
+    values = slider_values("ratio")
+    samples = []
+    for i in range(reruns):
+        app.sidebar.slider(key="ratio").set_value(values[i % len(values)])
+        started = time.perf_counter()
+        app.run()
+        samples.append(time.perf_counter() - started)
+    results["app.first_run"] = {"median_s": first, "min_s": first, "ops_per_sample": 1}
+    results["app.rerun"] = {"median_s": statistics.median(samples), "min_s": min(samples), "ops_per_sample": reruns}
+
+
+# --- Baseline Comparison ---
+def compare(results, baseline, tolerance):
+    """Names whose median per-op time grew by more than `tolerance` (fraction) over the baseline."""
+    regressions = []
+    for name, result in results.items():
+        reference = baseline.get("results", {}).get(name)
+        if reference and result["median_s"] > reference["median_s"] * (1 + tolerance):
+            regressions.append((name, reference["median_s"], result["median_s"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Micro-benchmarks for the simulator hot paths.")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (fraction)")
+    parser.add_argument("--batch-size", type=int, default=1_000_000)
+    parser.add_argument("--reruns", type=int, default=20, help="AppTest reruns to time")
+    parser.add_argument("--skip-app", action="store_true", help="skip the Streamlit AppTest benchmarks")
+    args = parser.parse_args(argv)
+
+    rng = np.random.default_rng(SEED)
+    results = {}
+    rows = bench_functions(results, rng)
+    bench_batch_recipes = bench_batch(results, rng, args.batch_size)
+    bench_lookup(results, bench_batch_recipes, rows)
+    bench_search(results)
+    bench_facets(results)
+    bench_robustness(results)
+    bench_smooth(results)
+    bench_telemetry(results)
+    if not args.skip_app:
+        bench_streamlit_cache(results, rows)
+        bench_app(results, args.reruns)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "machine": platform.machine(),
+            "processor": platform.processor(),
+            "cpu_count": os.cpu_count(),
+            "seed": SEED,
+        },
+        "results": results,
+    }
+    for name, result in results.items():
+        print(f"{name:50s} {result['median_s'] * 1e6:14.3f} us/op (best {result['min_s'] * 1e6:.3f})")
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for name, before, after in regressions:
+            print(f"REGRESSION {name}: {before * 1e6:.3f} -> {after * 1e6:.3f} us/op", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
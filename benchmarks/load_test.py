@@ -0,0 +1,295 @@
+import argparse
+import gc
+import json
+import logging
+import multiprocessing
+import os
+import platform
+import random
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from pathlib import Path
+
+import numpy as np
+
+# bench_flavor also puts the repository root on sys.path.
+from bench_flavor import APP_PATH, _quiet_streamlit
+from flavor_engine import DEFAULT_PARAMS, GRIND_SIZE_OPTIONS, PROCESS_METHOD_OPTIONS, ROAST_LEVEL_OPTIONS
+from flavor_space import slider_values
+
+# --- Interaction Traces ---
+# A trace is the list of widget interactions of one barista session, as JSON-ready dicts:
+#     {"action": "slider", "key": "ratio", "value": 14.5}
+#     {"action": "radio" | "selectbox", "key": <widget key>, "value": <option label>}
+#     {"action": "reset"}
+# A slider drag is several consecutive slider actions one step apart, as the browser
+# sends while the handle moves.
+SLIDER_KEYS = ("ratio", "time", "temperature", "blooming_time", "blooming_ratio", "pour_count")
+SELECTORS = {
+    "grind_size_selector_widget": ("radio", GRIND_SIZE_OPTIONS, "grind_size_index"),
+    "process_method_selector_widget": ("selectbox", PROCESS_METHOD_OPTIONS, "process_method_index"),
+    "roast_level_selector_widget": ("selectbox", ROAST_LEVEL_OPTIONS, "roast_level_index"),
+}
+RESET_KEY = "reset_params"
+# Relative frequency of drags, selector changes and resets.
+ACTION_WEIGHTS = {"drag": 0.7, "select": 0.25, "reset": 0.05}
+DRAG_STEPS = (2, 6)
+
+DEFAULT_CONCURRENCY = "1,2,4,8"
+DEFAULT_ACTIONS = 30
+DEFAULT_TIMEOUT = 120
+SEED = 20240601
+
+
+def _default_state():
+    state = {key: DEFAULT_PARAMS[key] for key in SLIDER_KEYS}
+    for key, (_, options, index_key) in SELECTORS.items():
+        state[key] = options[DEFAULT_PARAMS[index_key]]
+    return state
+
+
+def make_trace(rng, length):
+    """A random session of about `length` interactions starting from the default recipe."""
+    state = _default_state()
+    trace = []
+    while len(trace) < length:
+        kind = rng.choices(list(ACTION_WEIGHTS), weights=list(ACTION_WEIGHTS.values()))[0]
+        if kind == "drag":
+            key = rng.choice(SLIDER_KEYS)
+            values = slider_values(key)
+            position = values.index(state[key]) if state[key] in values else 0
+            direction = rng.choice((-1, 1))
+            for _ in range(rng.randint(*DRAG_STEPS)):
+                position = min(max(position + direction, 0), len(values) - 1)
+                state[key] = values[position]
+                trace.append({"action": "slider", "key": key, "value": state[key]})
+        elif kind == "select":
+            key = rng.choice(list(SELECTORS))
+            widget, options, _ = SELECTORS[key]
+            state[key] = rng.choice([option for option in options if option != state[key]])
+            trace.append({"action": widget, "key": key, "value": state[key]})
+        else:
+            state = _default_state()
+            trace.append({"action": "reset"})
+    return trace[:length]
+
+
+# --- Session Replay ---
+# Each Streamlit session runs its script on its own thread of the one server process.
+# AppTest swaps process-global runtime state on every run, so runs from different
+# sessions cannot overlap here; APP_LOCK serialises them and the time spent waiting
+# for it counts towards the rerun latency, like a CPU-bound server holding the GIL.
+APP_LOCK = threading.Lock()
+
+
+def _quiet():
+    _quiet_streamlit()
+    # AppTest runs reapply the configured log level, and every AppTest created afterwards
+    # would warn that the main thread has no script context.
+    logging.getLogger("streamlit.runtime.scriptrunner_utils.script_run_context").disabled = True
+
+
+def resident_bytes():
+    """Current resident set size of this process (peak RSS where /proc is unavailable)."""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except OSError:
+        import resource
+
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak if sys.platform == "darwin" else peak * 1024
+
+
+def _find_widget(app, action):
+    elements = {
+        "slider": app.sidebar.slider,
+        "radio": app.sidebar.radio,
+        "selectbox": app.sidebar.selectbox,
+        "reset": app.sidebar.button,
+    }[action["action"]]
+    try:
+        return elements(key=action.get("key", RESET_KEY))
+    except KeyError:
+        return None
+
+
+class Session:
+    """One simulated browser session: its own AppTest, and so its own st.session_state."""
+
+    def __init__(self, trace, think_time=0.0):
+        from streamlit.testing.v1 import AppTest
+
+        self.trace = trace
+        self.think_time = think_time
+        with APP_LOCK:
+            self.app = AppTest.from_file(str(APP_PATH), default_timeout=DEFAULT_TIMEOUT)
+        self.start_seconds = None
+        self.latencies = []  # (action, seconds) per interaction
+        self.resyncs = 0
+
+    def _run(self):
+        started = time.perf_counter()
+        with APP_LOCK:
+            self.app.run()
+        elapsed = time.perf_counter() - started
+        if self.app.exception:
+            raise RuntimeError(f"app raised during load test: {self.app.exception}")
+        return elapsed
+
+    def replay(self):
+        self.start_seconds = self._run()
+        for action in self.trace:
+            widget = _find_widget(self.app, action)
+            if widget is None:
+                # AppTest keeps only the elements of the latest run; after a fragment rerun
+                # the main-script widgets (the reset button) are missing from its tree. An
+                # untimed full rerun brings them back, where a browser would still show them.
+                self._run()
+                self.resyncs += 1
+                widget = _find_widget(self.app, action)
+            if action["action"] == "reset":
+                widget.click()
+            else:
+                widget.set_value(action["value"])
+            self.latencies.append((action["action"], self._run()))
+            if self.think_time:
+                time.sleep(self.think_time)
+        return self
+
+
+# --- Load Levels ---
+def percentiles(seconds):
+    if not seconds:
+        return {"p50_ms": None, "p90_ms": None, "p99_ms": None, "max_ms": None}
+    p50, p90, p99 = np.percentile(seconds, [50, 90, 99]) * 1000
+    return {"p50_ms": float(p50), "p90_ms": float(p90), "p99_ms": float(p99), "max_ms": max(seconds) * 1000}
+
+
+def run_level(traces, concurrency, think_time=0.0):
+    """Replays `concurrency` sessions at once in this process, as one Streamlit server runs them."""
+    gc.collect()
+    rss_before = resident_bytes()
+    sessions = [Session(traces[i % len(traces)], think_time) for i in range(concurrency)]
+    # Sessions start together, like baristas opening the page at the same time.
+    barrier = threading.Barrier(concurrency)
+
+    def replay(session):
+        barrier.wait()
+        return session.replay()
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        sessions = list(pool.map(replay, sessions))
+    wall = time.perf_counter() - started
+    # Measured while every session (and its state) is still alive.
+    rss_after = resident_bytes()
+
+    reruns = [seconds for session in sessions for _, seconds in session.latencies]
+    by_action = {}
+    for session in sessions:
+        for action, seconds in session.latencies:
+            by_action.setdefault(action, []).append(seconds)
+    return {
+        "concurrency": concurrency,
+        "reruns": len(reruns),
+        "wall_s": wall,
+        "throughput_rps": len(reruns) / wall if wall else 0.0,
+        "rerun": percentiles(reruns),
+        "session_start": percentiles([session.start_seconds for session in sessions]),
+        "by_action_p50_ms": {action: percentiles(seconds)["p50_ms"] for action, seconds in by_action.items()},
+        "resyncs": sum(session.resyncs for session in sessions),
+        "rss_mb": rss_after / 2**20,
+        "rss_per_session_mb": (rss_after - rss_before) / 2**20 / concurrency,
+    }
+
+
+def _level_worker(traces, concurrency, think_time):
+    _quiet()
+    # One untimed session fills the process-wide caches, as on a server that has been up a while.
+    Session([]).replay()
+    return run_level(traces, concurrency, think_time)
+
+
+def measure_level(traces, concurrency, think_time=0.0):
+    """run_level in a fresh interpreter, so every level starts from the same warm-cache RSS."""
+    context = multiprocessing.get_context("spawn")
+    with ProcessPoolExecutor(max_workers=1, mp_context=context) as pool:
+        return pool.submit(_level_worker, traces, concurrency, think_time).result()
+
+
+# --- Baseline Comparison ---
+def compare(levels, baseline, tolerance):
+    """(concurrency, metric, before, after) where p90 latency or throughput got worse by more than `tolerance`."""
+    reference = {level["concurrency"]: level for level in baseline.get("levels", [])}
+    regressions = []
+    for level in levels:
+        before = reference.get(level["concurrency"])
+        if not before:
+            continue
+        if level["rerun"]["p90_ms"] > before["rerun"]["p90_ms"] * (1 + tolerance):
+            regressions.append((level["concurrency"], "p90_ms", before["rerun"]["p90_ms"], level["rerun"]["p90_ms"]))
+        if level["throughput_rps"] < before["throughput_rps"] / (1 + tolerance):
+            regressions.append((level["concurrency"], "throughput_rps", before["throughput_rps"], level["throughput_rps"]))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Concurrent-session load test of the Streamlit app.")
+    parser.add_argument("--concurrency", default=DEFAULT_CONCURRENCY, help="comma-separated session counts to test")
+    parser.add_argument("--actions", type=int, default=DEFAULT_ACTIONS, help="interactions per generated trace")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between a session's interactions")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--traces", type=Path, help="replay traces from this JSON file instead of generating them")
+    parser.add_argument("--save-traces", type=Path, help="write the traces used to this JSON file")
+    parser.add_argument("--output", type=Path, help="write results as JSON to this file")
+    parser.add_argument("--baseline", type=Path, help="compare against a previous --output file")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown vs baseline (fraction)")
+    args = parser.parse_args(argv)
+
+    levels = [int(part) for part in args.concurrency.split(",")]
+    if args.traces:
+        traces = json.loads(args.traces.read_text(encoding="utf-8"))
+    else:
+        rng = random.Random(args.seed)
+        traces = [make_trace(rng, args.actions) for _ in range(max(levels))]
+    if args.save_traces:
+        args.save_traces.write_text(json.dumps(traces, ensure_ascii=False, indent=1), encoding="utf-8")
+
+    results = []
+    print(f"{'sessions':>8} {'reruns':>7} {'rerun/s':>8} {'p50 ms':>8} {'p90 ms':>8} {'p99 ms':>8} {'start p50':>10} {'RSS MB':>8} {'MB/session':>10}")
+    for concurrency in levels:
+        level = measure_level(traces, concurrency, args.think_ms / 1000)
+        results.append(level)
+        print(
+            f"{concurrency:8d} {level['reruns']:7d} {level['throughput_rps']:8.1f} {level['rerun']['p50_ms']:8.1f} "
+            f"{level['rerun']['p90_ms']:8.1f} {level['rerun']['p99_ms']:8.1f} {level['session_start']['p50_ms']:10.1f} "
+            f"{level['rss_mb']:8.1f} {level['rss_per_session_mb']:10.2f}"
+        )
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "machine": platform.machine(),
+            "cpu_count": os.cpu_count(),
+            "seed": args.seed,
+            "actions": args.actions,
+            "think_ms": args.think_ms,
+        },
+        "levels": results,
+    }
+    if args.output:
+        args.output.write_text(json.dumps(report, indent=2), encoding="utf-8")
+
+    if args.baseline:
+        regressions = compare(results, json.loads(args.baseline.read_text(encoding="utf-8")), args.tolerance)
+        for concurrency, metric, before, after in regressions:
+            print(f"REGRESSION {concurrency} sessions {metric}: {before:.1f} -> {after:.1f}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
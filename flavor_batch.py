@@ -0,0 +1,171 @@
+import functools
+
+import numpy as np
+
+import flavor_engine
+from flavor_engine import GRIND_SIZE_OPTIONS, PROCESS_METHOD_OPTIONS, ROAST_LEVEL_OPTIONS
+from flavor_rules import ZERO_DELTA
+
+
+# --- Option Codes ---
+# Codes are indices into the sidebar option tuples, so a widget index is also a batch code.
+COARSE, MEDIUM, FINE = 0, 1, 2
+WASHED, NATURAL, HONEY = 0, 1, 2
+LIGHT, MEDIUM_ROAST, DARK = 0, 1, 2
+
+# Column order of every batch result: acid, sweet, bitter, body
+FLAVOR_COLUMNS = ("acid", "sweet", "bitter", "body")
+PARAM_COLUMNS = (
+    "ratio", "time", "temperature", "grind_size", "process_method",
+    "roast_level", "blooming_time", "blooming_ratio", "pour_count",
+)
+# Column order of batch tip codes: one column per rule axis, in the order tips are shown
+TIP_COLUMNS = ("grind_time", "ratio", "temperature", "blooming_time", "blooming_ratio", "pour_count")
+
+# Rows handled per pass; keeps the (chunk, 4) temporaries inside the CPU cache.
+CHUNK_SIZE = 65536
+
+
+def encode_options(values, options):
+    """Maps option labels (or already-encoded integer codes) to int8 codes, -1 for unknown labels."""
+    values = np.asarray(values)
+    if values.dtype.kind in "iu":
+        return values.astype(np.int8, copy=False)
+    codes = np.full(values.shape, -1, dtype=np.int8)
+    for code, label in enumerate(options):
+        codes[values == label] = code
+    return codes
+
+
+# --- Compiled Rule Arrays ---
+class RuleArrays:
+    """NumPy form of a RuleSet: one (segments, 4) offset array per axis, indexed by option code + 1."""
+
+    def __init__(self, rules):
+        self.base = np.array(rules.base)
+        # Row 0 is the "unknown label" row, so code -1 from encode_options needs no special case.
+        self.process_method = np.array([ZERO_DELTA] + [rules.process_method.get(o, ZERO_DELTA) for o in PROCESS_METHOD_OPTIONS])
+        self.roast_level = np.array([ZERO_DELTA] + [rules.roast_level.get(o, ZERO_DELTA) for o in ROAST_LEVEL_OPTIONS])
+        # Cut points carry a trailing +inf sentinel so segment_indices never indexes past the end.
+        self.time_points = _with_sentinel(rules.time_points)
+        self.grind_time = np.array([rules.grind_axis(None).deltas] + [rules.grind_axis(o).deltas for o in GRIND_SIZE_OPTIONS])
+        self.points = {name: _with_sentinel(axis.points) for name, axis in rules.axes.items()}
+        self.deltas = {name: np.array(axis.deltas) for name, axis in rules.axes.items()}
+
+        # Tip codes index rules.tip_texts (NO_TIP where a segment has none).
+        self.grind_time_tips = np.array(
+            [rules.grind_axis(None).tip_ids] + [rules.grind_axis(o).tip_ids for o in GRIND_SIZE_OPTIONS], dtype=np.int16
+        )
+        self.tips = {name: np.array(axis.tip_ids, dtype=np.int16) for name, axis in rules.axes.items()}
+
+    def segments(self, name, values):
+        points = self.time_points if name == "time" else self.points[name]
+        return segment_indices(points, values)
+
+
+def _with_sentinel(points):
+    return np.append(np.asarray(points, dtype=np.float64), np.inf)
+
+
+def segment_indices(points, values):
+    """Vectorized flavor_rules.segment_index; `points` ends with the +inf sentinel."""
+    i = np.searchsorted(points[:-1], values, side="left")
+    return 2 * i + (points[i] == values)
+
+
+@functools.lru_cache(maxsize=8)
+def rule_arrays(rules):
+    return RuleArrays(rules)
+
+
+def _profile_chunk(out, arrays, ratio, time, temperature, grind, process, roast, blooming_time, blooming_ratio, pour_count):
+    # Offsets are added in the same order RuleSet.profile applies them, and a band with
+    # no rule adds an exact 0.0, so results are bit-identical to calculate_flavor_profile.
+    out[:] = arrays.base
+    out += arrays.process_method[process + 1]
+    out += arrays.roast_level[roast + 1]
+    out += arrays.grind_time[grind + 1, arrays.segments("time", time)]
+    for name, values in (
+        ("ratio", ratio),
+        ("temperature", temperature),
+        ("blooming_time", blooming_time),
+        ("blooming_ratio", blooming_ratio),
+        ("pour_count", pour_count),
+    ):
+        out += arrays.deltas[name][arrays.segments(name, values)]
+    np.clip(out, 0, 5, out=out)
+
+
+def calculate_flavor_profile_batch(ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count, rules=None):
+    """Vectorized calculate_flavor_profile; returns an (N, 4) float64 array of acid/sweet/bitter/body.
+
+    Scalars broadcast against arrays, and numeric columns are compared in their own
+    dtype (no float copies). The three selectors accept either the Chinese option
+    labels or their integer codes (index into the option tuples).
+    """
+    arrays = rule_arrays(rules or flavor_engine.RULES)
+    columns = np.broadcast_arrays(
+        np.asarray(ratio),
+        np.asarray(time),
+        np.asarray(temperature),
+        encode_options(grind_size, GRIND_SIZE_OPTIONS),
+        encode_options(process_method, PROCESS_METHOD_OPTIONS),
+        encode_options(roast_level, ROAST_LEVEL_OPTIONS),
+        np.asarray(blooming_time),
+        np.asarray(blooming_ratio),
+        np.asarray(pour_count),
+    )
+    columns = [np.ravel(column) for column in columns]
+    n = columns[0].shape[0]
+
+    result = np.empty((n, 4), dtype=np.float64)
+    for start in range(0, n, CHUNK_SIZE):
+        stop = min(start + CHUNK_SIZE, n)
+        _profile_chunk(result[start:stop], arrays, *(column[start:stop] for column in columns))
+    return result
+
+
+def adjustment_tip_codes_batch(ratio, time, temperature, grind_size, blooming_time, blooming_ratio, pour_count, rules=None):
+    """Vectorized adjustment_tips as an (N, 6) int16 array of tip codes, one column per TIP_COLUMNS axis.
+
+    A code indexes tip_catalog(rules); NO_TIP (-1) means the axis gives no tip. A row of
+    all NO_TIP corresponds to the rule set's fallback tip.
+    """
+    arrays = rule_arrays(rules or flavor_engine.RULES)
+    ratio, time, temperature, grind, blooming_time, blooming_ratio, pour_count = (
+        np.ravel(column) for column in np.broadcast_arrays(
+            np.asarray(ratio),
+            np.asarray(time),
+            np.asarray(temperature),
+            encode_options(grind_size, GRIND_SIZE_OPTIONS),
+            np.asarray(blooming_time),
+            np.asarray(blooming_ratio),
+            np.asarray(pour_count),
+        )
+    )
+    codes = np.empty((len(ratio), len(TIP_COLUMNS)), dtype=np.int16)
+    codes[:, 0] = arrays.grind_time_tips[grind + 1, arrays.segments("time", time)]
+    for column, (name, values) in enumerate((
+        ("ratio", ratio),
+        ("temperature", temperature),
+        ("blooming_time", blooming_time),
+        ("blooming_ratio", blooming_ratio),
+        ("pour_count", pour_count),
+    ), start=1):
+        codes[:, column] = arrays.tips[name][arrays.segments(name, values)]
+    return codes
+
+
+def tip_catalog(rules=None):
+    """Tip texts indexed by the codes adjustment_tip_codes_batch returns."""
+    return (rules or flavor_engine.RULES).tip_texts
+
+
+def decode_tips(codes, rules=None):
+    """Turns one row of tip codes back into the list adjustment_tips would return."""
+    return list(flavor_engine.adjustment_tips_for_codes(tuple(codes), rules))
+
+
+def calculate_flavor_profile_frame(frame, rules=None):
+    """Scores every row of a DataFrame whose columns are named like the calculate_flavor_profile arguments."""
+    return calculate_flavor_profile_batch(*(frame[column].to_numpy() for column in PARAM_COLUMNS), rules=rules)
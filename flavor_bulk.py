@@ -0,0 +1,235 @@
+import argparse
+import json
+import sys
+import time as _time
+from collections import deque
+from contextlib import contextmanager
+from pathlib import Path
+
+import numpy as np
+
+from flavor_batch import FLAVOR_COLUMNS, PARAM_COLUMNS, TIP_COLUMNS, adjustment_tip_codes_batch, calculate_flavor_profile_batch, tip_catalog
+from flavor_engine import SLIDER_RANGES
+from flavor_space import OPTION_AXES
+
+
+# --- Brew Log Format ---
+# A brew log is a CSV with one brew per row and one column per calculate_flavor_profile
+# argument (the short names café exports use are accepted too). Selector columns hold the
+# sidebar's Chinese option labels. The file is read in fixed-size chunks, so memory use
+# depends on chunk_size and not on the length of the log. Lines with more fields than the
+# header are rejected like any other invalid row.
+DEFAULT_CHUNK_SIZE = 100_000
+COLUMN_ALIASES = {
+    "grind": "grind_size",
+    "process": "process_method",
+    "roast": "roast_level",
+    "bloom": "blooming_time",
+    "bloom_time": "blooming_time",
+    "bloom_ratio": "blooming_ratio",
+    "pours": "pour_count",
+}
+# Source row number (0-based, header excluded) carried into both output files.
+ROW_COLUMN = "row"
+REASON_COLUMN = "reason"
+# Stands in for every field of an over-long line until the chunk restores its values.
+OVERFLOW_MARK = "\x00"
+
+
+class BrewLogError(ValueError):
+    """The file cannot be scored at all (as opposed to single invalid rows, which are rejected)."""
+
+
+def _column_map(header):
+    # Header name -> parameter name, for every recognised column.
+    mapping = {}
+    for column in header:
+        name = str(column).strip()
+        name = COLUMN_ALIASES.get(name, name)
+        if name in PARAM_COLUMNS and name not in mapping.values():
+            mapping[column] = name
+    missing = [name for name in PARAM_COLUMNS if name not in mapping.values()]
+    if missing:
+        raise BrewLogError(f"missing columns: {', '.join(missing)}")
+    return mapping
+
+
+def _rewind(source):
+    if hasattr(source, "seek"):
+        source.seek(0)
+
+
+@contextmanager
+def _parsing():
+    import pandas as pd
+
+    try:
+        yield
+    except UnicodeDecodeError:
+        raise BrewLogError("the file is not UTF-8 text; save it as a UTF-8 CSV") from None
+    except pd.errors.ParserError as error:
+        raise BrewLogError(f"malformed CSV: {error}") from None
+
+
+def _read_chunks(reader):
+    with _parsing():
+        yield from reader
+
+
+# --- Chunk Scoring ---
+def validate_chunk(chunk):
+    """Encodes one chunk of raw columns; returns (columns, reasons).
+
+    Selector columns become int8 option codes and numeric columns float64. `reasons`
+    holds an empty string for valid rows and the first problem found otherwise;
+    numbers outside the sidebar slider ranges are rejected because the rules are
+    only defined there.
+    """
+    import pandas as pd
+
+    columns = {}
+    reasons = np.full(len(chunk), "", dtype=object)
+
+    def reject(mask, reason):
+        reasons[mask & (reasons == "")] = reason
+
+    for name in PARAM_COLUMNS:
+        raw = chunk[name]
+        if name in OPTION_AXES:
+            codes = pd.Index(OPTION_AXES[name]).get_indexer(raw.str.strip())
+            columns[name] = codes.astype(np.int8)
+            reject(codes < 0, f"unknown {name} label")
+            continue
+        values = pd.to_numeric(raw, errors="coerce").to_numpy(dtype=np.float64, na_value=np.nan)
+        slider = SLIDER_RANGES[name]
+        reject(np.isnan(values), f"{name} is missing or not a number")
+        reject((values < slider["min_value"]) | (values > slider["max_value"]), f"{name} outside {slider['min_value']}-{slider['max_value']}")
+        if name == "pour_count":
+            reject(values != np.floor(values), "pour_count is not a whole number")
+        columns[name] = values
+    return columns, reasons
+
+
+def score_columns(columns, rules=None):
+    """Profiles (N, 4) and tip codes (N, 6) of encoded columns."""
+    profiles = calculate_flavor_profile_batch(*(columns[name] for name in PARAM_COLUMNS), rules=rules)
+    tips = adjustment_tip_codes_batch(
+        columns["ratio"], columns["time"], columns["temperature"], columns["grind_size"],
+        columns["blooming_time"], columns["blooming_ratio"], columns["pour_count"], rules=rules,
+    )
+    return profiles, tips
+
+
+# --- Streaming Driver ---
+def score_brew_log(source, output, rejects, chunk_size=DEFAULT_CHUNK_SIZE, rules=None, progress=None):
+    """Streams the CSV brew log `source` (path or binary file) into scored CSV rows.
+
+    Valid rows are appended to `output` chunk by chunk with their profile and tip codes
+    (indices into tip_catalog(rules)); invalid rows go to `rejects` with the reason and
+    their original values. `progress(rows_done)` is called after every chunk. Returns
+    {"rows", "scored", "rejected"} counts; a file that is not UTF-8 or cannot be parsed
+    as CSV raises BrewLogError.
+    """
+    import pandas as pd
+
+    # The python engine is the one that hands over-long lines to on_bad_lines.
+    read_options = {"encoding": "utf-8-sig", "skipinitialspace": True, "engine": "python"}
+    counts = {"rows": 0, "scored": 0, "rejected": 0}
+    _rewind(source)
+    try:
+        with _parsing():
+            header = pd.read_csv(source, nrows=0, **read_options).columns
+    except pd.errors.EmptyDataError:
+        raise BrewLogError("the file is empty") from None
+    mapping = _column_map(header)
+    _rewind(source)
+
+    # An over-long line keeps its place (so row numbers stay right) as a row of marks;
+    # its fields wait here until the chunk puts them back and rejects the row.
+    overflow = deque()
+
+    def mark_overflow(fields):
+        overflow.append(fields)
+        return [OVERFLOW_MARK] * len(header)
+
+    # Every column is read as text so rejects keep exactly what the log contained.
+    reader = pd.read_csv(
+        source, dtype=str, keep_default_na=False, chunksize=chunk_size, on_bad_lines=mark_overflow, **read_options
+    )
+    for chunk in _read_chunks(reader):
+        marked, overflowed = [], []
+        if overflow:
+            marked = np.flatnonzero((chunk.iloc[:, 0] == OVERFLOW_MARK).to_numpy())
+            overflowed = [overflow.popleft() for _ in marked]
+            for position, fields in zip(marked, overflowed):
+                chunk.iloc[position] = fields[: len(header)]
+        chunk = chunk[list(mapping)].rename(columns=mapping)
+        rows = np.arange(counts["rows"], counts["rows"] + len(chunk))
+        columns, reasons = validate_chunk(chunk)
+        for position, fields in zip(marked, overflowed):
+            reasons[position] = f"{len(fields)} fields where the header has {len(header)}"
+        valid = reasons == ""
+
+        if valid.any():
+            kept = {name: values[valid] for name, values in columns.items()}
+            profiles, tips = score_columns(kept, rules)
+            frame = pd.DataFrame({ROW_COLUMN: rows[valid]})
+            for name in PARAM_COLUMNS:
+                if name in OPTION_AXES:
+                    frame[name] = pd.Categorical.from_codes(kept[name], categories=OPTION_AXES[name])
+                else:
+                    frame[name] = kept[name]
+            for i, name in enumerate(FLAVOR_COLUMNS):
+                frame[name] = profiles[:, i]
+            for i, name in enumerate(TIP_COLUMNS):
+                frame[f"tip_{name}"] = tips[:, i]
+            frame.to_csv(output, header=counts["scored"] == 0, index=False)
+        if not valid.all():
+            rejected = chunk[~valid]
+            rejected.insert(0, REASON_COLUMN, reasons[~valid])
+            rejected.insert(0, ROW_COLUMN, rows[~valid])
+            rejected.to_csv(rejects, header=counts["rejected"] == 0, index=False)
+
+        counts["rows"] += len(chunk)
+        counts["scored"] += int(valid.sum())
+        counts["rejected"] += int((~valid).sum())
+        if progress is not None:
+            progress(counts["rows"])
+    return counts
+
+
+def score_brew_log_file(source, output, rejects=None, chunk_size=DEFAULT_CHUNK_SIZE, rules=None, progress=None):
+    """score_brew_log between files; also writes the tip catalog next to `output` as <stem>.tips.json."""
+    output = Path(output)
+    rejects = Path(rejects) if rejects else output.with_name(f"{output.stem}.rejects.csv")
+    with open(output, "w", encoding="utf-8", newline="") as scored, open(rejects, "w", encoding="utf-8", newline="") as rejected:
+        counts = score_brew_log(source, scored, rejected, chunk_size, rules, progress)
+    output.with_name(f"{output.stem}.tips.json").write_text(
+        json.dumps(list(tip_catalog(rules)), ensure_ascii=False, indent=2), encoding="utf-8"
+    )
+    return counts
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Score a CSV brew log in fixed-size chunks.")
+    parser.add_argument("source", type=Path, help="brew log CSV")
+    parser.add_argument("output", type=Path, help="scored CSV to write")
+    parser.add_argument("--rejects", type=Path, help="CSV for invalid rows (default: <output stem>.rejects.csv)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    args = parser.parse_args(argv)
+
+    started = _time.perf_counter()
+
+    def report(rows):
+        elapsed = _time.perf_counter() - started
+        print(f"\r{rows:,} rows, {rows / elapsed if elapsed else 0:,.0f} rows/s", end="", file=sys.stderr, flush=True)
+
+    try:
+        counts = score_brew_log_file(args.source, args.output, args.rejects, args.chunk_size, progress=report)
+    except BrewLogError as error:
+        raise SystemExit(f"{args.source}: {error}")
+    print(f"\nscored {counts['scored']:,} of {counts['rows']:,} rows ({counts['rejected']:,} rejected)", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,245 @@
+import functools
+import json
+import logging
+import os
+import threading
+import time as _time
+from logging.handlers import RotatingFileHandler
+
+import flavor_engine
+
+
+# --- Opt-In Rerun Instrumentation ---
+# Enabled per server with FLAVOR_DEBUG=1 or per session with ?debug=1 in the URL
+# (?debug=1&profile=1, or FLAVOR_PROFILE=1, also runs the rerun under cProfile).
+# When disabled the app gets NULL_TIMER, whose methods do nothing, and the cache
+# counters below reduce to one thread-local attribute read per call.
+DEBUG_LOG_PATH = os.environ.get("FLAVOR_DEBUG_LOG", "flavor_debug.log")
+DEBUG_LOG_BYTES = 1_000_000
+DEBUG_LOG_BACKUPS = 3
+PROFILE_LINES = 30
+
+# Streamlit runs each session's script (and any cache misses it triggers) on that
+# session's own thread, so a thread-local timer attributes counts to the right rerun.
+_local = threading.local()
+
+
+def _flag(value):
+    return str(value).lower() in ("1", "true", "yes", "on")
+
+
+def debug_enabled(query_params):
+    return _flag(os.environ.get("FLAVOR_DEBUG", "")) or _flag(query_params.get("debug", ""))
+
+
+def profile_enabled(query_params):
+    return _flag(os.environ.get("FLAVOR_PROFILE", "")) or _flag(query_params.get("profile", ""))
+
+
+# --- Cache Hit/Miss Counting ---
+def count_misses(func, name):
+    """Wraps the raw function handed to st.cache_data / st.cache_resource; it only runs on a miss."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timer = getattr(_local, "timer", None)
+        if timer is None:
+            return func(*args, **kwargs)
+        started = _time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timer.record_miss(name, _time.perf_counter() - started)
+
+    return wrapper
+
+
+def count_calls(func, name):
+    """Wraps the cached function the app calls; calls minus misses are hits."""
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        timer = getattr(_local, "timer", None)
+        if timer is not None:
+            timer.record_call(name)
+        return func(*args, **kwargs)
+
+    return wrapper
+
+
+def tracked(cache, func, name=None):
+    """cache(func) (st.cache_data or st.cache_resource) with hit/miss counting under `name`."""
+    name = name or func.__name__
+    return count_calls(cache(count_misses(func, name)), name)
+
+
+# --- Section Timers ---
+class NullTimer:
+    """Stand-in used when instrumentation is off."""
+
+    enabled = False
+
+    def checkpoint(self, name):
+        pass
+
+    def finish(self):
+        return None
+
+
+NULL_TIMER = NullTimer()
+
+
+class RerunTimer:
+    """Times consecutive sections of one script run.
+
+    checkpoint(name) charges the time since the previous checkpoint to `name`, so the
+    flat app script only needs one call at the end of each section.
+    """
+
+    enabled = True
+
+    def __init__(self, session_id=None, profile=False, scope="app"):
+        self.session_id = session_id
+        self.scope = scope
+        self.sections = {}
+        self.cache = {}
+        self.profile_text = None
+        self._text_before = {name: info._asdict() for name, info in flavor_engine.text_cache_info().items()}
+        self._profiler = None
+        if profile:
+            import cProfile
+
+            self._profiler = cProfile.Profile()
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Another session is already profiling; only one profiler can be active per process.
+                self._profiler = None
+        # Fragment timers nest inside the app timer during a full run; finish() restores it.
+        self._outer = getattr(_local, "timer", None)
+        _local.timer = self
+        self.started = self._last = _time.perf_counter()
+
+    def checkpoint(self, name):
+        now = _time.perf_counter()
+        self.sections[name] = self.sections.get(name, 0.0) + now - self._last
+        self._last = now
+
+    def record_call(self, name):
+        self._cache_entry(name)["calls"] += 1
+
+    def record_miss(self, name, seconds):
+        entry = self._cache_entry(name)
+        entry["misses"] += 1
+        entry["miss_seconds"] += seconds
+
+    def _cache_entry(self, name):
+        return self.cache.setdefault(name, {"calls": 0, "misses": 0, "miss_seconds": 0.0})
+
+    def finish(self):
+        """Stops timing and returns the rerun record (also appended to the debug log)."""
+        total = _time.perf_counter() - self.started
+        _local.timer = self._outer
+        if self._profiler is not None:
+            import io
+            import pstats
+
+            self._profiler.disable()
+            stream = io.StringIO()
+            pstats.Stats(self._profiler, stream=stream).sort_stats("cumulative").print_stats(PROFILE_LINES)
+            self.profile_text = stream.getvalue()
+
+        cache = {
+            name: {**entry, "hits": entry["calls"] - entry["misses"]} for name, entry in self.cache.items()
+        }
+        # The text tables are process-wide lru_caches, so concurrent sessions can show up in these deltas.
+        for name, info in flavor_engine.text_cache_info().items():
+            before = self._text_before[name]
+            hits, misses = info.hits - before["hits"], info.misses - before["misses"]
+            cache[name] = {"calls": hits + misses, "misses": misses, "hits": hits}
+        record = {
+            "timestamp": _time.time(),
+            "session": self.session_id,
+            "scope": self.scope,
+            "total_ms": total * 1000,
+            "sections_ms": {name: seconds * 1000 for name, seconds in self.sections.items()},
+            "cache": cache,
+        }
+        debug_logger().info(json.dumps(record, ensure_ascii=False))
+        return record
+
+
+def start_rerun(query_params, session_state, scope="app"):
+    """A RerunTimer when instrumentation is enabled for this rerun, else NULL_TIMER.
+
+    `scope` names what is being timed: "app" for the whole script, or a fragment.
+    """
+    if not debug_enabled(query_params):
+        if scope == "app":
+            # Drop a timer left behind by a rerun that raised before finish().
+            _local.timer = None
+        return NULL_TIMER
+    if "debug_session_id" not in session_state:
+        import uuid
+
+        session_state["debug_session_id"] = uuid.uuid4().hex[:8]
+    return RerunTimer(session_state["debug_session_id"], profile=profile_enabled(query_params), scope=scope)
+
+
+def timed_panel(scope, title):
+    """Decorator for a fragment body: each run is timed as its own record under `scope`,
+    and the debug panel `title` is shown at the end of the fragment when enabled."""
+
+    def decorate(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            import streamlit as st
+
+            timer = start_rerun(st.query_params, st.session_state, scope=scope)
+            try:
+                result = func(*args, **kwargs)
+            except BaseException:
+                # st.rerun() and st.stop() end the fragment with an exception; keep the record, skip the panel.
+                timer.finish()
+                raise
+            timer.checkpoint(scope)
+            record = timer.finish()
+            if record is not None:
+                render_debug_panel(record, timer.profile_text, title)
+            return result
+
+        return wrapper
+
+    return decorate
+
+
+# --- Rolling Log ---
+@functools.lru_cache(maxsize=None)
+def debug_logger(path=DEBUG_LOG_PATH):
+    """JSON-lines logger of rerun records, rotated at DEBUG_LOG_BYTES."""
+    logger = logging.getLogger("flavor_debug")
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+    handler = RotatingFileHandler(path, maxBytes=DEBUG_LOG_BYTES, backupCount=DEBUG_LOG_BACKUPS, encoding="utf-8")
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(handler)
+    return logger
+
+
+# --- Debug Panel ---
+def render_debug_panel(record, profile_text=None, title="🛠️ 效能除錯資訊"):
+    import pandas as pd
+    import streamlit as st
+
+    with st.expander(title, expanded=True):
+        st.markdown(f"本次執行共 **{record['total_ms']:.1f} ms**（紀錄檔：`{DEBUG_LOG_PATH}`）")
+        st.dataframe(
+            pd.DataFrame(list(record["sections_ms"].items()), columns=["區段", "耗時 (ms)"]),
+            hide_index=True,
+        )
+        st.dataframe(
+            pd.DataFrame.from_dict(record["cache"], orient="index").rename_axis("函式").reset_index(),
+            hide_index=True,
+        )
+        if profile_text:
+            st.code(profile_text, language="text")
@@ -0,0 +1,221 @@
+import functools
+import itertools
+import os
+import sys
+
+from flavor_rules import NUMERIC_AXES, RuleSet, load_rules
+
+
+# --- Headless Simulation Core ---
+# Pure rule evaluation with no Streamlit dependency, so batch workers can import it
+# cheaply; the Streamlit app is a thin front end over these functions.
+
+
+# --- Default Parameters Configuration ---
+DEFAULT_PARAMS = {
+    "ratio": 15.0,
+    "time": 150,
+    "temperature": 90,
+    "grind_size_index": 1,
+    "process_method_index": 0,
+    "roast_level_index": 1,
+    "blooming_time": 30,
+    "blooming_ratio": 2.0,
+    "pour_count": 2,
+}
+
+# --- Widget Options ---
+GRIND_SIZE_OPTIONS = ("粗研磨 (海鹽狀)", "中等研磨 (砂糖狀)", "細研磨 (細砂糖狀)")
+PROCESS_METHOD_OPTIONS = ("水洗", "日曬", "蜜處理")
+ROAST_LEVEL_OPTIONS = ("淺烘焙", "中烘焙", "深烘焙")
+
+# Slider bounds and steps, shared by the sidebar and everything that enumerates the slider grid.
+SLIDER_RANGES = {
+    "ratio": {"min_value": 10.0, "max_value": 20.0, "step": 0.5},
+    "time": {"min_value": 60, "max_value": 240, "step": 10},
+    "temperature": {"min_value": 80, "max_value": 100, "step": 1},
+    "blooming_time": {"min_value": 0, "max_value": 60, "step": 5},
+    "blooming_ratio": {"min_value": 1.5, "max_value": 3.5, "step": 0.5},
+    "pour_count": {"min_value": 0, "max_value": 5, "step": 1},
+}
+
+# --- Active Rule Set ---
+# FLAVOR_RULES_PATH points at a JSON rule file (same layout as flavor_rules.DEFAULT_RULES)
+# to swap in a café-specific rule set without code changes.
+RULES = load_rules(os.environ["FLAVOR_RULES_PATH"]) if os.environ.get("FLAVOR_RULES_PATH") else RuleSet()
+
+_BATCH_EXPORTS = ("calculate_flavor_profile_batch", "calculate_flavor_profile_frame")
+
+
+def __getattr__(name):
+    # The batch helpers need NumPy; only import it when a caller actually asks for them.
+    if name in _BATCH_EXPORTS:
+        import flavor_batch
+        return getattr(flavor_batch, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# --- Flavor Calculation Function ---
+def calculate_flavor_profile(ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count, rules=None):
+    # The rules are compiled offset tables (see flavor_rules); scoring is a few indexed adds and a clamp.
+    return (rules or RULES).profile(
+        ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count
+    )
+
+
+# --- Flavor Description Function ---
+# The notes depend only on process, roast, the band of each score and which balance
+# sentence applies, so they are built once per band combination and looked up after that.
+LOW, MID, HIGH = 0, 1, 2
+BALANCED, ACID_SWEET, BITTER_BODY, UNBALANCED = 0, 1, 2, 3
+TEXT_CACHE_SIZE = 4096
+
+
+def flavor_band(score):
+    return HIGH if score >= 4 else MID if score >= 2 else LOW
+
+
+def balance_class(acid, sweet, bitter, body):
+    if all(1.5 <= val <= 3.5 for val in [acid, sweet, bitter, body]):
+        return BALANCED
+    elif (acid > bitter and sweet > acid):
+        return ACID_SWEET
+    elif (bitter > acid and body > sweet):
+        return BITTER_BODY
+    return UNBALANCED
+
+
+def suggest_flavor_notes(acid, sweet, bitter, body, process_method, roast_level):
+    return _flavor_notes_table(
+        process_method, roast_level,
+        flavor_band(acid), flavor_band(sweet), flavor_band(bitter), flavor_band(body),
+        balance_class(acid, sweet, bitter, body),
+    )
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _flavor_notes_table(process_method, roast_level, acid, sweet, bitter, body, balance):
+    notes = []
+
+    # 1. Determine base flavor profile based on process method and roast level
+    base_note = ""
+    if process_method == "日曬":
+        base_note = "**日曬處理**的咖啡，風味通常**醇厚、奔放**，帶有明顯的果實甜感"
+    elif process_method == "水洗":
+        base_note = "**水洗處理**的咖啡，風味通常**乾淨、明亮**"
+    elif process_method == "蜜處理":
+        base_note = "**蜜處理**的咖啡，風味介於水洗與日曬之間，通常具有**乾淨的甜感與平衡的酸質**"
+
+    if roast_level == "淺烘焙":
+        base_note += "，屬於**淺烘焙**，更能突顯**細緻的花果香與明亮酸質**。"
+    elif roast_level == "中烘焙":
+        base_note += "，屬於**中烘焙**，風味**平衡且豐富**，酸甜感適中，餘韻悠長。"
+    elif roast_level == "深烘焙":
+        base_note += "，屬於**深烘焙**，帶有**醇厚飽滿的可可、堅果與焦糖香氣**，苦甜平衡。"
+    notes.append(f"此為{base_note}")
+
+    # 2. Refine description based on the intensity of each flavor dimension
+    # --- Acidity ---
+    if acid == HIGH:
+        if roast_level == "淺烘焙" or process_method == "水洗":
+            notes.append("- **高酸度：** 呈現**明亮、活潑的柑橘、檸檬**或**莓果**般的酸感，純淨且具穿透力，令人振奮。")
+        elif roast_level == "中烘焙" or process_method == "蜜處理":
+            notes.append("- **高酸度：** 多為**蘋果、葡萄**或**柔和柑橘**般的甜酸，圓潤且與甜感平衡，帶有回甘。")
+        else:
+            notes.append("- **高酸度：** 呈現**熱帶水果或熟成莓果**般的甜酸，多汁且與醇厚感融合，不尖銳。")
+    elif acid == MID:
+        notes.append("- **中等酸度：** 酸質清晰且平衡，與其他風味和諧交織，不突兀。")
+    else:
+        notes.append("- **低酸度：** 酸質不明顯或柔和，口感平穩，可能更強調甜感或苦感。")
+
+    # --- Sweetness ---
+    if sweet == HIGH:
+        if roast_level == "淺烘焙" or process_method == "水洗":
+            notes.append("- **高甜感：** 呈現**蔗糖、蜂蜜或花蜜**般的乾淨甜味，回甘明顯且持久。")
+        elif process_method == "日曬" or process_method == "蜜處理":
+            notes.append("- **高甜感：** 有著濃郁的**熱帶水果乾、莓果醬、焦糖或巧克力**般的香甜，醇厚且餘韻綿長。")
+        else:
+            notes.append("- **高甜感：** 甜感飽滿，如同**焦糖布丁或麥芽糖**般的醇厚甜味，與整體風味完美融合。")
+    elif sweet == MID:
+        notes.append("- **中等甜感：：** 甜感平衡，能襯托其他風味，使口感更圓潤，增添舒適度。")
+    else:
+        notes.append("- **低甜感：** 甜感不足，咖啡風味可能顯得單薄或平淡，缺乏豐富性。")
+
+    # --- Bitterness ---
+    if bitter == HIGH:
+        if roast_level == "深烘焙":
+            notes.append("- **高苦味：** 呈現**濃郁黑巧克力、可可**般的深沉苦感，或帶有**烘烤堅果、木質**氣息，若平衡得宜則有深度。")
+        else:
+            notes.append("- **高苦味：** 可能來自過度萃取，呈現不悅的**焦糊、煙燻或藥草**般的苦感，需調整參數。")
+    elif bitter == MID:
+        notes.append("- **中等苦味：** 苦味適中，能增加咖啡的厚實感與層次，與甜感形成良好平衡。")
+    else:
+        notes.append("- **低苦味：** 苦味不明顯，整體風味可能更偏向酸甜感，口感較為清爽。")
+
+    # --- Body ---
+    if body == HIGH:
+        if process_method == "水洗":
+            notes.append("- **高醇厚度：** 口感**滑順、乾淨**，像**絲綢般**的細膩質感，餘韻清爽而綿長。")
+        elif process_method == "日曬" or roast_level == "深烘焙":
+            notes.append("- **高醇厚度：** 口感**醇厚、黏稠**，像**奶油、糖漿般**的飽滿度，強勁且持久，充滿口腔。")
+        else:
+            notes.append("- **高醇厚度：** 口感**圓潤、中等偏厚**，有著良好的**黏稠感與質感**，提供豐富的口腔體驗。")
+    elif body == MID:
+        notes.append("- **中等醇厚度：** 口感適中，既不單薄也不厚重，平衡舒適，順暢入喉。")
+    else:
+        notes.append("- **低醇厚度：** 口感清淡，可能顯得水感或單薄，餘韻較短，缺乏份量感。")
+
+    # 3. Overall Balance Description
+    if balance == BALANCED:
+        notes.append("☕ 整體風味**極為平衡且和諧**，各項風味元素融合得宜，口感舒適，展現出咖啡豆的純粹美好。")
+    elif balance == ACID_SWEET:
+        notes.append("✨ 整體風味呈現良好的**酸甜平衡**，活潑的酸質與豐富的甜感相互輝映，餘韻迷人。")
+    elif balance == BITTER_BODY:
+        notes.append("🍫 整體風味醇厚，**苦甜感交織**，帶有厚實的口感和溫暖的風味，餘韻扎實。")
+
+    return tuple(sys.intern(note) for note in notes)
+
+
+# --- Adjustment Suggestions Function ---
+def adjustment_tips(ratio, time, temperature, grind_size, blooming_time, blooming_ratio, pour_count, rules=None):
+    # Tips hang off the same rule bands as the flavor deltas, so thresholds are defined once;
+    # the band codes select a prebuilt tuple of tips.
+    rules = rules or RULES
+    return adjustment_tips_for_codes(
+        rules.tip_codes(ratio, time, temperature, grind_size, blooming_time, blooming_ratio, pour_count), rules
+    )
+
+
+def adjustment_tips_for_codes(codes, rules=None):
+    return _adjustment_tips_table(rules or RULES, codes)
+
+
+@functools.lru_cache(maxsize=TEXT_CACHE_SIZE)
+def _adjustment_tips_table(rules, codes):
+    return tuple(sys.intern(tip) for tip in rules.tips_for_codes(codes))
+
+
+# --- Text Tables ---
+def warm_text_tables(rules=None):
+    """Builds every notes/tips entry reachable from the widgets, so reruns only do lookups."""
+    rules = rules or RULES
+    bands = (LOW, MID, HIGH)
+    for process_method in PROCESS_METHOD_OPTIONS:
+        for roast_level in ROAST_LEVEL_OPTIONS:
+            for acid, sweet, bitter, body in itertools.product(bands, repeat=4):
+                for balance in (BALANCED, ACID_SWEET, BITTER_BODY, UNBALANCED):
+                    _flavor_notes_table(process_method, roast_level, acid, sweet, bitter, body, balance)
+
+    numeric_tip_ids = [sorted(set(rules.axes[name].tip_ids)) for name in NUMERIC_AXES]
+    for grind_size in GRIND_SIZE_OPTIONS:
+        grind_tip_ids = sorted(set(rules.grind_axis(grind_size).tip_ids))
+        for codes in itertools.product(grind_tip_ids, *numeric_tip_ids):
+            _adjustment_tips_table(rules, codes)
+
+
+def text_cache_info():
+    """Hit/miss statistics of the process-wide notes and tips tables."""
+    return {
+        "suggest_flavor_notes": _flavor_notes_table.cache_info(),
+        "adjustment_tips": _adjustment_tips_table.cache_info(),
+    }
@@ -0,0 +1,128 @@
+import functools
+
+import numpy as np
+
+from flavor_batch import FLAVOR_COLUMNS, PARAM_COLUMNS
+from flavor_space import OPTION_AXES, recipe_space
+
+
+# --- Faceted Recipe Index ---
+# Bitmaps over the class combinations of the reachable recipe space (see flavor_space),
+# one bit per combination packed into uint64 words: ~35k combinations stand for the
+# ~88M slider recipes, so a bitmap is a few hundred words. Parameters get one bitmap
+# per class (equality encoding); each flavor dimension gets one bitmap per score
+# threshold, bit set when score <= threshold (range encoding), so any score range is
+# one AND NOT. Counts weight every matching combination by the number of concrete
+# recipes it stands for inside the filter.
+SCORE_SCALE = 10  # scores are multiples of 0.1 (see flavor_table.SCALE)
+SCORE_LEVELS = 5 * SCORE_SCALE + 1
+
+
+def _pack(mask):
+    bits = np.packbits(mask, bitorder="little")
+    bits = np.pad(bits, (0, -len(bits) % 8))
+    return bits.view(np.uint64)
+
+
+class FacetIndex:
+    """Faceted filtering of the recipe space with per-facet counts.
+
+    A filter maps a parameter or flavor name to what it accepts: an inclusive
+    (low, high) range for numeric parameters and flavors, a collection of labels
+    for selectors. Names without a filter accept everything.
+    """
+
+    def __init__(self, space):
+        self.space = space
+        self.size = len(space)
+        self.full = _pack(np.ones(self.size, dtype=bool))
+        self.class_bitmaps = {
+            name: np.stack([_pack(space.combos[:, i] == c) for c in range(len(space.classes[name]))])
+            for i, name in enumerate(PARAM_COLUMNS)
+        }
+        self.tenths = np.rint(space.profiles * SCORE_SCALE).astype(np.int16)
+        self.score_bitmaps = {
+            name: np.stack([_pack(self.tenths[:, j] <= level) for level in range(SCORE_LEVELS)])
+            for j, name in enumerate(FLAVOR_COLUMNS)
+        }
+
+    def _indices(self, bitmap):
+        bits = np.unpackbits(bitmap.view(np.uint8), count=self.size, bitorder="little")
+        return np.flatnonzero(bits)
+
+    def _class_weights(self, name, accepted):
+        # Values of each class that pass the filter; a class with none drops out.
+        classes = self.space.classes[name]
+        if accepted is None:
+            return np.array([len(values) for values in classes], dtype=np.int64)
+        if name in OPTION_AXES:
+            return np.array([values[0] in accepted for values in classes], dtype=np.int64)
+        low, high = accepted
+        return np.array([sum(low <= value <= high for value in values) for values in classes], dtype=np.int64)
+
+    def _score_bitmap(self, name, accepted):
+        low, high = (int(round(bound * SCORE_SCALE)) for bound in accepted)
+        bitmap = self.score_bitmaps[name][min(max(high, -1), SCORE_LEVELS - 1)] if high >= 0 else np.zeros_like(self.full)
+        if low > 0:
+            bitmap = bitmap & ~self.score_bitmaps[name][min(low - 1, SCORE_LEVELS - 1)]
+        return bitmap
+
+    def _weight(self, indices, weights, skip=None):
+        total = np.ones(len(indices), dtype=np.int64)
+        for i, name in enumerate(PARAM_COLUMNS):
+            if name != skip:
+                total *= weights[name][self.space.combos[indices, i]]
+        return total
+
+    def query(self, filters=None, sample=5):
+        """Matches of `filters`: recipe count, per-facet counts and `sample` example recipes.
+
+        `facets[name]` maps every value of that parameter (every score in 0.1 steps for
+        flavors) to the number of recipes that would match if it were the only value
+        allowed there, with all other filters unchanged.
+        """
+        filters = filters or {}
+        weights = {name: self._class_weights(name, filters.get(name)) for name in PARAM_COLUMNS}
+        bitmaps = {}
+        for name, accepted in filters.items():
+            if name in FLAVOR_COLUMNS:
+                bitmaps[name] = self._score_bitmap(name, accepted)
+            elif accepted is not None:
+                allowed = self.class_bitmaps[name][weights[name] > 0]
+                bitmaps[name] = np.bitwise_or.reduce(allowed, axis=0) if len(allowed) else np.zeros_like(self.full)
+
+        def matching(skip=None):
+            result = self.full
+            for name, bitmap in bitmaps.items():
+                if name != skip:
+                    result = result & bitmap
+            return result
+
+        matches = self._indices(matching())
+        facets = {}
+        for i, name in enumerate(PARAM_COLUMNS):
+            others = self._indices(matching(skip=name))
+            per_class = np.bincount(
+                self.space.combos[others, i], weights=self._weight(others, weights, skip=name),
+                minlength=len(self.space.classes[name]),
+            )
+            facets[name] = {value: int(per_class[c]) for c, values in enumerate(self.space.classes[name]) for value in values}
+        for j, name in enumerate(FLAVOR_COLUMNS):
+            others = self._indices(matching(skip=name))
+            per_level = np.bincount(self.tenths[others, j], weights=self._weight(others, weights), minlength=SCORE_LEVELS)
+            facets[name] = {level / SCORE_SCALE: int(count) for level, count in enumerate(per_level)}
+
+        bounds = {name: accepted for name, accepted in filters.items() if name in PARAM_COLUMNS and name not in OPTION_AXES}
+        picks = matches[np.linspace(0, len(matches) - 1, min(sample, len(matches))).astype(np.int64)] if len(matches) else matches
+        return {
+            "count": int(self._weight(matches, weights).sum()),
+            "combinations": len(matches),
+            "facets": facets,
+            "sample": [{**self.space.profile(combo), **self.space.recipe(combo, bounds)} for combo in picks],
+        }
+
+
+@functools.lru_cache(maxsize=4)
+def facet_index(rules=None):
+    """Process-wide FacetIndex for a rule set (the active one by default)."""
+    return FacetIndex(recipe_space(rules))
@@ -0,0 +1,135 @@
+import numpy as np
+
+from flavor_batch import FLAVOR_COLUMNS, PARAM_COLUMNS, calculate_flavor_profile_batch
+from flavor_space import OPTION_AXES, slider_values
+
+
+# --- Sensitivity Heatmaps ---
+# Two parameters vary over their whole slider/option range while the other seven stay
+# at fixed values; the grid is scored in one calculate_flavor_profile_batch call and
+# drawn as one heatmap per flavor dimension.
+HEATMAP_CACHE_ENTRIES = 128
+FRAME_CACHE_ENTRIES = 16
+HEATMAP_CMAP = "YlOrBr"
+
+PARAM_LABELS = {
+    "ratio": "粉水比（1:X）",
+    "time": "總沖煮時間（秒）",
+    "temperature": "水溫（°C）",
+    "grind_size": "研磨度",
+    "process_method": "處理法",
+    "roast_level": "烘焙度",
+    "blooming_time": "悶蒸時間（秒）",
+    "blooming_ratio": "悶蒸水量（粉重倍數）",
+    "pour_count": "斷水次數",
+}
+FLAVOR_LABELS = {"acid": "酸度", "sweet": "甜感", "bitter": "苦味", "body": "醇厚度"}
+
+# Used for figure text when no CJK font is installed, so labels never render as empty boxes.
+OPTION_NAMES_EN = {
+    "grind_size": ("coarse", "medium", "fine"),
+    "process_method": ("washed", "natural", "honey"),
+    "roast_level": ("light", "medium", "dark"),
+}
+CJK_FONTS = ("Noto Sans CJK TC", "Noto Sans TC", "Microsoft JhengHei", "PingFang TC", "Heiti TC", "Noto Sans CJK JP", "WenQuanYi Zen Hei")
+
+
+def axis_values(name):
+    """Grid values of a parameter: every slider value, or every option label."""
+    return list(OPTION_AXES[name]) if name in OPTION_AXES else slider_values(name)
+
+
+def sensitivity_grid(x, y, fixed, rules=None):
+    """Profiles over every (y, x) pair of values; `fixed` maps the other parameters to values.
+
+    Returns (x values, y values, scores) with scores shaped (len(y), len(x), 4).
+    """
+    if x == y:
+        raise ValueError("x and y must be different parameters")
+    fixed = dict(fixed)
+    xs, ys = axis_values(x), axis_values(y)
+    # Option axes go in as codes; (1, nx) and (ny, 1) columns broadcast to the full grid.
+    grid = {
+        x: np.arange(len(xs)).reshape(1, -1) if x in OPTION_AXES else np.asarray(xs).reshape(1, -1),
+        y: np.arange(len(ys)).reshape(-1, 1) if y in OPTION_AXES else np.asarray(ys).reshape(-1, 1),
+    }
+    columns = [grid[name] if name in grid else fixed[name] for name in PARAM_COLUMNS]
+    scores = calculate_flavor_profile_batch(*columns, rules=rules)
+    return xs, ys, scores.reshape(len(ys), len(xs), len(FLAVOR_COLUMNS))
+
+
+def _cjk_font():
+    from matplotlib import font_manager
+
+    installed = {font.name for font in font_manager.fontManager.ttflist}
+    return next((font for font in CJK_FONTS if font in installed), None)
+
+
+def _tick_labels(name, values, cjk):
+    if name in OPTION_AXES:
+        return list(values) if cjk else list(OPTION_NAMES_EN[name])
+    return [f"{value:g}" for value in values]
+
+
+def heatmap_frame(x, y, dpi=100):
+    """The 2x2 acid/sweet/bitter/body figure for an (x, y) pair with empty plot areas.
+
+    Everything but the scores (titles, ticks, labels, colour bars) depends only on the
+    two axes, so the frame is drawn once per pair and heatmap_image paints each grid
+    into it. Returns (pixels, boxes): a read-only (height, width, 3) uint8 array and
+    one (top, bottom, left, right) pixel box per flavor dimension.
+    """
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    from matplotlib.figure import Figure
+
+    xs, ys = axis_values(x), axis_values(y)
+    cjk = _cjk_font()
+    flavor_names = FLAVOR_LABELS if cjk else {name: name for name in FLAVOR_COLUMNS}
+    param_names = PARAM_LABELS if cjk else {name: name for name in PARAM_COLUMNS}
+
+    # Figure() instead of pyplot: no global state, safe from concurrent sessions.
+    figure = Figure(figsize=(10, 8), dpi=dpi, layout="constrained")
+    family = cjk or "sans-serif"
+    axes = figure.subplots(2, 2)
+    x_ticks = _tick_labels(x, xs, cjk)
+    y_ticks = _tick_labels(y, ys, cjk)
+    # Long slider ranges get at most ~8 ticks so labels do not overlap.
+    x_step = -(-len(xs) // 8)
+    y_step = -(-len(ys) // 8)
+    blank = np.full((len(ys), len(xs)), np.nan)
+    for ax, name in zip(axes.flat, FLAVOR_COLUMNS):
+        image = ax.imshow(blank, origin="lower", aspect="auto", cmap=HEATMAP_CMAP, vmin=0, vmax=5)
+        ax.set_title(flavor_names[name], fontfamily=family)
+        ax.set_xticks(range(0, len(xs), x_step), x_ticks[::x_step], fontfamily=family)
+        ax.set_yticks(range(0, len(ys), y_step), y_ticks[::y_step], fontfamily=family)
+        ax.set_xlabel(param_names[x], fontfamily=family)
+        ax.set_ylabel(param_names[y], fontfamily=family)
+        figure.colorbar(image, ax=ax)
+
+    canvas = FigureCanvasAgg(figure)
+    canvas.draw()
+    pixels = np.asarray(canvas.buffer_rgba())[:, :, :3].copy()
+    pixels.flags.writeable = False
+    height = pixels.shape[0]
+    boxes = []
+    for ax in axes.flat:
+        box = ax.get_window_extent()
+        # One pixel in from each edge so the axes spines stay visible.
+        boxes.append((height - round(box.y1) + 1, height - round(box.y0) - 1, round(box.x0) + 1, round(box.x1) - 1))
+    return pixels, tuple(boxes)
+
+
+def heatmap_image(frame, scores):
+    """A heatmap_frame with `scores` ((ny, nx, 4), as from sensitivity_grid) painted in, as an RGB array."""
+    from matplotlib import colormaps
+
+    pixels, boxes = frame
+    image = pixels.copy()
+    ny, nx = scores.shape[:2]
+    colors = colormaps[HEATMAP_CMAP](np.clip(scores / 5, 0, 1), bytes=True)[..., :3]
+    for i, (top, bottom, left, right) in enumerate(boxes):
+        # Nearest grid cell for every pixel centre; rows run bottom-up (origin="lower").
+        rows = ((np.arange(bottom - top)[::-1] + 0.5) * ny / (bottom - top)).astype(int)
+        cols = ((np.arange(right - left) + 0.5) * nx / (right - left)).astype(int)
+        image[top:bottom, left:right] = colors[rows[:, None], cols[None, :], i]
+    return image
@@ -0,0 +1,100 @@
+import numpy as np
+
+import flavor_engine
+from flavor_batch import FLAVOR_COLUMNS, PARAM_COLUMNS, adjustment_tip_codes_batch, calculate_flavor_profile_batch
+from flavor_engine import GRIND_SIZE_OPTIONS, SLIDER_RANGES
+from flavor_rules import NO_TIP, OVER_EXTRACTED, UNDER_EXTRACTED
+
+
+# --- Real-World Parameter Noise ---
+# A recipe is never brewed exactly as dialled in: the kettle drifts, the grinder
+# produces a spread of particle sizes and pours start a little early or late. Each
+# sample perturbs the nominal recipe with independent Gaussian noise (standard
+# deviations below, in slider units) and shifts the grind to a neighbouring class
+# with probability GRIND_SHIFT. Values are clipped to the slider ranges; the beans
+# and the number of pours stay as set.
+NOISE = {
+    "temperature": 1.5,
+    "time": 10.0,
+    "blooming_time": 5.0,
+    "ratio": 0.3,
+    "blooming_ratio": 0.2,
+}
+GRIND_SHIFT = 0.15
+
+# A sample counts as stable when every dimension is within this distance of the nominal profile.
+STABILITY_TOLERANCE = 0.5
+DEFAULT_SAMPLES = 10_000
+DEFAULT_SEED = 0
+# Histogram bins: the rules move scores in steps of 0.1 or coarser, so one bin per 0.1 is exact.
+HISTOGRAM_BINS = np.round(np.arange(0, 5.05, 0.1), 1)
+
+
+def perturb(recipe, n, rng):
+    """n noisy copies of `recipe` (calculate_flavor_profile keyword arguments) as a dict of columns."""
+    samples = {}
+    for name in PARAM_COLUMNS:
+        value = recipe[name]
+        if name in NOISE:
+            column = value + rng.normal(0.0, NOISE[name], n)
+            if name == "blooming_time" and value == 0:
+                # Skipping the bloom is a choice, not a timing error.
+                column = np.zeros(n)
+            samples[name] = np.clip(column, SLIDER_RANGES[name]["min_value"], SLIDER_RANGES[name]["max_value"])
+        elif name == "grind_size" and value in GRIND_SIZE_OPTIONS:
+            code = GRIND_SIZE_OPTIONS.index(value)
+            shift = rng.choice([-1, 0, 1], size=n, p=[GRIND_SHIFT / 2, 1 - GRIND_SHIFT, GRIND_SHIFT / 2])
+            samples[name] = np.clip(code + shift, 0, len(GRIND_SIZE_OPTIONS) - 1)
+        else:
+            samples[name] = value
+    return samples
+
+
+def robustness_report(recipe, n=DEFAULT_SAMPLES, seed=DEFAULT_SEED, rules=None):
+    """Monte Carlo summary of how the profile of `recipe` spreads under NOISE.
+
+    `recipe` is a tuple of (name, value) pairs so the call is hashable and the same
+    (recipe, n, seed) always gives the same report. Returns plain data: the nominal
+    profile, per-dimension statistics and histograms (counts per HISTOGRAM_BINS value),
+    the share of samples that land in under- or over-extraction bands, how often each
+    adjustment tip fires, and the stability score.
+    """
+    rules = rules or flavor_engine.RULES
+    recipe = dict(recipe)
+    rng = np.random.default_rng(seed)
+    samples = perturb(recipe, n, rng)
+
+    nominal = np.asarray(flavor_engine.calculate_flavor_profile(**recipe, rules=rules), dtype=np.float64)
+    scores = calculate_flavor_profile_batch(*(samples[name] for name in PARAM_COLUMNS), rules=rules)
+    tips = adjustment_tip_codes_batch(
+        samples["ratio"], samples["time"], samples["temperature"], samples["grind_size"],
+        samples["blooming_time"], samples["blooming_ratio"], samples["pour_count"], rules=rules,
+    )
+
+    # Map every tip code to its extraction tag; NO_TIP (-1) indexes the appended 0.
+    extraction = np.append(np.asarray(rules.tip_extraction, dtype=np.int8), 0)[tips]
+    under = (extraction == UNDER_EXTRACTED).any(axis=1)
+    over = (extraction == OVER_EXTRACTED).any(axis=1)
+    stable = (np.abs(scores - nominal) <= STABILITY_TOLERANCE + 1e-9).all(axis=1)
+
+    bins = np.clip(np.rint(scores * 10).astype(np.int64), 0, len(HISTOGRAM_BINS) - 1)
+    p5, p50, p95 = np.percentile(scores, [5, 50, 95], axis=0)
+    fired = np.bincount(tips[tips != NO_TIP], minlength=len(rules.tip_texts))
+    return {
+        "samples": n,
+        "seed": seed,
+        "nominal": dict(zip(FLAVOR_COLUMNS, nominal.tolist())),
+        "mean": dict(zip(FLAVOR_COLUMNS, scores.mean(axis=0).tolist())),
+        "std": dict(zip(FLAVOR_COLUMNS, scores.std(axis=0).tolist())),
+        "p5": dict(zip(FLAVOR_COLUMNS, p5.tolist())),
+        "p50": dict(zip(FLAVOR_COLUMNS, p50.tolist())),
+        "p95": dict(zip(FLAVOR_COLUMNS, p95.tolist())),
+        "histograms": {
+            name: np.bincount(bins[:, i], minlength=len(HISTOGRAM_BINS)).tolist()
+            for i, name in enumerate(FLAVOR_COLUMNS)
+        },
+        "p_under": float(under.mean()) if n else 0.0,
+        "p_over": float(over.mean()) if n else 0.0,
+        "stability": float(stable.mean()) if n else 0.0,
+        "tip_rates": {rules.tip_texts[code]: count / n for code, count in enumerate(fired.tolist()) if count},
+    }
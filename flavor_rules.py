@@ -0,0 +1,280 @@
+import functools
+import math
+from bisect import bisect_left
+
+
+# --- Rule Definitions ---
+# The flavor model as data. Every delta is an (acid, sweet, bitter, body) offset;
+# numeric axes list bands as interval strings ("[a, b]" closed, "(a, b)" open,
+# "inf" for unbounded) and at most one band per axis applies. A band may carry a
+# "tip" for adjustment_tips, a "delta" for the profile, or both. Axes are applied
+# in the order listed here, which is also the order tips are shown in.
+# In "grind_time", the "*" entry covers every grind size that has no entry of its own.
+# A band whose tip warns about under- or over-extraction is tagged with
+# "extraction": "under" / "over" (see RuleSet.tip_extraction).
+DEFAULT_RULES = {
+    "base": (2.5, 2.5, 2.5, 2.5),
+    "process_method": {
+        "日曬": (-0.5, 1.5, -0.5, 1),
+        "水洗": (1.5, -0.5, 0.5, -0.5),
+        "蜜處理": (0.5, 1, 0, 0.5),
+    },
+    "roast_level": {
+        "淺烘焙": (1.5, 0.5, -1.5, -1),
+        "深烘焙": (-1.5, 0.5, 2, 1.5),
+    },
+    "grind_time": {
+        "細研磨 (細砂糖狀)": [
+            {"when": "(-inf, 100)", "delta": (1.5, -1, -1, -1), "extraction": "under",
+             "tip": "📉 **風味尖銳/欠萃（細研磨+短時間）**：建議**延長總沖煮時間至 120-150 秒**，或稍微**調粗研磨度**，以避免萃取不足。"},
+            {"when": "[100, 180]", "delta": (0, 0.5, 0, 0.5)},
+            {"when": "(180, inf)", "delta": (-1.5, -1, 2, 1), "extraction": "over",
+             "tip": "📈 **風味過苦/雜味（細研磨+長時間）**：這通常是過度萃取。建議**調粗研磨度**，或**縮短總沖煮時間至 150-180 秒**。"},
+        ],
+        "粗研磨 (海鹽狀)": [
+            {"when": "(-inf, 120)", "delta": (1, -1.5, 0, -1.5), "extraction": "under",
+             "tip": "📉 **風味淡薄/水感（粗研磨+短時間）**：建議**調細研磨度**，或**延長總沖煮時間至 150-180 秒**，以提升萃取率。"},
+            {"when": "(180, inf)", "delta": (0.5, -1, 1, -2), "extraction": "under",
+             "tip": "📈 **風味稀薄/無層次（粗研磨+長時間）**：粗研磨長時間沖煮容易風味不佳。建議**調細研磨度**，並**控制在 120-180 秒內完成沖煮**。"},
+        ],
+        "*": [
+            {"when": "(-inf, 120)", "extraction": "under",
+             "tip": "⏱️ **總沖煮時間偏短**：若風味清淡，可嘗試**延長總沖煮時間至 150-180 秒**，或稍微**調細研磨度**。"},
+            {"when": "(180, inf)", "extraction": "over",
+             "tip": "⏱️ **總沖煮時間偏長**：若風味有苦澀感，可嘗試**縮短總沖煮時間至 150-180 秒**，或稍微**調粗研磨度**。"},
+        ],
+    },
+    "ratio": [
+        {"when": "(-inf, 14)", "delta": (0, 0.5, 0.5, 0.5),
+         "tip": "⚖️ **粉水比偏低（濃度高）**：若覺得咖啡過於濃郁或苦感重，建議**提升粉水比至 1:15～1:16**，有助於平衡甜感與醇厚度。"},
+        {"when": "(17, inf)", "delta": (0.5, -0.5, 0, -0.5),
+         "tip": "⚖️ **粉水比偏高（濃度低）**：若風味過淡或產生尖銳酸澀，建議**降低粉水比至 1:15～1:16**，讓咖啡風味更飽滿。"},
+    ],
+    "temperature": [
+        {"when": "(94, inf)", "delta": (-0.5, -0.5, 1, 0), "extraction": "over",
+         "tip": "🌡️ **水溫偏高**：若風味有明顯苦味或雜味，建議將水溫**降至 91～93°C**，有助於柔化苦感，突顯咖啡原有風味。"},
+        {"when": "(-inf, 88)", "delta": (1.5, -1, -0.5, -0.5), "extraction": "under",
+         "tip": "🌡️ **水溫偏低**：若風味清淡、酸感突出，建議將水溫**提升至 90°C 以上**，以充分萃取咖啡的甜感與香氣。"},
+    ],
+    "blooming_time": [
+        {"when": "(0, 20)", "delta": (1, -0.5, 0, -1), "extraction": "under",
+         "tip": "💧 **悶蒸時間不足**：建議**延長悶蒸時間至 30-40 秒**，充足的悶蒸有助於咖啡粉均勻吸水，提升整體萃取品質與甜感。"},
+        {"when": "(40, inf)", "delta": (-0.5, -1, 1, 0), "extraction": "over",
+         "tip": "💧 **悶蒸時間過長**：可能導致咖啡粉過度悶蒸而產生苦澀。建議**縮短至 30-40 秒**。"},
+        {"when": "[0, 0]", "delta": (0.5, -0.5, 0, -0.5), "extraction": "under",
+         "tip": "💧 **未進行悶蒸**：強烈建議至少悶蒸 **30 秒**，這是均勻萃取和釋放咖啡香氣的關鍵步驟。"},
+    ],
+    "blooming_ratio": [
+        {"when": "(-inf, 1.8)", "delta": (0.8, -0.8, 0, -0.8), "extraction": "under",
+         "tip": "💦 **悶蒸水量偏少**：建議**提升悶蒸水量至粉重的 2-3 倍**，以確保咖啡粉充分潤濕，避免萃取不均。"},
+        {"when": "(3, inf)", "delta": (0, 0, 0.5, -0.5),
+         "tip": "💦 **悶蒸水量偏多**：過多水分可能稀釋悶蒸效果。可考慮稍微**減少悶蒸水量至粉重的 2-3 倍**。"},
+    ],
+    "pour_count": [
+        {"when": "[0, 0]", "delta": (0.5, -1, 0.5, -1), "extraction": "over",
+         "tip": "📈 **未斷水**：建議嘗試**至少 1-2 次斷水**，這有助於分段萃取，提升風味層次與飽滿度，減少過度萃取。"},
+        {"when": "[3, inf)", "delta": (0.5, 0.5, -0.5, 0),
+         "tip": "📉 **斷水次數較多**：若風味過於複雜或酸度突出，可考慮**減少斷水次數至 2 次**，或調整注水方式讓水流更平穩。"},
+    ],
+    "fallback_tip": "👍 **參數配置良好！** 您目前的沖煮參數看起來很平衡。若想進一步優化，可嘗試**微調研磨度**或**變化注水手法**來探索更細緻的風味。",
+}
+
+NUMERIC_AXES = ("ratio", "temperature", "blooming_time", "blooming_ratio", "pour_count")
+OTHER_GRIND = "*"
+ZERO_DELTA = (0.0, 0.0, 0.0, 0.0)
+NO_TIP = -1
+# RuleSet.tip_extraction values
+UNDER_EXTRACTED, NOT_TAGGED, OVER_EXTRACTED = -1, 0, 1
+_EXTRACTION_CODES = {"under": UNDER_EXTRACTED, None: NOT_TAGGED, "over": OVER_EXTRACTED}
+
+def parse_interval(text):
+    """Parses "[a, b)"-style interval notation into (low, high, low_closed, high_closed)."""
+    text = text.strip()
+    bounds = text[1:-1].split(",")
+    if len(bounds) != 2 or text[:1] not in "[(" or text[-1:] not in "])":
+        raise ValueError(f"not an interval: {text!r}")
+    return float(bounds[0]), float(bounds[1]), text[0] == "[", text[-1] == "]"
+
+
+def _contains(interval, value):
+    low, high, low_closed, high_closed = interval
+    above = value > low or (low_closed and value == low)
+    below = value < high or (high_closed and value == high)
+    return above and below
+
+
+# --- Compilation ---
+# Every axis is cut at the finite interval endpoints into elementary segments:
+# segment 2i is the open gap below points[i], segment 2i+1 is points[i] itself.
+# Within a segment every band either fully applies or not at all, so a rule
+# lookup becomes one bisect plus a list index.
+def _cut_points(band_lists):
+    points = set()
+    for bands in band_lists:
+        for band in bands:
+            low, high, _, _ = parse_interval(band["when"])
+            points.update(p for p in (low, high) if math.isfinite(p))
+    return sorted(points)
+
+
+def _segment_samples(points):
+    # One representative value per elementary segment, used to decide which band owns it.
+    if not points:
+        return [0.0]
+    samples = [points[0] - 1.0]
+    for i, point in enumerate(points):
+        samples.append(point)
+        samples.append((point + points[i + 1]) / 2 if i + 1 < len(points) else point + 1.0)
+    return samples
+
+
+def _compile_bands(bands, points):
+    intervals = [parse_interval(band["when"]) for band in bands]
+    deltas, tips, extractions, band_ids = [], [], [], []
+    for sample in _segment_samples(points):
+        owner = next((i for i, interval in enumerate(intervals) if _contains(interval, sample)), None)
+        band = bands[owner] if owner is not None else {}
+        deltas.append(tuple(float(d) for d in band.get("delta", ZERO_DELTA)))
+        tips.append(band.get("tip"))
+        extractions.append(_EXTRACTION_CODES[band.get("extraction")])
+        band_ids.append(-1 if owner is None else owner)
+    return deltas, tips, extractions, band_ids
+
+
+def segment_index(points, value):
+    """Elementary segment of `value` on an axis cut at the sorted `points`."""
+    i = bisect_left(points, value)
+    return 2 * i + 1 if i < len(points) and points[i] == value else 2 * i
+
+
+class CompiledAxis:
+    """Per-segment offsets and tips of one numeric parameter."""
+
+    def __init__(self, bands, points=None):
+        self.points = _cut_points([bands]) if points is None else points
+        self.deltas, self.tips, self.extractions, self.band_ids = _compile_bands(bands, self.points)
+
+    def segment(self, value):
+        return segment_index(self.points, value)
+
+
+class RuleSet:
+    """A rule definition compiled into per-axis offset tables and one grind x time table."""
+
+    def __init__(self, definition=DEFAULT_RULES):
+        self.definition = definition
+        self.base = tuple(float(v) for v in definition["base"])
+        self.process_method = {k: tuple(float(d) for d in v) for k, v in definition["process_method"].items()}
+        self.roast_level = {k: tuple(float(d) for d in v) for k, v in definition["roast_level"].items()}
+
+        grind_time = definition["grind_time"]
+        self.time_points = _cut_points(grind_time.values())
+        self.grind_time = {grind: CompiledAxis(bands, self.time_points) for grind, bands in grind_time.items()}
+        self._other_grind = self.grind_time.get(OTHER_GRIND) or CompiledAxis([], self.time_points)
+
+        self.axes = {name: CompiledAxis(definition.get(name, [])) for name in NUMERIC_AXES}
+        self.fallback_tip = definition.get("fallback_tip")
+
+        # Tips become small integer codes into one catalog of distinct texts, so a set of
+        # active tips is a tuple of ints (one per axis, NO_TIP where the axis is silent).
+        catalog = {}
+        for axis in [self._other_grind, *self.grind_time.values(), *self.axes.values()]:
+            for tip in axis.tips:
+                if tip:
+                    catalog.setdefault(tip, len(catalog))
+        self.tip_texts = tuple(catalog)
+        # Extraction tag of each catalog tip (UNDER_EXTRACTED / NOT_TAGGED / OVER_EXTRACTED).
+        tip_extraction = [NOT_TAGGED] * len(catalog)
+        for axis in [self._other_grind, *self.grind_time.values(), *self.axes.values()]:
+            axis.tip_ids = [catalog[tip] if tip else NO_TIP for tip in axis.tips]
+            for tip_id, extraction in zip(axis.tip_ids, axis.extractions):
+                if tip_id != NO_TIP and extraction != NOT_TAGGED:
+                    tip_extraction[tip_id] = extraction
+        self.tip_extraction = tuple(tip_extraction)
+
+    @functools.cached_property
+    def fingerprint(self):
+        # Only the lookup table needs it; hashing on every import would slow cold starts.
+        return rules_fingerprint(self.definition)
+
+    def grind_axis(self, grind_size):
+        return self.grind_time.get(grind_size, self._other_grind)
+
+    def segments(self, ratio, time, temperature, blooming_time, blooming_ratio, pour_count):
+        """Elementary segment of every numeric parameter, in application order (time first)."""
+        return (
+            segment_index(self.time_points, time),
+            self.axes["ratio"].segment(ratio),
+            self.axes["temperature"].segment(temperature),
+            self.axes["blooming_time"].segment(blooming_time),
+            self.axes["blooming_ratio"].segment(blooming_ratio),
+            self.axes["pour_count"].segment(pour_count),
+        )
+
+    def profile(self, ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count):
+        time_seg, ratio_seg, temp_seg, bloom_time_seg, bloom_ratio_seg, pour_seg = self.segments(
+            ratio, time, temperature, blooming_time, blooming_ratio, pour_count
+        )
+        axes = self.axes
+        acid, sweet, bitter, body = self.base
+        for delta in (
+            self.process_method.get(process_method, ZERO_DELTA),
+            self.roast_level.get(roast_level, ZERO_DELTA),
+            self.grind_axis(grind_size).deltas[time_seg],
+            axes["ratio"].deltas[ratio_seg],
+            axes["temperature"].deltas[temp_seg],
+            axes["blooming_time"].deltas[bloom_time_seg],
+            axes["blooming_ratio"].deltas[bloom_ratio_seg],
+            axes["pour_count"].deltas[pour_seg],
+        ):
+            acid += delta[0]
+            sweet += delta[1]
+            bitter += delta[2]
+            body += delta[3]
+        return (
+            min(max(acid, 0), 5),
+            min(max(sweet, 0), 5),
+            min(max(bitter, 0), 5),
+            min(max(body, 0), 5),
+        )
+
+    def tip_codes(self, ratio, time, temperature, grind_size, blooming_time, blooming_ratio, pour_count):
+        """Active tip of every axis as catalog codes, in display order."""
+        time_seg, ratio_seg, temp_seg, bloom_time_seg, bloom_ratio_seg, pour_seg = self.segments(
+            ratio, time, temperature, blooming_time, blooming_ratio, pour_count
+        )
+        axes = self.axes
+        return (
+            self.grind_axis(grind_size).tip_ids[time_seg],
+            axes["ratio"].tip_ids[ratio_seg],
+            axes["temperature"].tip_ids[temp_seg],
+            axes["blooming_time"].tip_ids[bloom_time_seg],
+            axes["blooming_ratio"].tip_ids[bloom_ratio_seg],
+            axes["pour_count"].tip_ids[pour_seg],
+        )
+
+    def tips_for_codes(self, codes):
+        tips = [self.tip_texts[code] for code in codes if code != NO_TIP]
+        if not tips and self.fallback_tip:
+            tips.append(self.fallback_tip)
+        return tips
+
+    def tips(self, ratio, time, temperature, grind_size, blooming_time, blooming_ratio, pour_count):
+        return self.tips_for_codes(self.tip_codes(ratio, time, temperature, grind_size, blooming_time, blooming_ratio, pour_count))
+
+
+def rules_fingerprint(definition):
+    """SHA-256 of a rule definition's canonical JSON; ties derived files to the rules that built them."""
+    import hashlib
+    import json
+
+    text = json.dumps(definition, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def load_rules(path):
+    """Compiles a JSON rule file with the same layout as DEFAULT_RULES."""
+    import json
+
+    with open(path, encoding="utf-8") as f:
+        return RuleSet(json.load(f))
@@ -0,0 +1,107 @@
+import functools
+
+import numpy as np
+
+from flavor_batch import FLAVOR_COLUMNS, PARAM_COLUMNS
+from flavor_space import OPTION_AXES, recipe_space
+
+
+# --- Inverse Design Index ---
+# Built once over the reachable recipe space (see flavor_space). Class combinations
+# are bucketed by (process, roast) and, inside each bucket, grouped by their distinct
+# profile. A query scores only the distinct profiles of the buckets it may use
+# (a few hundred points for a fixed process/roast) and then walks them nearest-first,
+# expanding each into its recipes until k of them satisfy the parameter bounds.
+class RecipeIndex:
+    """k-nearest-recipe search in the 4-D acid/sweet/bitter/body space."""
+
+    def __init__(self, space):
+        self.space = space
+        process = space.combos[:, space.axis("process_method")]
+        roast = space.combos[:, space.axis("roast_level")]
+        bucket = process.astype(np.int64) * len(OPTION_AXES["roast_level"]) + roast
+
+        self.points, distinct = np.unique(space.profiles, axis=0, return_inverse=True)
+        distinct = distinct.ravel()
+        # Sort combinations by (bucket, distinct profile) so each group is one contiguous run.
+        order = np.lexsort((distinct, bucket))
+        group_key = bucket[order] * len(self.points) + distinct[order]
+        starts = np.flatnonzero(np.r_[True, group_key[1:] != group_key[:-1]])
+        self.members = order
+        self.group_start = starts
+        self.group_stop = np.r_[starts[1:], len(order)]
+        self.group_point = distinct[order][starts]
+        self.group_bucket = bucket[order][starts]
+        self._candidates = {}
+
+    def _groups(self, process_method, roast_level):
+        # Groups (and their profile coordinates) of every bucket a filter admits, cached per filter.
+        key = (process_method, roast_level)
+        if key not in self._candidates:
+            processes = range(len(OPTION_AXES["process_method"])) if process_method is None else [OPTION_AXES["process_method"].index(process_method)]
+            roasts = range(len(OPTION_AXES["roast_level"])) if roast_level is None else [OPTION_AXES["roast_level"].index(roast_level)]
+            buckets = [p * len(OPTION_AXES["roast_level"]) + r for p in processes for r in roasts]
+            groups = np.flatnonzero(np.isin(self.group_bucket, buckets))
+            self._candidates[key] = groups, self.points[self.group_point[groups]]
+        return self._candidates[key]
+
+    def _nearest_first(self, distances, k):
+        # Usually only the first few groups are needed; fall back to a full sort when bounds reject many.
+        if len(distances) > 8 * k:
+            head = np.argpartition(distances, 8 * k)[:8 * k]
+            yield from head[np.argsort(distances[head], kind="stable")]
+            rest = np.setdiff1d(np.arange(len(distances)), head, assume_unique=True)
+            yield from rest[np.argsort(distances[rest], kind="stable")]
+        else:
+            yield from np.argsort(distances, kind="stable")
+
+    def query(self, target, k=5, process_method=None, roast_level=None, bounds=None):
+        """The k recipes whose profile is nearest (Euclidean) to `target`.
+
+        `target` is an (acid, sweet, bitter, body) sequence; `bounds` maps numeric
+        parameter names to inclusive (low, high) ranges, e.g. {"temperature": (90, 93)}.
+        Returns dicts with the distance, the profile and a concrete slider recipe.
+        """
+        bounds = bounds or {}
+        target = np.asarray(target, dtype=np.float64)
+        groups, points = self._groups(process_method, roast_level)
+        distances = np.sqrt(((points - target) ** 2).sum(axis=1))
+        allowed = {
+            self.space.axis(name): self.space.class_mask(name, lambda value, low=low, high=high: low <= value <= high)
+            for name, (low, high) in bounds.items()
+        }
+
+        results = []
+        for position in self._nearest_first(distances, k):
+            group = groups[position]
+            combos = self.members[self.group_start[group]:self.group_stop[group]]
+            for axis, mask in allowed.items():
+                combos = combos[mask[self.space.combos[combos, axis]]]
+            for combo in combos[:k - len(results)]:
+                results.append({
+                    "distance": float(distances[position]),
+                    "profile": self.space.profile(combo),
+                    "recipe": self.space.recipe(combo, bounds),
+                })
+            if len(results) >= k:
+                break
+        return results
+
+
+@functools.lru_cache(maxsize=4)
+def recipe_index(rules=None):
+    """Process-wide RecipeIndex for a rule set (the active one by default)."""
+    return RecipeIndex(recipe_space(rules))
+
+
+def nearest_recipes(target, k=5, process_method=None, roast_level=None, bounds=None, rules=None):
+    return recipe_index(rules).query(target, k, process_method, roast_level, bounds)
+
+
+def results_frame(results):
+    """Flattens query results into a pandas DataFrame (distance, profile, then recipe columns)."""
+    import pandas as pd
+
+    return pd.DataFrame([
+        {"distance": result["distance"], **result["profile"], **result["recipe"]} for result in results
+    ], columns=("distance",) + FLAVOR_COLUMNS + PARAM_COLUMNS)
@@ -0,0 +1,298 @@
+import argparse
+import asyncio
+import json
+import logging
+import math
+import time as _time
+from collections import deque
+
+from flavor_batch import FLAVOR_COLUMNS, PARAM_COLUMNS
+from flavor_engine import suggest_flavor_notes
+
+
+logger = logging.getLogger(__name__)
+
+
+# --- Request Schemas ---
+NOTES_FIELDS = FLAVOR_COLUMNS + ("process_method", "roast_level")
+TIPS_FIELDS = ("ratio", "time", "temperature", "grind_size", "blooming_time", "blooming_ratio", "pour_count")
+LABEL_FIELDS = ("grind_size", "process_method", "roast_level")
+
+
+class RequestError(Exception):
+    """A client error, answered with HTTP 400."""
+
+
+def _finite(value):
+    try:
+        return math.isfinite(value)
+    except OverflowError:  # an int too large for a float
+        return False
+
+
+def _parse_fields(payload, fields):
+    if not isinstance(payload, dict):
+        raise RequestError("request body must be a JSON object")
+    missing = [field for field in fields if field not in payload]
+    if missing:
+        raise RequestError(f"missing fields: {', '.join(missing)}")
+    values = []
+    for field in fields:
+        value = payload[field]
+        expected = str if field in LABEL_FIELDS else (int, float)
+        if not isinstance(value, expected) or isinstance(value, bool):
+            raise RequestError(f"{field} must be a {'string' if expected is str else 'number'}")
+        # json.loads accepts NaN and Infinity, which no rule band is defined for.
+        if expected is not str and not _finite(value):
+            raise RequestError(f"{field} must be a finite number")
+        values.append(value)
+    return values
+
+
+# --- Batch Evaluators ---
+# Each takes a list of validated argument lists and returns one JSON-ready result per item.
+def _evaluate_profiles(items):
+    import numpy as np
+
+    from flavor_batch import calculate_flavor_profile_batch
+
+    columns = list(zip(*items))
+    profiles = calculate_flavor_profile_batch(*(
+        np.array(column, dtype=object if name in LABEL_FIELDS else np.float64)
+        for name, column in zip(PARAM_COLUMNS, columns)
+    ))
+    return [dict(zip(FLAVOR_COLUMNS, row)) for row in profiles.tolist()]
+
+
+def _evaluate_tips(items):
+    import numpy as np
+
+    from flavor_batch import adjustment_tip_codes_batch, decode_tips
+
+    columns = list(zip(*items))
+    codes = adjustment_tip_codes_batch(*(
+        np.array(column, dtype=object if name in LABEL_FIELDS else np.float64)
+        for name, column in zip(TIPS_FIELDS, columns)
+    ))
+    return [{"tips": decode_tips(row)} for row in codes.tolist()]
+
+
+def _evaluate_notes(items):
+    # Notes are pure-Python string assembly; batching only amortises the scheduling.
+    return [{"notes": list(suggest_flavor_notes(*item))} for item in items]
+
+
+# --- Micro-Batching ---
+class MicroBatcher:
+    """Merges concurrent submissions into one evaluate() call per batch.
+
+    A batch closes when it holds max_batch_size items or max_wait seconds after its
+    first item arrived, whichever comes first.
+    """
+
+    def __init__(self, evaluate, max_batch_size=256, max_wait=0.002):
+        self.evaluate = evaluate
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._queue = asyncio.Queue()
+        self._task = None
+
+    def start(self):
+        self._task = asyncio.get_running_loop().create_task(self._run())
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+
+    async def submit(self, item):
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((item, future))
+        return await future
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = [await self._queue.get()]
+            deadline = loop.time() + self.max_wait
+            while len(batch) < self.max_batch_size:
+                timeout = deadline - loop.time()
+                if timeout <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+                except asyncio.TimeoutError:
+                    break
+            self.batches += 1
+            self.items += len(batch)
+            try:
+                results = self.evaluate([item for item, _ in batch])
+            except Exception as error:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(error)
+                continue
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+
+# --- Metrics ---
+class LatencyStats:
+    """Request counters and a rolling window of latencies for percentile reporting."""
+
+    def __init__(self, window=10000):
+        self.started = _time.perf_counter()
+        self.requests = 0
+        self.errors = 0
+        self.latencies = deque(maxlen=window)
+
+    def record(self, seconds, ok=True):
+        self.requests += 1
+        self.errors += not ok
+        self.latencies.append(seconds)
+
+    def snapshot(self):
+        ordered = sorted(self.latencies)
+
+        def percentile(q):
+            return ordered[min(len(ordered) - 1, int(q * len(ordered)))] * 1000 if ordered else None
+
+        uptime = _time.perf_counter() - self.started
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "throughput_rps": self.requests / uptime if uptime else 0.0,
+            "p50_ms": percentile(0.50),
+            "p99_ms": percentile(0.99),
+        }
+
+
+# --- HTTP Service ---
+class FlavorService:
+    """Minimal HTTP/1.1 JSON service over asyncio streams (keep-alive, no external dependencies).
+
+    POST /profile, /notes and /tips take the arguments of calculate_flavor_profile,
+    suggest_flavor_notes and adjustment_tips as a JSON object; GET /stats reports
+    latency percentiles, throughput and batch sizes.
+    """
+
+    def __init__(self, max_batch_size=256, max_wait=0.002):
+        self.routes = {
+            "/profile": (PARAM_COLUMNS, MicroBatcher(_evaluate_profiles, max_batch_size, max_wait)),
+            "/notes": (NOTES_FIELDS, MicroBatcher(_evaluate_notes, max_batch_size, max_wait)),
+            "/tips": (TIPS_FIELDS, MicroBatcher(_evaluate_tips, max_batch_size, max_wait)),
+        }
+        self.stats = {path: LatencyStats() for path in self.routes}
+        self.server = None
+
+    @property
+    def port(self):
+        return self.server.sockets[0].getsockname()[1]
+
+    async def start(self, host="127.0.0.1", port=0):
+        for _, batcher in self.routes.values():
+            batcher.start()
+        self.server = await asyncio.start_server(self._handle_connection, host, port)
+        return self
+
+    async def close(self):
+        self.server.close()
+        await self.server.wait_closed()
+        for _, batcher in self.routes.values():
+            await batcher.close()
+
+    def snapshot(self):
+        return {
+            path: {
+                **self.stats[path].snapshot(),
+                "batches": batcher.batches,
+                "mean_batch_size": batcher.items / batcher.batches if batcher.batches else None,
+            }
+            for path, (_, batcher) in self.routes.items()
+        }
+
+    async def _dispatch(self, method, path, body):
+        if path == "/stats" and method == "GET":
+            return 200, self.snapshot()
+        if path not in self.routes:
+            return 404, {"error": f"unknown path {path}"}
+        if method != "POST":
+            return 405, {"error": "use POST"}
+
+        started = _time.perf_counter()
+        fields, batcher = self.routes[path]
+        try:
+            try:
+                payload = json.loads(body or b"null")
+            except ValueError:
+                raise RequestError("request body is not valid JSON") from None
+            result = await batcher.submit(_parse_fields(payload, fields))
+        except RequestError as error:
+            self.stats[path].record(_time.perf_counter() - started, ok=False)
+            return 400, {"error": str(error)}
+        except Exception:
+            logger.exception("evaluating %s failed", path)
+            self.stats[path].record(_time.perf_counter() - started, ok=False)
+            return 500, {"error": "internal error"}
+        self.stats[path].record(_time.perf_counter() - started)
+        return 200, result
+
+    async def _handle_connection(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                method, path, version = request_line.decode("latin-1").split()
+                headers = {}
+                while (line := await reader.readline()) not in (b"\r\n", b"\n", b""):
+                    name, _, value = line.decode("latin-1").partition(":")
+                    headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", 0)))
+
+                status, result = await self._dispatch(method, path, body)
+                payload = json.dumps(result, ensure_ascii=False).encode("utf-8")
+                keep_alive = headers.get("connection", "").lower() != "close" and version == "HTTP/1.1"
+                writer.write(
+                    f"HTTP/1.1 {status} {_REASONS[status]}\r\n"
+                    f"Content-Type: application/json; charset=utf-8\r\n"
+                    f"Content-Length: {len(payload)}\r\n"
+                    f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n".encode("latin-1") + payload
+                )
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ValueError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+
+_REASONS = {200: "OK", 400: "Bad Request", 404: "Not Found", 405: "Method Not Allowed", 500: "Internal Server Error"}
+
+
+async def serve(host="127.0.0.1", port=8765, max_batch_size=256, max_wait=0.002):
+    service = await FlavorService(max_batch_size, max_wait).start(host, port)
+    print(f"flavor service listening on http://{host}:{service.port}")
+    async with service.server:
+        await service.server.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Local JSON scoring service with request micro-batching.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--max-batch-size", type=int, default=256)
+    parser.add_argument("--max-wait-ms", type=float, default=2.0)
+    args = parser.parse_args(argv)
+    asyncio.run(serve(args.host, args.port, args.max_batch_size, args.max_wait_ms / 1000))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,299 @@
+import functools
+
+import numpy as np
+
+import flavor_engine
+from flavor_batch import FLAVOR_COLUMNS, calculate_flavor_profile_batch, encode_options
+from flavor_engine import GRIND_SIZE_OPTIONS, PROCESS_METHOD_OPTIONS, ROAST_LEVEL_OPTIONS, SLIDER_RANGES
+from flavor_rules import NUMERIC_AXES, OTHER_GRIND, ZERO_DELTA, parse_interval
+
+
+# --- Smooth Flavor Model ---
+# A continuous stand-in for RuleSet.profile. Every band of a numeric axis becomes a
+# smooth indicator, the product of a rising and a falling logistic step, so the offsets
+# change gradually instead of jumping. A step sits halfway between the slider value
+# just inside the band and the one just outside it, which puts open/closed endpoints
+# on the right side: as `sharpness` (the step width in slider steps) goes to 0 the
+# model equals the discrete one at every slider value. The final 0-5 clamp becomes a
+# difference of two softplus functions. Bands on one axis must not overlap (at most
+# one applies in the discrete model too).
+SMOOTH_PARAMS = ("ratio", "time", "temperature", "blooming_time", "blooming_ratio", "pour_count")
+DEFAULT_SHARPNESS = 0.1
+DEFAULT_CLAMP_SHARPNESS = 50.0  # softplus beta; the clamp is off by at most log(2)/beta at 0 and 5
+
+
+def _sigmoid(z):
+    return 0.5 * (1 + np.tanh(0.5 * z))
+
+
+def _softplus(z, beta):
+    return np.logaddexp(0, beta * z) / beta
+
+
+def _on_grid(name, value):
+    slider = SLIDER_RANGES[name]
+    position = (value - slider["min_value"]) / slider["step"]
+    return abs(position - round(position)) < 1e-9
+
+
+def _step_center(name, bound, closed, rising):
+    # Off-grid endpoints need no shift: no slider value sits on them.
+    if not np.isfinite(bound) or not _on_grid(name, bound):
+        return bound
+    half = SLIDER_RANGES[name]["step"] / 2
+    # A closed endpoint keeps its own slider value inside the band, an open one leaves it out.
+    outward = -half if rising else half
+    return bound + (outward if closed else -outward)
+
+
+class SmoothAxis:
+    """The bands of one numeric axis as logistic step centres and (B, 4) offsets."""
+
+    def __init__(self, name, bands):
+        self.name = name
+        self.step = SLIDER_RANGES[name]["step"]
+        lows, highs, deltas = [], [], []
+        for band in bands:
+            if "delta" not in band:
+                continue
+            low, high, low_closed, high_closed = parse_interval(band["when"])
+            lows.append(_step_center(name, low, low_closed, rising=True))
+            highs.append(_step_center(name, high, high_closed, rising=False))
+            deltas.append(band["delta"])
+        self.lows = np.array(lows, dtype=np.float64)
+        self.highs = np.array(highs, dtype=np.float64)
+        self.deltas = np.array(deltas, dtype=np.float64).reshape(-1, len(FLAVOR_COLUMNS))
+
+    def offsets(self, x, sharpness):
+        """(N, 4) offsets at x and their (N, 4) derivatives with respect to x."""
+        width = sharpness * self.step
+        x = x[:, None]
+        finite_low, finite_high = np.isfinite(self.lows), np.isfinite(self.highs)
+        rise = np.where(finite_low, _sigmoid((x - np.where(finite_low, self.lows, 0)) / width), 1.0)
+        fall = np.where(finite_high, _sigmoid((np.where(finite_high, self.highs, 0) - x) / width), 1.0)
+        indicator = rise * fall
+        slope = (rise * (1 - rise) * fall - rise * fall * (1 - fall)) / width
+        return indicator @ self.deltas, slope @ self.deltas
+
+
+class SmoothRules:
+    """Smooth version of a RuleSet with analytic gradients."""
+
+    def __init__(self, rules=None):
+        rules = rules or flavor_engine.RULES
+        definition = rules.definition
+        self.base = np.array(rules.base)
+        self.process_method = np.array([ZERO_DELTA] + [rules.process_method.get(o, ZERO_DELTA) for o in PROCESS_METHOD_OPTIONS])
+        self.roast_level = np.array([ZERO_DELTA] + [rules.roast_level.get(o, ZERO_DELTA) for o in ROAST_LEVEL_OPTIONS])
+        grind_time = definition.get("grind_time", {})
+        # Index = grind code + 1; code -1 (unknown label) uses the "*" bands like RuleSet.grind_axis.
+        self.grind_time = [
+            SmoothAxis("time", grind_time.get(grind, grind_time.get(OTHER_GRIND, [])))
+            for grind in (None, *GRIND_SIZE_OPTIONS)
+        ]
+        self.axes = {name: SmoothAxis(name, definition.get(name, [])) for name in NUMERIC_AXES}
+
+    def profile(self, ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count,
+                sharpness=DEFAULT_SHARPNESS, clamp_sharpness=DEFAULT_CLAMP_SHARPNESS):
+        """Smooth profiles (N, 4) and their Jacobian (N, 4, 6) with respect to SMOOTH_PARAMS.
+
+        Arguments broadcast like calculate_flavor_profile_batch.
+        """
+        columns = np.broadcast_arrays(
+            np.asarray(ratio, dtype=np.float64),
+            np.asarray(time, dtype=np.float64),
+            np.asarray(temperature, dtype=np.float64),
+            encode_options(grind_size, GRIND_SIZE_OPTIONS),
+            encode_options(process_method, PROCESS_METHOD_OPTIONS),
+            encode_options(roast_level, ROAST_LEVEL_OPTIONS),
+            np.asarray(blooming_time, dtype=np.float64),
+            np.asarray(blooming_ratio, dtype=np.float64),
+            np.asarray(pour_count, dtype=np.float64),
+        )
+        ratio, time, temperature, grind, process, roast, blooming_time, blooming_ratio, pour_count = (
+            np.ravel(column) for column in columns
+        )
+        raw = self.base + self.process_method[process + 1] + self.roast_level[roast + 1]
+        jacobian = np.zeros((len(raw), len(FLAVOR_COLUMNS), len(SMOOTH_PARAMS)))
+
+        for code, axis in enumerate(self.grind_time, start=-1):
+            rows = grind == code
+            if rows.any():
+                offsets, slopes = axis.offsets(time[rows], sharpness)
+                raw[rows] += offsets
+                jacobian[rows, :, SMOOTH_PARAMS.index("time")] = slopes
+        for name, values in (
+            ("ratio", ratio),
+            ("temperature", temperature),
+            ("blooming_time", blooming_time),
+            ("blooming_ratio", blooming_ratio),
+            ("pour_count", pour_count),
+        ):
+            offsets, slopes = self.axes[name].offsets(values, sharpness)
+            raw += offsets
+            jacobian[:, :, SMOOTH_PARAMS.index(name)] = slopes
+
+        profile = _softplus(raw, clamp_sharpness) - _softplus(raw - 5, clamp_sharpness)
+        clamp_slope = _sigmoid(clamp_sharpness * raw) - _sigmoid(clamp_sharpness * (raw - 5))
+        return profile, jacobian * clamp_slope[:, :, None]
+
+
+@functools.lru_cache(maxsize=4)
+def smooth_rules(rules=None):
+    """Process-wide SmoothRules for a rule set (the active one by default)."""
+    return SmoothRules(rules)
+
+
+def smooth_profile(ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count,
+                   sharpness=DEFAULT_SHARPNESS, rules=None):
+    """(profiles, jacobian) of the smooth model; see SmoothRules.profile."""
+    return smooth_rules(rules).profile(
+        ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count,
+        sharpness=sharpness,
+    )
+
+
+def grid_error(n=100_000, seed=0, sharpness=DEFAULT_SHARPNESS, rules=None):
+    """Max and mean absolute difference from calculate_flavor_profile_batch at n random slider-grid recipes."""
+    from flavor_space import slider_values
+
+    rng = np.random.default_rng(seed)
+    columns = {name: rng.choice(slider_values(name), n) for name in SMOOTH_PARAMS}
+    options = {name: rng.integers(0, 3, n) for name in ("grind_size", "process_method", "roast_level")}
+    arguments = (
+        columns["ratio"], columns["time"], columns["temperature"],
+        options["grind_size"], options["process_method"], options["roast_level"],
+        columns["blooming_time"], columns["blooming_ratio"], columns["pour_count"],
+    )
+    smooth, _ = smooth_profile(*arguments, sharpness=sharpness, rules=rules)
+    error = np.abs(smooth - calculate_flavor_profile_batch(*arguments, rules=rules))
+    return float(error.max()), float(error.mean())
+
+
+# --- Gradient-Based Recipe Optimizer ---
+# Projected Adam on the six numeric parameters, measured in slider steps and kept
+# inside the slider ranges. Far from a band edge the sharp model is flat, so the
+# optimizer starts with wide transitions (START_SHARPNESS) and narrows them to
+# DEFAULT_SHARPNESS as it converges. Several starts for every allowed grind /
+# process / roast combination run as one batch. Each result is snapped to the
+# slider grid and improved by a short discrete neighbour search; the best one wins.
+START_SHARPNESS = 1.0
+DEFAULT_STEPS = 60
+DEFAULT_STARTS = 32
+LEARNING_RATE = 0.3  # slider steps per iteration
+ADAM_BETAS = (0.9, 0.999)
+POLISH_ROUNDS = 5
+
+
+def target_objective(target, weights=None):
+    """Weighted squared distance to a target (acid, sweet, bitter, body) profile, for optimize_recipe."""
+    target = np.asarray(target, dtype=np.float64)
+    weights = np.ones(len(FLAVOR_COLUMNS)) if weights is None else np.asarray(weights, dtype=np.float64)
+
+    def objective(profiles):
+        difference = profiles - target
+        return (weights * difference ** 2).sum(axis=1), 2 * weights * difference
+
+    return objective
+
+
+def optimize_recipe(objective, grind_size=None, process_method=None, roast_level=None, bounds=None,
+                    steps=DEFAULT_STEPS, starts=DEFAULT_STARTS, seed=0, rules=None):
+    """The slider recipe minimising `objective`, found by gradient descent on the smooth model.
+
+    `objective(profiles)` takes (N, 4) profiles and returns (N,) losses and their (N, 4)
+    gradients (see target_objective). Selectors left as None are searched over all options;
+    `bounds` maps numeric parameters to inclusive (low, high) ranges, as in RecipeIndex.query.
+    Returns {"recipe", "profile" (discrete model), "loss", "evaluations"}.
+    """
+    model = smooth_rules(rules)
+    choices = [
+        range(len(options)) if chosen is None else [options.index(chosen)]
+        for chosen, options in ((grind_size, GRIND_SIZE_OPTIONS), (process_method, PROCESS_METHOD_OPTIONS), (roast_level, ROAST_LEVEL_OPTIONS))
+    ]
+    combos = np.array([(g, p, r) for g in choices[0] for p in choices[1] for r in choices[2]], dtype=np.int8)
+    combos = np.repeat(combos, starts, axis=0)
+    rows = len(combos)
+
+    low = np.array([SLIDER_RANGES[name]["min_value"] for name in SMOOTH_PARAMS], dtype=np.float64)
+    step = np.array([SLIDER_RANGES[name]["step"] for name in SMOOTH_PARAMS], dtype=np.float64)
+    # Positions are counted in slider steps from each slider's minimum.
+    bounds = bounds or {}
+    floor, ceiling = [], []
+    for i, name in enumerate(SMOOTH_PARAMS):
+        slider_low, slider_high = bounds.get(name, (SLIDER_RANGES[name]["min_value"], SLIDER_RANGES[name]["max_value"]))
+        floor.append(np.ceil((max(slider_low, low[i]) - low[i]) / step[i] - 1e-9))
+        ceiling.append(np.floor((min(slider_high, SLIDER_RANGES[name]["max_value"]) - low[i]) / step[i] + 1e-9))
+    floor, ceiling = np.array(floor), np.array(ceiling)
+    if (floor > ceiling).any():
+        raise ValueError("bounds leave no slider value")
+    rng = np.random.default_rng(seed)
+    position = floor + rng.uniform(0, 1, (rows, len(SMOOTH_PARAMS))) * (ceiling - floor)
+
+    def evaluate(position, sharpness):
+        x = low + position * step
+        return model.profile(
+            x[:, 0], x[:, 1], x[:, 2], combos[:, 0], combos[:, 1], combos[:, 2], x[:, 3], x[:, 4], x[:, 5],
+            sharpness=sharpness,
+        )
+
+    first, second = np.zeros_like(position), np.zeros_like(position)
+    beta1, beta2 = ADAM_BETAS
+    for i in range(steps):
+        sharpness = START_SHARPNESS * (DEFAULT_SHARPNESS / START_SHARPNESS) ** (i / max(steps - 1, 1))
+        profiles, jacobian = evaluate(position, sharpness)
+        _, loss_gradient = objective(profiles)
+        gradient = np.einsum("nf,nfp->np", loss_gradient, jacobian) * step
+        first = beta1 * first + (1 - beta1) * gradient
+        second = beta2 * second + (1 - beta2) * gradient ** 2
+        update = (first / (1 - beta1 ** (i + 1))) / (np.sqrt(second / (1 - beta2 ** (i + 1))) + 1e-8)
+        position = np.clip(position - LEARNING_RATE * update, floor, ceiling)
+
+    # Snap to the slider grid, then move one slider step at a time while the discrete model improves.
+    position = np.rint(position)
+
+    def discrete(position, combos):
+        x = low + position * step
+        profiles = calculate_flavor_profile_batch(
+            x[:, 0], x[:, 1], x[:, 2], combos[:, 0], combos[:, 1], combos[:, 2], x[:, 3], x[:, 4], x[:, 5], rules=rules,
+        )
+        return profiles, objective(profiles)[0]
+
+    moves = np.concatenate([np.eye(len(SMOOTH_PARAMS)), -np.eye(len(SMOOTH_PARAMS))])
+    profiles, losses = discrete(position, combos)
+    evaluations = steps * rows + rows
+    for _ in range(POLISH_ROUNDS):
+        candidates = np.clip(position[:, None, :] + moves, floor, ceiling).reshape(-1, len(SMOOTH_PARAMS))
+        candidate_profiles, candidate_losses = discrete(candidates, np.repeat(combos, len(moves), axis=0))
+        evaluations += len(candidates)
+        choice = candidate_losses.reshape(rows, len(moves)).argmin(axis=1)
+        picked = np.arange(rows) * len(moves) + choice
+        better = candidate_losses[picked] < losses - 1e-12
+        if not better.any():
+            break
+        position[better] = candidates[picked[better]]
+        profiles[better] = candidate_profiles[picked[better]]
+        losses[better] = candidate_losses[picked[better]]
+
+    snapped = low + position * step
+    best = int(np.argmin(losses))
+    # low + i * step, the same values flavor_space.slider_values lists.
+    recipe = {name: snapped[best, i].item() for i, name in enumerate(SMOOTH_PARAMS)}
+    for name in ("time", "temperature", "blooming_time", "pour_count"):
+        recipe[name] = int(recipe[name])
+    recipe["grind_size"] = GRIND_SIZE_OPTIONS[combos[best, 0]]
+    recipe["process_method"] = PROCESS_METHOD_OPTIONS[combos[best, 1]]
+    recipe["roast_level"] = ROAST_LEVEL_OPTIONS[combos[best, 2]]
+    return {
+        "recipe": recipe,
+        "profile": dict(zip(FLAVOR_COLUMNS, profiles[best].round(1).tolist())),
+        "loss": float(losses[best]),
+        "evaluations": evaluations,
+    }
+
+
+def optimize_target(target, weights=None, grind_size=None, process_method=None, roast_level=None, bounds=None, rules=None):
+    """optimize_recipe for the profile closest to `target` (acid, sweet, bitter, body)."""
+    return optimize_recipe(
+        target_objective(target, weights), grind_size, process_method, roast_level, bounds=bounds, rules=rules
+    )
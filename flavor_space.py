@@ -0,0 +1,112 @@
+import functools
+
+import numpy as np
+
+import flavor_engine
+from flavor_batch import FLAVOR_COLUMNS, PARAM_COLUMNS, calculate_flavor_profile_batch
+from flavor_engine import DEFAULT_PARAMS, GRIND_SIZE_OPTIONS, PROCESS_METHOD_OPTIONS, ROAST_LEVEL_OPTIONS, SLIDER_RANGES
+from flavor_rules import segment_index
+
+
+# --- Reachable Recipe Space ---
+# The rules are piecewise constant, so slider values that select the same offsets on
+# an axis are interchangeable. Grouping them into classes collapses the ~88M slider
+# combinations into a few tens of thousands of class combinations, each of which
+# stands for a box of concrete recipes that all share one profile.
+OPTION_AXES = {
+    "grind_size": GRIND_SIZE_OPTIONS,
+    "process_method": PROCESS_METHOD_OPTIONS,
+    "roast_level": ROAST_LEVEL_OPTIONS,
+}
+DEFAULT_RECIPE = {
+    "ratio": DEFAULT_PARAMS["ratio"],
+    "time": DEFAULT_PARAMS["time"],
+    "temperature": DEFAULT_PARAMS["temperature"],
+    "grind_size": GRIND_SIZE_OPTIONS[DEFAULT_PARAMS["grind_size_index"]],
+    "process_method": PROCESS_METHOD_OPTIONS[DEFAULT_PARAMS["process_method_index"]],
+    "roast_level": ROAST_LEVEL_OPTIONS[DEFAULT_PARAMS["roast_level_index"]],
+    "blooming_time": DEFAULT_PARAMS["blooming_time"],
+    "blooming_ratio": DEFAULT_PARAMS["blooming_ratio"],
+    "pour_count": DEFAULT_PARAMS["pour_count"],
+}
+
+
+def slider_values(name):
+    """Every value the sidebar slider `name` can take."""
+    slider = SLIDER_RANGES[name]
+    low, high, step = slider["min_value"], slider["max_value"], slider["step"]
+    return [low + i * step for i in range(int(round((high - low) / step)) + 1)]
+
+
+def _value_classes(name, rules):
+    # Group slider values by the offsets they select; for time the key spans every grind size.
+    classes = {}
+    for value in slider_values(name):
+        if name == "time":
+            segment = segment_index(rules.time_points, value)
+            key = tuple(rules.grind_axis(grind).deltas[segment] for grind in GRIND_SIZE_OPTIONS)
+        else:
+            axis = rules.axes[name]
+            key = axis.deltas[axis.segment(value)]
+        classes.setdefault(key, []).append(value)
+    return list(classes.values())
+
+
+class RecipeSpace:
+    """Class combinations of the slider grid with their (exact) profiles.
+
+    `classes[axis]` lists the values of each class (option labels for selectors),
+    `combos` is an (M, 9) array of class ids in PARAM_COLUMNS order and
+    `profiles` the matching (M, 4) acid/sweet/bitter/body array.
+    """
+
+    def __init__(self, rules=None):
+        rules = rules or flavor_engine.RULES
+        self.classes = {
+            name: [[option] for option in OPTION_AXES[name]] if name in OPTION_AXES else _value_classes(name, rules)
+            for name in PARAM_COLUMNS
+        }
+        shape = tuple(len(self.classes[name]) for name in PARAM_COLUMNS)
+        self.combos = np.indices(shape, dtype=np.int16).reshape(len(shape), -1).T.copy()
+        representatives = [
+            np.array([values[0] for values in self.classes[name]], dtype=object if name in OPTION_AXES else np.float64)[self.combos[:, i]]
+            for i, name in enumerate(PARAM_COLUMNS)
+        ]
+        self.profiles = calculate_flavor_profile_batch(*representatives, rules=rules)
+        # Number of concrete slider recipes behind each class combination.
+        sizes = [np.array([len(values) for values in self.classes[name]], dtype=np.int64) for name in PARAM_COLUMNS]
+        self.multiplicity = np.prod([size[self.combos[:, i]] for i, size in enumerate(sizes)], axis=0)
+
+    def __len__(self):
+        return len(self.combos)
+
+    def axis(self, name):
+        return PARAM_COLUMNS.index(name)
+
+    def class_mask(self, name, allowed):
+        """Boolean mask over the classes of `name` that contain at least one value accepted by `allowed`."""
+        return np.array([any(allowed(value) for value in values) for values in self.classes[name]])
+
+    def recipe(self, combo, bounds=None, prefer=DEFAULT_RECIPE):
+        """A concrete recipe for combination `combo`: in each class, the value nearest `prefer` within `bounds`."""
+        bounds = bounds or {}
+        recipe = {}
+        for i, name in enumerate(PARAM_COLUMNS):
+            values = self.classes[name][self.combos[combo, i]]
+            if name in OPTION_AXES:
+                recipe[name] = values[0]
+                continue
+            low, high = bounds.get(name, (-np.inf, np.inf))
+            candidates = [value for value in values if low <= value <= high] or values
+            recipe[name] = min(candidates, key=lambda value: abs(value - prefer[name]))
+        return recipe
+
+    def profile(self, combo):
+        return dict(zip(FLAVOR_COLUMNS, self.profiles[combo].tolist()))
+
+
+@functools.lru_cache(maxsize=4)
+def recipe_space(rules=None):
+    """Process-wide RecipeSpace for a rule set (the active one by default)."""
+    return RecipeSpace(rules)
+
@@ -0,0 +1,202 @@
+import argparse
+import importlib.util
+import json
+import os
+import sys
+import time as _time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from pathlib import Path
+
+import numpy as np
+
+from flavor_batch import (
+    FLAVOR_COLUMNS,
+    PARAM_COLUMNS,
+    TIP_COLUMNS,
+    adjustment_tip_codes_batch,
+    calculate_flavor_profile_batch,
+    tip_catalog,
+)
+from flavor_engine import SLIDER_RANGES
+from flavor_space import OPTION_AXES
+
+
+# --- Sweep Specification ---
+# A sweep is the Cartesian product of one value list per parameter, enumerated in
+# row-major PARAM_COLUMNS order. Chunk i covers flat rows [i * chunk_size, (i + 1) * chunk_size),
+# so any chunk can be rebuilt from the spec alone and workers never receive row data.
+MANIFEST_NAME = "sweep.json"
+TIPS_NAME = "tips.json"
+DEFAULT_CHUNK_SIZE = 500_000
+
+
+def parse_range(text):
+    """Parses "start:stop:step" (inclusive stop) or a comma-separated list of numbers."""
+    if ":" in text:
+        start, stop, step = (float(part) for part in text.split(":"))
+        count = int(round((stop - start) / step)) + 1
+        return [start + i * step for i in range(count)]
+    return [float(part) for part in text.split(",")]
+
+
+def parse_options(text, options):
+    """Parses "all" or comma-separated option labels / integer codes into a list of codes."""
+    if text == "all":
+        return list(range(len(options)))
+    return [int(part) if part.isdigit() else options.index(part) for part in text.split(",")]
+
+
+def default_spec():
+    spec = {}
+    for name in PARAM_COLUMNS:
+        if name in OPTION_AXES:
+            spec[name] = list(range(len(OPTION_AXES[name])))
+        else:
+            slider = SLIDER_RANGES[name]
+            spec[name] = parse_range(f"{slider['min_value']}:{slider['max_value']}:{slider['step']}")
+    return spec
+
+
+def spec_shape(spec):
+    return tuple(len(spec[name]) for name in PARAM_COLUMNS)
+
+
+def chunk_columns(spec, start, stop):
+    """Parameter columns for flat rows [start, stop) of the sweep."""
+    indices = np.unravel_index(np.arange(start, stop, dtype=np.int64), spec_shape(spec))
+    return {
+        name: np.asarray(spec[name], dtype=np.int8 if name in OPTION_AXES else np.float64)[index]
+        for name, index in zip(PARAM_COLUMNS, indices)
+    }
+
+
+# --- Chunk Worker ---
+def _part_path(output, chunk, fmt):
+    return Path(output) / f"part-{chunk:06d}.{fmt}"
+
+
+def score_chunk(spec, output, chunk, chunk_size, fmt):
+    """Scores one chunk and writes it atomically; an existing part file marks it done."""
+    import pandas as pd
+
+    total = int(np.prod(spec_shape(spec)))
+    start, stop = chunk * chunk_size, min((chunk + 1) * chunk_size, total)
+    columns = chunk_columns(spec, start, stop)
+    profile = calculate_flavor_profile_batch(*(columns[name] for name in PARAM_COLUMNS))
+    tips = adjustment_tip_codes_batch(
+        columns["ratio"], columns["time"], columns["temperature"], columns["grind_size"],
+        columns["blooming_time"], columns["blooming_ratio"], columns["pour_count"],
+    )
+
+    frame = pd.DataFrame(columns)
+    for name in OPTION_AXES:
+        frame[name] = pd.Categorical.from_codes(frame[name], categories=OPTION_AXES[name])
+    for i, name in enumerate(FLAVOR_COLUMNS):
+        frame[name] = profile[:, i]
+    for i, name in enumerate(TIP_COLUMNS):
+        frame[f"tip_{name}"] = tips[:, i]
+
+    path = _part_path(output, chunk, fmt)
+    partial = path.with_name(path.name + ".partial")
+    if fmt == "parquet":
+        frame.to_parquet(partial, index=False)
+    else:
+        frame.to_csv(partial, index=False)
+    os.replace(partial, path)
+    return chunk, stop - start
+
+
+# --- Driver ---
+def _write_manifest(output, spec, chunk_size, fmt):
+    # The manifest pins the sweep definition; resuming with a different one would mix results.
+    manifest = {"spec": spec, "chunk_size": chunk_size, "format": fmt, "columns": list(PARAM_COLUMNS)}
+    path = Path(output) / MANIFEST_NAME
+    if path.exists():
+        existing = json.loads(path.read_text(encoding="utf-8"))
+        if existing != manifest:
+            raise SystemExit(f"{path} describes a different sweep; use a new output directory")
+    else:
+        path.write_text(json.dumps(manifest, ensure_ascii=False, indent=2), encoding="utf-8")
+        (Path(output) / TIPS_NAME).write_text(json.dumps(list(tip_catalog()), ensure_ascii=False, indent=2), encoding="utf-8")
+
+
+def run_sweep(spec, output, chunk_size=DEFAULT_CHUNK_SIZE, workers=None, fmt="parquet", progress=None):
+    """Runs (or resumes) a sweep into `output`; returns the number of rows written by this run."""
+    output = Path(output)
+    output.mkdir(parents=True, exist_ok=True)
+    _write_manifest(output, spec, chunk_size, fmt)
+
+    total = int(np.prod(spec_shape(spec)))
+    chunks = -(-total // chunk_size)
+    pending = [chunk for chunk in range(chunks) if not _part_path(output, chunk, fmt).exists()]
+    done_chunks = chunks - len(pending)
+    written = 0
+
+    # Keep at most two chunks per worker in flight so memory stays bounded however large the sweep.
+    workers = workers or os.cpu_count() or 1
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        in_flight = set()
+        queue = iter(pending)
+        while True:
+            for chunk in queue:
+                in_flight.add(pool.submit(score_chunk, spec, output, chunk, chunk_size, fmt))
+                if len(in_flight) >= 2 * workers:
+                    break
+            if not in_flight:
+                break
+            finished, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in finished:
+                _, rows = future.result()
+                written += rows
+                done_chunks += 1
+                if progress is not None:
+                    progress(done_chunks, chunks, written)
+    return written
+
+
+def _progress_printer(total_rows):
+    started = _time.perf_counter()
+
+    def report(done_chunks, chunks, written):
+        elapsed = _time.perf_counter() - started
+        rate = written / elapsed if elapsed else 0.0
+        remaining = total_rows * (chunks - done_chunks) / chunks
+        eta = remaining / rate if rate else float("inf")
+        print(f"\r{done_chunks}/{chunks} chunks, {rate:,.0f} rows/s, ETA {eta:,.0f}s", end="", file=sys.stderr, flush=True)
+
+    return report
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Sweep calculate_flavor_profile and adjustment_tips over a parameter grid.")
+    parser.add_argument("output", type=Path, help="output directory (re-run the same command to resume)")
+    for name in PARAM_COLUMNS:
+        if name in OPTION_AXES:
+            parser.add_argument(f"--{name.replace('_', '-')}", default="all", help="'all' or comma-separated labels/codes")
+        else:
+            parser.add_argument(f"--{name.replace('_', '-')}", help="start:stop:step or comma-separated values (default: slider grid)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE)
+    parser.add_argument("--workers", type=int, default=None)
+    parser.add_argument(
+        "--format", choices=("parquet", "csv"),
+        default="parquet" if importlib.util.find_spec("pyarrow") else "csv",
+        help="parquet needs pyarrow",
+    )
+    args = parser.parse_args(argv)
+
+    spec = default_spec()
+    for name in PARAM_COLUMNS:
+        value = getattr(args, name)
+        if name in OPTION_AXES:
+            spec[name] = parse_options(value, OPTION_AXES[name])
+        elif value is not None:
+            spec[name] = parse_range(value)
+
+    total = int(np.prod(spec_shape(spec)))
+    print(f"sweeping {total:,} recipes into {args.output}", file=sys.stderr)
+    run_sweep(spec, args.output, args.chunk_size, args.workers, args.format, progress=_progress_printer(total))
+    print(file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
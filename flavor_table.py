@@ -0,0 +1,198 @@
+import argparse
+import functools
+import os
+import sys
+import time as _time
+from pathlib import Path
+
+import numpy as np
+
+import flavor_engine
+from flavor_batch import FLAVOR_COLUMNS, calculate_flavor_profile_batch, encode_options
+from flavor_engine import GRIND_SIZE_OPTIONS, PROCESS_METHOD_OPTIONS, ROAST_LEVEL_OPTIONS, SLIDER_RANGES
+
+
+# --- Grid Definition ---
+# One axis per sidebar widget, in calculate_flavor_profile argument order.
+# Numeric axes are (name, min, max, step) exactly as the sliders define them;
+# selector axes are (name, options).
+def _slider_axis(name):
+    slider = SLIDER_RANGES[name]
+    return (name, slider["min_value"], slider["max_value"], slider["step"])
+
+
+GRID_AXES = (
+    _slider_axis("ratio"),
+    _slider_axis("time"),
+    _slider_axis("temperature"),
+    ("grind_size", GRIND_SIZE_OPTIONS),
+    ("process_method", PROCESS_METHOD_OPTIONS),
+    ("roast_level", ROAST_LEVEL_OPTIONS),
+    _slider_axis("blooming_time"),
+    _slider_axis("blooming_ratio"),
+    _slider_axis("pour_count"),
+)
+
+# Scores are stored in tenths: every rule delta is a multiple of 0.1 (the bloom-ratio
+# rule adds 0.8) and scores are clamped to 0-5, so 0..50 fits an int8 exactly.
+SCALE = 10
+
+DEFAULT_TABLE_PATH = Path(os.environ.get(
+    "FLAVOR_TABLE_PATH", Path(__file__).with_name("flavor_table.npy")
+))
+
+
+# --- Rule Fingerprint ---
+# The .npy header has no room for metadata, so the fingerprint of the rule set that
+# built a table (flavor_rules.rules_fingerprint) sits next to it in <table>.rules.
+class StaleTableError(ValueError):
+    """The table was built from a different rule set, or records none."""
+
+
+def fingerprint_path(path):
+    path = Path(path)
+    return path.with_name(path.name + ".rules")
+
+
+def _axis_size(axis):
+    if len(axis) == 2:
+        return len(axis[1])
+    _, low, high, step = axis
+    return int(round((high - low) / step)) + 1
+
+
+def _axis_values(axis):
+    if len(axis) == 2:
+        return np.arange(len(axis[1]), dtype=np.int8)
+    _, low, _, step = axis
+    return low + step * np.arange(_axis_size(axis))
+
+
+GRID_SHAPE = tuple(_axis_size(axis) for axis in GRID_AXES)
+# Row-major strides (in recipes) of each axis in the flattened table.
+GRID_STRIDES = tuple(int(np.prod(GRID_SHAPE[i + 1:])) for i in range(len(GRID_SHAPE)))
+
+
+def _scalar_index(axis, value):
+    # Pure-Python twin of _axis_index for single lookups, where NumPy call overhead would dominate.
+    if len(axis) == 2:
+        try:
+            return axis[1].index(value)
+        except ValueError:
+            raise ValueError(f"{axis[0]}: unknown option {value!r}") from None
+    name, low, high, step = axis
+    position = (value - low) / step
+    index = round(position)
+    if abs(position - index) > 1e-6 or not 0 <= index < _axis_size(axis):
+        raise ValueError(f"{name}: {value!r} is not a slider step between {low} and {high}")
+    return index
+
+
+def _axis_index(axis, value):
+    if len(axis) == 2:
+        index = encode_options(value, axis[1])
+        if np.any(index < 0) or np.any(index >= len(axis[1])):
+            raise ValueError(f"{axis[0]}: unknown option {value!r}")
+        return index.astype(np.intp)
+    name, low, high, step = axis
+    position = (np.asarray(value, dtype=np.float64) - low) / step
+    index = np.rint(position).astype(np.intp)
+    if np.any(np.abs(position - index) > 1e-6) or np.any(index < 0) or np.any(index >= _axis_size(axis)):
+        raise ValueError(f"{name}: {value!r} is not a slider step between {low} and {high}")
+    return index
+
+
+# --- Table Access ---
+class FlavorTable:
+    """Read-only view of a prebuilt profile table; lookups are pure index arithmetic."""
+
+    def __init__(self, scores):
+        if scores.shape != GRID_SHAPE + (len(FLAVOR_COLUMNS),) or scores.dtype != np.int8:
+            raise ValueError(f"flavor table has shape {scores.shape} {scores.dtype}, expected {GRID_SHAPE + (4,)} int8")
+        self.scores = scores
+        self._flat = scores.reshape(-1, len(FLAVOR_COLUMNS))
+
+    @classmethod
+    def open(cls, path=DEFAULT_TABLE_PATH, rules=None):
+        """Maps the table at `path`; raises StaleTableError unless it was built from `rules` (default: active)."""
+        rules = rules or flavor_engine.RULES
+        try:
+            built_from = fingerprint_path(path).read_text(encoding="utf-8").strip()
+        except FileNotFoundError:
+            built_from = None
+        if built_from != rules.fingerprint:
+            raise StaleTableError(f"{path} was not built from the active rule set; rebuild it with `python flavor_table.py`")
+        return cls(np.load(path, mmap_mode="r"))
+
+    def lookup(self, ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count):
+        """Same arguments as calculate_flavor_profile, for values on the slider grid.
+
+        Scores come back rounded to the 0.1 grid, so they can differ from the rule
+        evaluation in the last float digit (0.3 instead of 0.30000000000000004).
+        """
+        values = (ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count)
+        flat = sum(_scalar_index(axis, value) * stride for axis, value, stride in zip(GRID_AXES, values, GRID_STRIDES))
+        return tuple(score / SCALE for score in self._flat[flat].tolist())
+
+    def lookup_batch(self, ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count):
+        """Vectorized lookup; returns an (N, 4) float64 array like calculate_flavor_profile_batch."""
+        values = (ratio, time, temperature, grind_size, process_method, roast_level, blooming_time, blooming_ratio, pour_count)
+        indices = [_axis_index(axis, value) for axis, value in zip(GRID_AXES, values)]
+        flat = np.ravel_multi_index(np.broadcast_arrays(*indices), GRID_SHAPE).ravel()
+        return self._flat[flat].astype(np.float64) / SCALE
+
+
+@functools.lru_cache(maxsize=None)
+def open_table(path=DEFAULT_TABLE_PATH, rules=None):
+    """Process-wide shared table; every caller in the process gets the same memory map."""
+    return FlavorTable.open(path, rules)
+
+
+# --- Build Step ---
+def build_table(path=DEFAULT_TABLE_PATH, progress=None, rules=None):
+    """Evaluates every slider combination and writes the int8 table to `path` (.npy with header)."""
+    path = Path(path)
+    rules = rules or flavor_engine.RULES
+    partial = path.with_name(path.name + ".partial")
+    scores = np.lib.format.open_memmap(partial, mode="w+", dtype=np.int8, shape=GRID_SHAPE + (len(FLAVOR_COLUMNS),))
+
+    # One block per (ratio, time) pair keeps the working set to ~200k recipes.
+    outer_shape, inner_shape = GRID_SHAPE[:2], GRID_SHAPE[2:]
+    inner = [values[index] for values, index in zip(
+        (_axis_values(axis) for axis in GRID_AXES[2:]),
+        np.indices(inner_shape).reshape(len(inner_shape), -1),
+    )]
+    ratios, times = _axis_values(GRID_AXES[0]), _axis_values(GRID_AXES[1])
+    blocks = outer_shape[0] * outer_shape[1]
+    for block, (i, j) in enumerate(np.ndindex(outer_shape)):
+        profile = calculate_flavor_profile_batch(ratios[i], times[j], *inner, rules=rules)
+        scores[i, j] = np.rint(profile * SCALE).astype(np.int8).reshape(inner_shape + (len(FLAVOR_COLUMNS),))
+        if progress is not None:
+            progress(block + 1, blocks)
+
+    scores.flush()
+    del scores
+    # Without a fingerprint the table reads as stale, so drop the old one before swapping.
+    fingerprint_path(path).unlink(missing_ok=True)
+    os.replace(partial, path)
+    fingerprint_path(path).write_text(rules.fingerprint + "\n", encoding="utf-8")
+    return path
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Build the precomputed flavor profile lookup table.")
+    parser.add_argument("--output", default=DEFAULT_TABLE_PATH, type=Path, help="destination .npy file")
+    args = parser.parse_args(argv)
+
+    started = _time.perf_counter()
+
+    def report(done, total):
+        print(f"\r{done}/{total} blocks", end="", file=sys.stderr, flush=True)
+
+    path = build_table(args.output, progress=report)
+    recipes = int(np.prod(GRID_SHAPE))
+    print(f"\nwrote {recipes:,} recipes to {path} in {_time.perf_counter() - started:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,531 @@
+import argparse
+import asyncio
+import json
+import os
+import sys
+import threading
+import time as _time
+from pathlib import Path
+
+import numpy as np
+
+import flavor_engine
+from flavor_batch import FLAVOR_COLUMNS, adjustment_tip_codes_batch, calculate_flavor_profile_batch, encode_options
+from flavor_engine import DEFAULT_PARAMS, GRIND_SIZE_OPTIONS, PROCESS_METHOD_OPTIONS, ROAST_LEVEL_OPTIONS, SLIDER_RANGES
+from flavor_kinetics import DRAWDOWN
+
+
+# --- Telemetry Events ---
+# Kettles and scales send one JSON object per line, several per second per brew:
+#     {"brew": "bar1-3", "t": 12.4, "temperature": 93.2}   kettle water temperature (°C)
+#     {"brew": "bar1-3", "t": 12.5, "weight": 48.1}        water on the scale (g, tared with the coffee)
+#     {"brew": "bar1-3", "t": 0.0, "type": "start", "dose": 15, "grind_size": "中等研磨 (砂糖狀)", ...}
+#     {"brew": "bar1-3", "t": 171.0, "type": "end"}
+# `t` is in seconds on one clock per brew; a reading may carry both temperature and weight.
+# A brew is created by its first event; the start event only supplies the coffee dose and
+# the selector labels, which otherwise default to DEFAULT_DOSE and the sidebar defaults.
+DEFAULT_DOSE = 15.0
+SELECTOR_OPTIONS = {
+    "grind_size": GRIND_SIZE_OPTIONS,
+    "process_method": PROCESS_METHOD_OPTIONS,
+    "roast_level": ROAST_LEVEL_OPTIONS,
+}
+POUR_STEP = 1.0       # g of weight gain that counts as water being poured
+POUR_PAUSE = 2.5      # s without pouring that splits two pours
+IDLE_SECONDS = 600.0  # a brew without events for this long is dropped
+DEFAULT_PORT = 8766  # flavor_service listens on 8765
+
+
+class TelemetryError(ValueError):
+    """An event line that cannot be used (it is counted and skipped)."""
+
+
+def parse_event(line):
+    """One event from a JSON line (str or bytes)."""
+    try:
+        event = json.loads(line)
+    except (json.JSONDecodeError, UnicodeDecodeError) as error:
+        raise TelemetryError(f"not JSON: {error}") from None
+    if not isinstance(event, dict) or "brew" not in event or "t" not in event:
+        raise TelemetryError("an event needs 'brew' and 't'")
+    return event
+
+
+# --- Live Brew State ---
+# Every event updates a handful of running totals; nothing is kept per reading. The
+# derived recipe follows the kinetics model's schedule (see flavor_kinetics): the first
+# pour is the bloom, the wait until the second pour is blooming_time, and the pours after
+# the bloom are pour_count + 1 pulses, so pour_count counts the pauses between them.
+class BrewState:
+    """Running totals of one brew stream."""
+
+    __slots__ = (
+        "brew", "grind_size", "process_method", "roast_level", "dose", "events", "last_t", "seen", "ended",
+        "kettle", "peak", "step_weight", "water", "heat", "heated_water", "first_pour", "last_pour", "second_pour",
+        "pours", "bloom_water",
+    )
+
+    def __init__(self, brew):
+        self.brew = brew
+        self.grind_size = GRIND_SIZE_OPTIONS[DEFAULT_PARAMS["grind_size_index"]]
+        self.process_method = PROCESS_METHOD_OPTIONS[DEFAULT_PARAMS["process_method_index"]]
+        self.roast_level = ROAST_LEVEL_OPTIONS[DEFAULT_PARAMS["roast_level_index"]]
+        self.dose = DEFAULT_DOSE
+        self.events = 0
+        self.last_t = None
+        self.seen = None          # time.monotonic() of the last event, for idle eviction
+        self.ended = False
+        self.kettle = None        # latest kettle temperature
+        self.peak = 0.0           # highest weight counted as poured water
+        self.step_weight = 0.0    # weight at the last pour step
+        self.water = 0.0          # g poured so far
+        self.heat = 0.0           # sum of poured g * kettle temperature at the time
+        self.heated_water = 0.0   # g poured while the kettle temperature was known
+        self.first_pour = None
+        self.last_pour = None
+        self.second_pour = None
+        self.pours = 0            # pours so far, the bloom included
+        self.bloom_water = 0.0
+
+    def update(self, event):
+        # Numbers are converted before anything changes, so a malformed event leaves no trace.
+        t = float(event["t"])
+        kind = event.get("type")
+        dose = float(event.get("dose", self.dose)) if kind == "start" else None
+        temperature = float(event["temperature"]) if event.get("temperature") is not None else None
+        weight = float(event["weight"]) if event.get("weight") is not None else None
+        if not np.isfinite(t):
+            raise TelemetryError("'t' must be a finite number")
+        if dose is not None and not dose > 0:
+            raise TelemetryError("'dose' must be positive")
+        labels = {name: event[name] for name in SELECTOR_OPTIONS if kind == "start" and name in event}
+        for name, label in labels.items():
+            if not isinstance(label, str) or label not in SELECTOR_OPTIONS[name]:
+                raise TelemetryError(f"unknown {name} label {label!r}")
+
+        self.events += 1
+        self.last_t = t if self.last_t is None else max(self.last_t, t)
+        self.seen = _time.monotonic()
+        if kind == "start":
+            self.dose = dose
+            for name, label in labels.items():
+                setattr(self, name, label)
+        elif kind == "end":
+            self.ended = True
+        if temperature is not None:
+            self.kettle = temperature
+        if weight is not None:
+            self._weigh(t, weight)
+
+    def _weigh(self, t, weight):
+        # Scale noise and drips stay below POUR_STEP; a pour shows up as a run of steps of at
+        # least POUR_STEP each. While one runs, every gain over the peak counts as water, so
+        # the peak ends at the final weight and a new pour must climb a full step above it.
+        pouring = self.last_pour is not None and t - self.last_pour < POUR_PAUSE
+        if weight - (self.step_weight if pouring else self.peak) >= POUR_STEP:
+            if self.first_pour is None:
+                self.first_pour = t
+                self.pours = 1
+            elif not pouring:
+                self.pours += 1
+                if self.pours == 2:
+                    self.second_pour = t
+            self.last_pour = t
+            self.step_weight = weight
+            pouring = True
+        if pouring and weight > self.peak:
+            added = weight - self.peak
+            self.peak = weight
+            self.water += added
+            if self.pours == 1:
+                self.bloom_water += added
+            if self.kettle is not None:
+                self.heat += added * self.kettle
+                self.heated_water += added
+
+    def live(self):
+        """The recipe parameters measured so far, unclipped."""
+        elapsed = self.last_t - self.first_pour if self.first_pour is not None else 0.0
+        if self.heated_water:
+            temperature = self.heat / self.heated_water
+        else:
+            temperature = self.kettle if self.kettle is not None else float(DEFAULT_PARAMS["temperature"])
+        return {
+            "ratio": self.water / self.dose,
+            "time": elapsed,
+            "temperature": temperature,
+            "grind_size": self.grind_size,
+            "process_method": self.process_method,
+            "roast_level": self.roast_level,
+            # Still blooming: the wait so far.
+            "blooming_time": (self.second_pour if self.second_pour is not None else self.last_t) - self.first_pour
+            if self.first_pour is not None else 0.0,
+            "blooming_ratio": self.bloom_water / self.dose,
+            "pour_count": max(self.pours - 2, 0),
+        }
+
+    def recipe(self):
+        """live() clipped to the slider ranges, where the rules are defined."""
+        recipe = self.live()
+        for name, slider in SLIDER_RANGES.items():
+            recipe[name] = min(max(recipe[name], slider["min_value"]), slider["max_value"])
+        return recipe
+
+
+# --- Telemetry Hub ---
+# Sources push events from their own threads; predictions are recomputed on demand and
+# only for brews that changed since the last call, all of them in one batch.
+class TelemetryHub:
+    """The live brews of one process and their predicted profiles and tips."""
+
+    def __init__(self, rules=None):
+        self.rules = rules
+        self.brews = {}
+        self.dirty = set()
+        self.predictions = {}
+        self.events = 0
+        self.rejected = 0
+        self.sources = []
+        self.demo = None
+        self.lock = threading.Lock()
+
+    def ingest(self, event):
+        with self.lock:
+            self._ingest(event)
+
+    def ingest_line(self, line):
+        with self.lock:
+            try:
+                self._ingest(parse_event(line))
+            except (TelemetryError, TypeError, ValueError):
+                self.rejected += 1
+
+    def ingest_lines(self, lines):
+        """ingest_line for a batch of lines under one lock acquisition."""
+        with self.lock:
+            for line in lines:
+                try:
+                    self._ingest(parse_event(line))
+                except (TelemetryError, TypeError, ValueError):
+                    self.rejected += 1
+
+    def _ingest(self, event):
+        brew = str(event["brew"])
+        state = self.brews.get(brew)
+        if state is None:
+            state = BrewState(brew)
+            state.update(event)
+            self.brews[brew] = state
+        else:
+            state.update(event)
+        self.dirty.add(brew)
+        self.events += 1
+
+    def start_demo(self, lines, speed=None):
+        """Replays `lines` on a background thread unless the previous demo is still running."""
+        with self.lock:
+            if self.demo_running():
+                return False
+            self.demo = start_in_background(replay, lines, self, speed)
+            return True
+
+    def demo_running(self):
+        return self.demo is not None and self.demo.is_alive()
+
+    def active(self):
+        """Whether predictions can still change: a source or demo is running, or a brew has not ended."""
+        with self.lock:
+            return (
+                self.demo_running()
+                or any(thread.is_alive() for thread in self.sources)
+                or any(not state.ended for state in self.brews.values())
+            )
+
+    def forget(self, brew):
+        with self.lock:
+            self.brews.pop(brew, None)
+            self.predictions.pop(brew, None)
+            self.dirty.discard(brew)
+
+    def predict(self):
+        """{brew: {"live", "recipe", "profile", "tips", "ended", "events"}} for every live brew."""
+        with self.lock:
+            now = _time.monotonic()
+            for brew in [brew for brew, state in self.brews.items() if now - state.seen > IDLE_SECONDS]:
+                del self.brews[brew]
+                self.predictions.pop(brew, None)
+                self.dirty.discard(brew)
+            states = [self.brews[brew] for brew in self.dirty]
+            recipes = [state.recipe() for state in states]
+            if recipes:
+                columns = {name: [recipe[name] for recipe in recipes] for name in recipes[0]}
+                profiles = calculate_flavor_profile_batch(
+                    columns["ratio"], columns["time"], columns["temperature"],
+                    encode_options(columns["grind_size"], GRIND_SIZE_OPTIONS),
+                    encode_options(columns["process_method"], PROCESS_METHOD_OPTIONS),
+                    encode_options(columns["roast_level"], ROAST_LEVEL_OPTIONS),
+                    columns["blooming_time"], columns["blooming_ratio"], columns["pour_count"], rules=self.rules,
+                )
+                codes = adjustment_tip_codes_batch(
+                    columns["ratio"], columns["time"], columns["temperature"],
+                    encode_options(columns["grind_size"], GRIND_SIZE_OPTIONS),
+                    columns["blooming_time"], columns["blooming_ratio"], columns["pour_count"], rules=self.rules,
+                )
+                for state, recipe, profile, row in zip(states, recipes, profiles.round(1), codes):
+                    self.predictions[state.brew] = {
+                        "live": state.live(),
+                        "recipe": recipe,
+                        "profile": dict(zip(FLAVOR_COLUMNS, profile.tolist())),
+                        "tips": list(flavor_engine.adjustment_tips_for_codes(tuple(row.tolist()), self.rules)),
+                        "ended": state.ended,
+                        "events": state.events,
+                    }
+            # Only now: if scoring raised, these brews are rescored on the next call.
+            self.dirty.clear()
+            return dict(self.predictions)
+
+
+# --- Sources ---
+def tail_lines(path, poll_interval=0.2, from_start=True, stop=None):
+    """Lines appended to `path`, like `tail -f`; waits for the file and reopens it when truncated."""
+    path = Path(path)
+    stop = stop or threading.Event()
+    position = None if from_start else (path.stat().st_size if path.exists() else 0)
+    pending = b""
+    while not stop.is_set():
+        try:
+            size = path.stat().st_size
+        except FileNotFoundError:
+            stop.wait(poll_interval)
+            continue
+        if position is None or size < position:
+            position, pending = 0, b""
+        if size == position:
+            stop.wait(poll_interval)
+            continue
+        with open(path, "rb") as handle:
+            handle.seek(position)
+            chunk = handle.read(size - position)
+        position += len(chunk)
+        # A writer may be halfway through a line; keep the tail for the next read.
+        *lines, pending = (pending + chunk).split(b"\n")
+        yield from (line for line in lines if line.strip())
+
+
+def follow_file(hub, path, poll_interval=0.2, from_start=True, stop=None):
+    for line in tail_lines(path, poll_interval, from_start, stop):
+        hub.ingest_line(line)
+
+
+async def _serve_connection(hub, reader, writer):
+    try:
+        while line := await reader.readline():
+            if line.strip():
+                hub.ingest_line(line)
+    finally:
+        writer.close()
+
+
+async def serve(hub, host="127.0.0.1", port=DEFAULT_PORT, ready=None):
+    """Accepts any number of device connections on a local TCP socket, one JSON event per line."""
+    server = await asyncio.start_server(lambda reader, writer: _serve_connection(hub, reader, writer), host, port)
+    if ready is not None:
+        ready.set()
+    async with server:
+        await server.serve_forever()
+
+
+def start_in_background(target, *args, **kwargs):
+    """Runs a source (follow_file, serve, replay) on a daemon thread."""
+    if asyncio.iscoroutinefunction(target):
+        thread = threading.Thread(target=lambda: asyncio.run(target(*args, **kwargs)), daemon=True)
+    else:
+        thread = threading.Thread(target=target, args=args, kwargs=kwargs, daemon=True)
+    thread.start()
+    return thread
+
+
+def hub_from_environment():
+    """A TelemetryHub fed by the sources configured in the environment.
+
+    FLAVOR_TELEMETRY_PORT listens on that local TCP port; FLAVOR_TELEMETRY_FILE follows that
+    JSON-lines file. With neither set the hub only receives what is pushed into it.
+    """
+    hub = TelemetryHub()
+    if os.environ.get("FLAVOR_TELEMETRY_PORT"):
+        hub.sources.append(start_in_background(serve, hub, "127.0.0.1", int(os.environ["FLAVOR_TELEMETRY_PORT"])))
+    if os.environ.get("FLAVOR_TELEMETRY_FILE"):
+        hub.sources.append(start_in_background(follow_file, hub, os.environ["FLAVOR_TELEMETRY_FILE"]))
+    return hub
+
+
+# --- Recorded Traces ---
+# A trace is a JSON-lines file of events as the devices sent them, in arrival order.
+# replay() feeds one into a hub as fast as possible, or at `speed` times real time
+# using the event clock; synthetic_trace() renders a recipe as the events a kettle
+# and scale would produce for it.
+def replay(lines, hub, speed=None, batch=1000, stop=None):
+    """Feeds trace lines into `hub`; returns {"events", "rejected", "seconds"}."""
+    started = _time.perf_counter()
+    rejected = hub.rejected
+    count = 0
+    if speed is None:
+        pending = []
+        for line in lines:
+            pending.append(line)
+            if len(pending) >= batch:
+                hub.ingest_lines(pending)
+                count += len(pending)
+                pending = []
+        hub.ingest_lines(pending)
+        count += len(pending)
+    else:
+        first = None
+        for line in lines:
+            if stop is not None and stop.is_set():
+                break
+            try:
+                event = parse_event(line)
+                t = float(event["t"])
+            except (TelemetryError, TypeError, ValueError):
+                hub.ingest_line(line)
+                count += 1
+                continue
+            first = t if first is None else first
+            delay = (t - first) / speed - (_time.perf_counter() - started)
+            if delay > 0:
+                _time.sleep(delay)
+            hub.ingest(event)
+            count += 1
+    return {"events": count, "rejected": hub.rejected - rejected, "seconds": _time.perf_counter() - started}
+
+
+def synthetic_trace(recipe, brew="demo", rate=10.0, dose=DEFAULT_DOSE, flow=5.0, start=0.0, rng=None,
+                    temperature_noise=0.3, weight_noise=0.2):
+    """The events of one brew of `recipe` (calculate_flavor_profile keyword arguments).
+
+    Readings arrive `rate` times a second; water goes in at `flow` g/s. The bloom pour
+    starts at t=0 and the pours follow the kinetics schedule (flavor_kinetics.DRAWDOWN).
+    """
+    rng = rng or np.random.default_rng()
+    bloom_water = recipe["blooming_ratio"] * dose
+    pours = int(recipe["pour_count"]) + 1
+    pour_water = max(recipe["ratio"] * dose - bloom_water, 0) / pours
+    interval = max(recipe["time"] * (1 - DRAWDOWN) - recipe["blooming_time"], 0) / pours
+    # (start, grams) of every pour; water reaches the scale at `flow` until the pour is done,
+    # and a pour due while the previous one is still running follows straight after it.
+    schedule = [(0.0, bloom_water)]
+    for i in range(pours):
+        previous_start, previous_grams = schedule[-1]
+        schedule.append((max(recipe["blooming_time"] + i * interval, previous_start + previous_grams / flow), pour_water))
+
+    events = [{
+        "brew": brew, "t": start, "type": "start", "dose": dose,
+        **{name: recipe[name] for name in ("grind_size", "process_method", "roast_level")},
+    }]
+    for t in np.arange(0, recipe["time"] + 1e-9, 1 / rate):
+        weight = sum(min(max(t - begin, 0) * flow, grams) for begin, grams in schedule)
+        events.append({
+            "brew": brew,
+            "t": round(start + float(t), 3),
+            "temperature": round(float(recipe["temperature"] + rng.normal(0, temperature_noise)), 2),
+            "weight": round(float(weight + rng.normal(0, weight_noise)), 2),
+        })
+    events.append({"brew": brew, "t": round(start + float(recipe["time"]), 3), "type": "end"})
+    return events
+
+
+def random_recipe(rng):
+    """A random slider recipe, for synthetic sessions."""
+    from flavor_space import slider_values
+
+    recipe = {name: rng.choice(slider_values(name)).item() for name in SLIDER_RANGES}
+    recipe["grind_size"] = rng.choice(GRIND_SIZE_OPTIONS).item()
+    recipe["process_method"] = rng.choice(PROCESS_METHOD_OPTIONS).item()
+    recipe["roast_level"] = rng.choice(ROAST_LEVEL_OPTIONS).item()
+    return recipe
+
+
+def synthetic_session(brews, rate=10.0, seed=0, stagger=5.0):
+    """Interleaved events of `brews` concurrent brews of random recipes, starting `stagger` s apart."""
+    rng = np.random.default_rng(seed)
+    events = []
+    for i in range(brews):
+        events.extend(synthetic_trace(random_recipe(rng), brew=f"brew-{i}", rate=rate, start=i * stagger, rng=rng))
+    events.sort(key=lambda event: event["t"])
+    return events
+
+
+def write_trace(events, path):
+    with open(path, "w", encoding="utf-8") as trace:
+        for event in events:
+            trace.write(json.dumps(event, ensure_ascii=False) + "\n")
+
+
+# --- Command Line ---
+def _print_predictions(predictions):
+    for brew, prediction in sorted(predictions.items()):
+        live = prediction["live"]
+        profile = " ".join(f"{name}={value:.1f}" for name, value in prediction["profile"].items())
+        print(
+            f"{brew}: {live['time']:.0f}s 1:{live['ratio']:.1f} {live['temperature']:.1f}°C "
+            f"bloom {live['blooming_time']:.0f}s×{live['blooming_ratio']:.1f} pauses {live['pour_count']} | {profile}"
+            f"{' (end)' if prediction['ended'] else ''}"
+        )
+        for tip in prediction["tips"]:
+            print(f"    {tip}")
+
+
+def _watch(hub, interval):
+    try:
+        while True:
+            _time.sleep(interval)
+            _print_predictions(hub.predict())
+            print(f"-- {hub.events:,} events, {hub.rejected:,} rejected, {len(hub.brews)} brews", flush=True)
+    except KeyboardInterrupt:
+        pass
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Live flavor prediction from kettle and scale telemetry.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    replay_parser = commands.add_parser("replay", help="feed a recorded trace and print the predictions")
+    replay_parser.add_argument("trace", type=Path)
+    replay_parser.add_argument("--speed", type=float, help="times real time (default: as fast as possible)")
+    tail_parser = commands.add_parser("tail", help="follow a JSON-lines file")
+    tail_parser.add_argument("path", type=Path)
+    tail_parser.add_argument("--interval", type=float, default=2.0, help="seconds between printouts")
+    listen_parser = commands.add_parser("listen", help="accept device connections on a local TCP socket")
+    listen_parser.add_argument("--host", default="127.0.0.1")
+    listen_parser.add_argument("--port", type=int, default=DEFAULT_PORT)
+    listen_parser.add_argument("--interval", type=float, default=2.0, help="seconds between printouts")
+    synth_parser = commands.add_parser("synth", help="write a synthetic trace of concurrent brews")
+    synth_parser.add_argument("output", type=Path)
+    synth_parser.add_argument("--brews", type=int, default=10)
+    synth_parser.add_argument("--rate", type=float, default=10.0, help="readings per second per brew")
+    synth_parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args(argv)
+
+    hub = TelemetryHub()
+    if args.command == "replay":
+        with open(args.trace, "rb") as trace:
+            counts = replay(trace, hub, args.speed)
+        _print_predictions(hub.predict())
+        print(
+            f"{counts['events']:,} events ({counts['rejected']:,} rejected) in {counts['seconds']:.2f}s, "
+            f"{counts['events'] / counts['seconds'] if counts['seconds'] else 0:,.0f} events/s",
+            file=sys.stderr,
+        )
+    elif args.command == "tail":
+        start_in_background(follow_file, hub, args.path)
+        _watch(hub, args.interval)
+    elif args.command == "listen":
+        start_in_background(serve, hub, args.host, args.port)
+        print(f"listening on {args.host}:{args.port}", file=sys.stderr)
+        _watch(hub, args.interval)
+    else:
+        write_trace(synthetic_session(args.brews, args.rate, args.seed), args.output)
+
+
+if __name__ == "__main__":
+    main()